@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Browser profile benchmark.
+Loads the same LinkedIn profile pages with the full and lean browser profiles
+and compares page-load time and bytes transferred.
+
+Usage:
+    python benchmarks/bench_browser_profile.py <profile_url> [<profile_url> ...]
+    python benchmarks/bench_browser_profile.py --csv data/linkedin_contacts_<timestamp>.csv --limit 10
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from modules.linkedin_scraper import LinkedInScraper
+from modules.browser_profile import BrowserProfile
+from modules.contact import Contact
+
+# Sum of bytes received for the document and every sub-resource the page loaded
+TRANSFER_SIZE_SCRIPT = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return entries.reduce(function(total, entry) { return total + (entry.transferSize || 0); }, 0);
+"""
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare page-load time and bytes transferred between browser profiles')
+    parser.add_argument('urls', nargs='*', help='Profile URLs to load')
+    parser.add_argument('--csv', type=str, help='Read profile URLs from a scraped contacts CSV')
+    parser.add_argument('--limit', type=int, default=10, help='Maximum number of profiles to load')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome without a window')
+    return parser.parse_args()
+
+
+def read_urls(args):
+    urls = list(args.urls)
+    if args.csv:
+        urls += [contact.profile_url for contact in Contact.read_csv(args.csv) if contact.profile_url]
+    return urls[:args.limit]
+
+
+def run_profile(name, profile, urls):
+    """Load every URL with the given profile and return per-page timings and sizes."""
+    scraper = LinkedInScraper(max_pages_per_browser=0, max_browser_memory_mb=0, browser_profile=profile)
+    results = []
+    try:
+        if not scraper.use_existing_session():
+            print("No valid session cookies. Run main.py once to log in before benchmarking.")
+            return results
+
+        for url in urls:
+            # Start every page from a clean resource timing buffer
+            scraper.driver.execute_script("performance.clearResourceTimings();")
+            start = time.time()
+            scraper.driver.get(url)
+            try:
+                WebDriverWait(scraper.driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "h1")))
+            except Exception:
+                print(f"[{name}] h1 not found on {url}")
+            elapsed = time.time() - start
+            transferred = scraper.driver.execute_script(TRANSFER_SIZE_SCRIPT) or 0
+            results.append({"seconds": elapsed, "bytes": transferred})
+            print(f"[{name}] {elapsed:.2f}s {transferred / 1024:.0f} KB {url}")
+    finally:
+        scraper.driver.quit()
+    return results
+
+
+def summarize(results):
+    if not results:
+        return None
+    seconds = sorted(r["seconds"] for r in results)
+    return {
+        "pages": len(results),
+        "mean_seconds": sum(seconds) / len(seconds),
+        "median_seconds": seconds[len(seconds) // 2],
+        "mean_kb": sum(r["bytes"] for r in results) / len(results) / 1024
+    }
+
+
+def main():
+    args = parse_arguments()
+    urls = read_urls(args)
+    if not urls:
+        print("No profile URLs given.")
+        return
+
+    summaries = {}
+    for name in ("full", "lean"):
+        summaries[name] = summarize(run_profile(name, BrowserProfile.from_name(name, headless=args.headless), urls))
+
+    print("\nProfile   Pages   Mean load   Median load   Mean transfer")
+    for name, summary in summaries.items():
+        if summary:
+            print(f"{name:<9} {summary['pages']:>5}   {summary['mean_seconds']:>8.2f}s   {summary['median_seconds']:>10.2f}s   {summary['mean_kb']:>10.0f} KB")
+
+    full, lean = summaries["full"], summaries["lean"]
+    if full and lean and full["mean_seconds"] and full["mean_kb"]:
+        print(f"\nLean profile: {100 * (1 - lean['mean_seconds'] / full['mean_seconds']):.0f}% faster page loads, "
+              f"{100 * (1 - lean['mean_kb'] / full['mean_kb']):.0f}% fewer bytes transferred")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark.
+Runs the main.py flow (scrape, CSV, batch_generate_emails, Gmail drafts)
+against local stand-ins for LinkedIn, DeepSeek and Gmail, and reports
+contacts per minute, latency percentiles per stage and peak memory.
+
+Each size runs in its own process so peak RSS and metrics are per run. The
+results are compared with the stored baselines and the script exits with
+status 1 when a stage got slower, throughput dropped or memory grew by
+more than the tolerance. Baselines depend on the machine and are not
+committed: sizes without a baseline record one and are not checked, so the
+first run on a fresh checkout never fails.
+
+Requires Chrome and ChromeDriver, but no LinkedIn session, API key or Gmail credentials.
+
+Usage:
+    python benchmarks/bench_end_to_end.py --sizes 10 100 1000 --headless
+    python benchmarks/bench_end_to_end.py --sizes 100 --update-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "end_to_end.json")
+
+# Changes smaller than this many seconds are noise, whatever the relative change
+MIN_STAGE_DELTA = 0.005
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Benchmark the whole pipeline against local fakes')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help='Numbers of conversations to run')
+    parser.add_argument('--page-latency-ms', type=float, default=50, help='Latency of the fake LinkedIn pages')
+    parser.add_argument('--llm-latency-ms', type=float, default=300, help='Latency of the fake LLM API')
+    parser.add_argument('--llm-jitter-ms', type=float, default=150, help='Maximum random deviation from the LLM latency')
+    parser.add_argument('--llm-error-rate', type=float, default=0.02, help='Fraction of LLM calls failing with 429 or 500')
+    parser.add_argument('--gmail-latency-ms', type=float, default=20, help='Latency of each Gmail draft creation')
+    parser.add_argument('--sleep-scale', type=float, default=0.0, help='Multiplier for fixed sleeps such as the per-email rate limit (default: 0, skipped)')
+    parser.add_argument('--tabs', type=int, default=1, help='Tabs used for profile enrichment')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome without a window')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown before a stage counts as regressed')
+    parser.add_argument('--baseline', type=str, default=BASELINE_PATH, help='Baselines file')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baselines instead of comparing')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directories (site, CSV, emails, run log)')
+    parser.add_argument('--run-size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', type=str, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def stage_stats(summary):
+    """Percentiles of every successful span, keyed by span name and labels."""
+    stages = {}
+    for span in summary["spans"]:
+        labels = {k: v for k, v in span["labels"].items() if k != "status"}
+        if span["labels"].get("status", "ok") != "ok":
+            continue
+        key = span["name"] + "".join(f"[{k}={v}]" for k, v in sorted(labels.items()))
+        stages[key] = {"count": span["count"], "p50": span["p50"], "p90": span["p90"], "p99": span["p99"]}
+    return stages
+
+
+def run_size(size, args):
+    """Run the pipeline once on `size` conversations in this process and return its measurements."""
+    from fakes import write_linkedin_site, FakeLLMServer, InMemoryGmailService
+    from bench_multi_tab import PeakMemorySampler
+    from modules.linkedin_scraper import LinkedInScraper
+    from modules.browser_profile import BrowserProfile
+    from modules.email_generator import EmailGenerator
+    from modules.gmail_integration import GmailIntegration
+    from modules.contact_store import ContactStore
+    from modules.near_duplicates import NearDuplicateIndex
+    from modules.llm_backends import HedgedBackend, OpenAICompatibleBackend
+    from modules.usage_ledger import UsageLedger
+    from modules.replay import ReplayServer
+    from modules.selector_registry import SelectorRegistry
+    from modules.instrumentation import metrics
+
+    workdir = tempfile.mkdtemp(prefix=f"bench_e2e_{size}_")
+    site_dir = os.path.join(workdir, "site")
+    write_linkedin_site(site_dir, size)
+
+    metrics.reset()
+    # Shrink fixed sleeps so large runs measure work rather than waiting (this process only runs the benchmark)
+    real_sleep = metrics.sleep
+    metrics.sleep = lambda seconds, reason: real_sleep(seconds * args.sleep_scale, reason)
+    replay = ReplayServer(site_dir, latency=args.page_latency_ms / 1000)
+    llm_server = FakeLLMServer(latency=args.llm_latency_ms / 1000, jitter=args.llm_jitter_ms / 1000,
+                               error_rate=args.llm_error_rate)
+    log_path = os.path.join(workdir, "run.log")
+    scraper = None
+    try:
+        with open(log_path, 'w', encoding='utf-8') as log, redirect_stdout(log):
+            replay.start()
+            llm_server.start()
+            store = ContactStore(os.path.join(workdir, "contacts.db"))
+            scraper = LinkedInScraper(
+                max_pages_per_browser=0,
+                max_browser_memory_mb=0,
+                browser_profile=BrowserProfile.lean(headless=args.headless),
+                contact_store=store,
+                base_url=replay.base_url,
+                journal_path=os.path.join(workdir, "run_journal.jsonl"),
+                duplicate_index_path=os.path.join(workdir, "near_duplicates.json"),
+                selector_registry=SelectorRegistry.from_config(stats_path=os.path.join(workdir, "selector_stats.json"))
+            )
+            llm = HedgedBackend([OpenAICompatibleBackend("fake-llm", llm_server.api_url, "benchmark", "deepseek-chat",
+                                                         pricing=UsageLedger.DEFAULT_PRICING)])
+            generator = EmailGenerator(api_key="benchmark", contact_store=store, llm=llm)
+            generator.duplicate_index = NearDuplicateIndex(path=os.path.join(workdir, "generation_duplicates.json"))
+            gmail = InMemoryGmailService(latency=args.gmail_latency_ms / 1000)
+            generator.gmail_integration = GmailIntegration()
+            generator.gmail_integration.service = gmail
+
+            with PeakMemorySampler(scraper.lifecycle) as sampler:
+                start = time.time()
+                with metrics.span("pipeline_scrape"):
+                    messages = scraper.scrape_linkedin(max_threads=size, tabs=args.tabs)
+                with metrics.span("pipeline_csv_write"):
+                    scraper.save_messages_to_csv(messages, filename=os.path.join(workdir, "contacts.csv"))
+                with metrics.span("pipeline_generate"):
+                    results = generator.batch_generate_emails(contacts=messages, output_dir=os.path.join(workdir, "emails"),
+                                                              save_as_drafts=True, sender_email="benchmark@example.com")
+                elapsed = time.time() - start
+    finally:
+        if scraper is not None:
+            scraper.driver.quit()
+        replay.stop()
+        llm_server.stop()
+
+    summary = metrics.summary()
+    result = {
+        "contacts": size,
+        "matched": len(messages),
+        "emails": len(results),
+        "drafts": len(gmail.drafts_created),
+        "llm_requests": llm_server.requests,
+        "llm_errors": llm_server.errors,
+        "seconds": round(elapsed, 3),
+        "contacts_per_min": round(size / elapsed * 60, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_browser_rss_mb": round(sampler.peak_mb, 1),
+        "stages": stage_stats(summary)
+    }
+    if args.keep:
+        result["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def run_in_subprocess(size, args):
+    """Run one size in a fresh interpreter, so peak RSS and the shared metrics cover that run only."""
+    fd, result_file = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    command = [sys.executable, os.path.abspath(__file__), "--run-size", str(size), "--result-file", result_file,
+               "--page-latency-ms", str(args.page_latency_ms), "--llm-latency-ms", str(args.llm_latency_ms),
+               "--llm-jitter-ms", str(args.llm_jitter_ms), "--llm-error-rate", str(args.llm_error_rate),
+               "--gmail-latency-ms", str(args.gmail_latency_ms), "--sleep-scale", str(args.sleep_scale),
+               "--tabs", str(args.tabs)]
+    if args.headless:
+        command.append("--headless")
+    if args.keep:
+        command.append("--keep")
+    try:
+        subprocess.run(command, check=True)
+        with open(result_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_file)
+
+
+def compare(result, baseline, tolerance):
+    """
+    Compare a run with its baseline.
+
+    Returns:
+        list: Human readable regressions, empty if none
+    """
+    regressions = []
+    if result["contacts_per_min"] < baseline["contacts_per_min"] * (1 - tolerance):
+        regressions.append(f"throughput {result['contacts_per_min']:.1f} contacts/min, "
+                           f"baseline {baseline['contacts_per_min']:.1f}")
+    for stage, before in baseline["stages"].items():
+        after = result["stages"].get(stage)
+        if after is None:
+            continue
+        for quantile in ("p50", "p90"):
+            if after[quantile] > before[quantile] * (1 + tolerance) and after[quantile] - before[quantile] > MIN_STAGE_DELTA:
+                regressions.append(f"{stage} {quantile} {after[quantile] * 1000:.1f}ms, "
+                                   f"baseline {before[quantile] * 1000:.1f}ms")
+    for key in ("peak_rss_mb", "peak_browser_rss_mb"):
+        if baseline.get(key) and result[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key} {result[key]:.0f}MB, baseline {baseline[key]:.0f}MB")
+    return regressions
+
+
+def print_result(result):
+    print(f"\n== {result['contacts']} conversations: {result['contacts_per_min']:.1f} contacts/min "
+          f"({result['seconds']:.1f}s), {result['matched']} matched, {result['emails']} emails, {result['drafts']} drafts ==")
+    print(f"Peak RSS: {result['peak_rss_mb']:.0f}MB Python, {result['peak_browser_rss_mb']:.0f}MB browser; "
+          f"LLM: {result['llm_requests']} requests, {result['llm_errors']} injected errors")
+    print(f"{'stage':<40} {'count':>6} {'p50':>9} {'p90':>9} {'p99':>9}")
+    for stage, stats in sorted(result["stages"].items(), key=lambda item: -item[1]["p50"] * item[1]["count"]):
+        print(f"{stage:<40} {stats['count']:>6} {stats['p50'] * 1000:>7.1f}ms {stats['p90'] * 1000:>7.1f}ms "
+              f"{stats['p99'] * 1000:>7.1f}ms")
+
+
+def main():
+    args = parse_arguments()
+
+    if args.run_size:
+        result = run_size(args.run_size, args)
+        with open(args.result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    failed = {}
+    for size in sorted(args.sizes):
+        print(f"Running the pipeline on {size} conversations...")
+        result = run_in_subprocess(size, args)
+        print_result(result)
+
+        baseline = baselines.get(str(size))
+        if args.update_baseline or baseline is None:
+            baselines[str(size)] = result
+            if baseline:
+                print(f"Baseline updated for {size} conversations")
+            else:
+                print(f"No baseline for {size} conversations yet: this run was recorded as the baseline, "
+                      f"nothing was compared")
+            continue
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            failed[size] = regressions
+        else:
+            print(f"Within {args.tolerance:.0%} of the baseline")
+
+    os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+    with open(args.baseline, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2)
+
+    if failed:
+        print("\n" + "!" * 72)
+        print(f"PERFORMANCE REGRESSION: more than {args.tolerance:.0%} slower than the baseline")
+        for size, regressions in failed.items():
+            for regression in regressions:
+                print(f"  [{size} conversations] {regression}")
+        print("Run with --update-baseline if the slowdown is intended.")
+        print("!" * 72)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
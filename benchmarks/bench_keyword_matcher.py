@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Keyword matcher micro-benchmark.
+Compares the compiled KeywordMatcher with the original lowercase-and-scan
+approach as the keyword list grows, on synthetic LinkedIn-sized messages.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [--messages 2000]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.keyword_matcher import KeywordMatcher
+
+WORDS = (
+    "bonjour merci pour votre message je suis agent immobilier à paris nous cherchons "
+    "des solutions pour simplifier la gestion des biens hello thanks for connecting I work "
+    "in real estate and property management looking forward to our collaboration projet "
+    "investissement location vente appartement maison équipe développement opportunité"
+).split()
+
+
+def naive_contains(message_text, keywords):
+    """The original matching logic: lowercase everything on every call, then scan per keyword."""
+    keywords = [k.lower() for k in keywords]
+    message_text = message_text.lower()
+    return any(keyword in message_text for keyword in keywords)
+
+
+def make_keywords(count, rng):
+    # Mostly keywords that never match, so every one has to be checked
+    keywords = ["real estate"]
+    while len(keywords) < count:
+        keywords.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 12))))
+    return keywords
+
+
+def make_messages(count, rng):
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120))) for _ in range(count)]
+
+
+def time_per_message(fn, messages):
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return 1e6 * (time.perf_counter() - start) / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark keyword matching as the keyword list grows')
+    parser.add_argument('--messages', type=int, default=2000, help='Number of synthetic messages')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    messages = make_messages(args.messages, rng)
+
+    print("Keywords   Naive (us/msg)   Compiled (us/msg)   Compile (ms)")
+    for count in (10, 50, 100, 250, 500, 1000):
+        keywords = make_keywords(count, rng)
+        start = time.perf_counter()
+        matcher = KeywordMatcher.from_keywords(keywords)
+        compile_ms = 1000 * (time.perf_counter() - start)
+
+        # Both approaches must agree on plain substring keywords
+        substring_matcher = KeywordMatcher.from_keywords(keywords, whole_words=False)
+        assert all(substring_matcher.matches(m) == naive_contains(m, keywords) for m in messages[:200])
+
+        naive = time_per_message(lambda m: naive_contains(m, keywords), messages)
+        compiled = time_per_message(matcher.matches, messages)
+        print(f"{count:>8}   {naive:>14.1f}   {compiled:>17.1f}   {compile_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
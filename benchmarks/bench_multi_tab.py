@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Multi-tab profile loading benchmark.
+Enriches the same profiles sequentially and with K tabs in one browser, and
+compares throughput and the peak memory of the browser process tree.
+
+Usage:
+    python benchmarks/bench_multi_tab.py --csv data/linkedin_contacts_<timestamp>.csv --limit 20 --tabs 4
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.linkedin_scraper import LinkedInScraper
+from modules.browser_profile import BrowserProfile
+from modules.contact import Contact
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare sequential and multi-tab profile enrichment')
+    parser.add_argument('--csv', type=str, required=True, help='Scraped contacts CSV to read profile URLs from')
+    parser.add_argument('--limit', type=int, default=20, help='Maximum number of profiles to enrich')
+    parser.add_argument('--tabs', type=int, nargs='+', default=[2, 4], help='Tab counts to compare against sequential')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome without a window')
+    return parser.parse_args()
+
+
+def read_messages(path, limit):
+    urls = [contact.profile_url for contact in Contact.read_csv(path) if contact.profile_url]
+    return urls[:limit]
+
+
+class PeakMemorySampler:
+    """Samples the browser's RSS in the background and keeps the peak."""
+
+    def __init__(self, lifecycle, interval=0.5):
+        self.lifecycle = lifecycle
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = self.lifecycle.browser_rss_mb()
+            if rss:
+                self.peak_mb = max(self.peak_mb, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_mode(tabs, urls, headless):
+    """Enrich the profiles with the given tab count (1 means the sequential path)."""
+    scraper = LinkedInScraper(max_pages_per_browser=0, max_browser_memory_mb=0,
+                              browser_profile=BrowserProfile.lean(headless=headless))
+    try:
+        if not scraper.use_existing_session():
+            print("No valid session cookies. Run main.py once to log in before benchmarking.")
+            return None
+
+        messages = [Contact(profile_url=url, message="") for url in urls]
+        with PeakMemorySampler(scraper.lifecycle) as sampler:
+            start = time.time()
+            if tabs > 1:
+                scraper.extract_data_from_profiles_in_tabs(messages, tabs=tabs)
+            else:
+                scraper.extract_data_from_profile(messages)
+            elapsed = time.time() - start
+
+        return {
+            "tabs": tabs,
+            "seconds": elapsed,
+            "profiles_per_minute": 60 * len(messages) / elapsed if elapsed else 0,
+            "peak_rss_mb": sampler.peak_mb,
+            "emails_found": sum(1 for m in messages if m.get("email"))
+        }
+    finally:
+        scraper.driver.quit()
+
+
+def main():
+    args = parse_arguments()
+    urls = read_messages(args.csv, args.limit)
+    if not urls:
+        print("No profile URLs found in the CSV file.")
+        return
+
+    results = []
+    for tabs in [1] + [t for t in args.tabs if t > 1]:
+        print(f"\n=== {'Sequential' if tabs == 1 else f'{tabs} tabs'} ===")
+        result = run_mode(tabs, urls, args.headless)
+        if result:
+            results.append(result)
+
+    print("\nMode         Time     Profiles/min   Peak RSS    Emails")
+    for result in results:
+        mode = "sequential" if result["tabs"] == 1 else f"{result['tabs']} tabs"
+        print(f"{mode:<12} {result['seconds']:>6.1f}s {result['profiles_per_minute']:>12.1f} "
+              f"{result['peak_rss_mb']:>8.0f} MB {result['emails_found']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Local stand-ins for the services the pipeline talks to, used by the end-to-end benchmark.
+
+- write_linkedin_site: a synthetic messaging list, conversations, profiles and
+  contact info overlays, in the snapshot format served by modules/replay.py
+- FakeLLMServer: an OpenAI-compatible chat completions endpoint with tunable
+  latency and error rate
+- InMemoryGmailService: a double of the Gmail API service object that keeps
+  drafts in memory
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import threading
+from email import message_from_bytes
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.replay import SnapshotRecorder
+
+
+FIRST_NAMES = ["Camille", "Julien", "Sarah", "Thomas", "Ines", "Lucas", "Emma", "Hugo", "Lea", "Karim",
+               "Nora", "Paul", "Chloe", "Yanis", "Manon", "Adam", "Jade", "Louis", "Alice", "Samir"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Durand", "Leroy", "Moreau", "Simon", "Laurent", "Michel", "Garcia",
+              "Roux", "Fournier", "Girard", "Bonnet", "Dupont", "Lambert", "Fontaine", "Rousseau", "Blanc", "Chevalier"]
+CITIES = ["Paris", "Lyon", "Marseille", "Bordeaux", "Nantes", "Lille", "Toulouse", "Nice"]
+
+# Openings of the first message of a thread; most mention the default scraping keywords
+OPENINGS = [
+    "Hi, I am a real estate agent in {city} and saw your post about property management software.",
+    "Bonjour, je suis agent immobilier a {city}, votre outil m'interesse pour mon agence.",
+    "Hello! Our agency has twelve agents in {city} and we spend hours on listings every week.",
+    "Thanks for connecting. I run a small real estate brokerage in {city}, happy to chat.",
+    "Hi, I saw your profile and thought we could connect. I work in logistics in {city}.",
+    "Hello, we are hiring engineers in {city}, would you be interested in a new role?",
+]
+REPLIES = [
+    "Sure, what does the tool do exactly?",
+    "We currently use spreadsheets for everything, it is painful.",
+    "Could you send me more details by email?",
+    "Next week works for me, Tuesday afternoon ideally.",
+]
+
+
+def _contact(index, rng):
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    slug = f"{first}-{last}-{index}".lower()
+    return {
+        "index": index,
+        "name": f"{first} {last}",
+        "slug": slug,
+        "thread": f"2-{index:08d}",
+        "email": f"{first}.{last}{index}@example.com".lower() if rng.random() < 0.8 else None,
+        "website": f"https://{last.lower()}-immobilier-{index}.example.com" if rng.random() < 0.5 else None,
+        "messages": [rng.choice(OPENINGS).format(city=rng.choice(CITIES))]
+                    + rng.sample(REPLIES, rng.randint(1, 3))
+    }
+
+
+def _messaging_page(contacts):
+    items = "\n".join(
+        f'<li class="msg-conversation-listitem"><a class="msg-conversation-listitem__link" '
+        f'href="/messaging/thread/{c["thread"]}/">{c["name"]}</a></li>'
+        for c in contacts
+    )
+    return (f'<html><head><title>Messaging | LinkedIn</title></head><body><nav class="global-nav"></nav>'
+            f'<div class="msg-conversations-container"><ul class="msg-conversations-container__conversations-list">'
+            f'{items}</ul></div></body></html>')
+
+
+def _conversation_page(contact):
+    events = []
+    for i, body in enumerate(contact["messages"]):
+        sender = contact["name"] if i % 2 == 0 else "Karim Abbes"
+        heading = '<time class="msg-s-message-list__time-heading">Monday</time>' if i == 0 else ""
+        events.append(
+            f'<li class="msg-s-message-list__event">{heading}'
+            f'<span class="msg-s-message-group__name">{sender}</span>'
+            f'<time class="msg-s-message-group__timestamp">10:{i:02d}</time>'
+            f'<div data-event-urn="urn:li:msg_event:{contact["thread"]}-{i}">'
+            f'<p class="msg-s-event-listitem__body">{body}</p></div></li>'
+        )
+    return (f'<html><head><title>{contact["name"]} | Messaging</title></head><body><nav class="global-nav"></nav>'
+            f'<div class="msg-conversations-container"></div>'
+            f'<a class="msg-thread__link-to-profile" href="/in/{contact["slug"]}/">{contact["name"]}</a>'
+            f'<ul class="msg-s-message-list">{"".join(events)}</ul></body></html>')
+
+
+def _profile_page(contact):
+    return (f'<html><head><title>{contact["name"]} | LinkedIn</title></head><body><nav class="global-nav"></nav>'
+            f'<main><section class="pv-top-card"><h1>{contact["name"]}</h1>'
+            f'<a href="/in/{contact["slug"]}/overlay/contact-info/">Contact info</a></section></main></body></html>')
+
+
+def _contact_overlay_page(contact):
+    sections = [f'<section class="pv-contact-info__contact-type"><h3>Profile</h3>'
+                f'<a href="https://www.linkedin.com/in/{contact["slug"]}/">linkedin.com/in/{contact["slug"]}</a></section>']
+    if contact["website"]:
+        sections.append(f'<section class="pv-contact-info__contact-type"><h3>Website</h3>'
+                        f'<a href="{contact["website"]}">{contact["website"]}</a></section>')
+    if contact["email"]:
+        sections.append(f'<section class="pv-contact-info__contact-type ci-email"><h3>Email</h3>'
+                        f'<a href="mailto:{contact["email"]}">{contact["email"]}</a></section>')
+    return (f'<html><head><title>Contact info | LinkedIn</title></head><body><nav class="global-nav"></nav>'
+            f'<main><h1>{contact["name"]}</h1>{"".join(sections)}</main></body></html>')
+
+
+def write_linkedin_site(directory, count, seed=0):
+    """
+    Write a synthetic LinkedIn inbox of `count` conversations as replayable snapshots.
+
+    Every contact gets a conversation of two to four messages, a profile page
+    and a contact info overlay; about 80% have an email address and two
+    thirds of the openings match the scraper's default keywords.
+
+    Args:
+        directory (str): Snapshot directory for ReplayServer
+        count (int): Number of conversations
+        seed (int): Seed of the content generator
+
+    Returns:
+        list: The generated contacts (dictionaries)
+    """
+    rng = random.Random(seed)
+    contacts = [_contact(i, rng) for i in range(count)]
+    recorder = SnapshotRecorder(directory)
+    base = "https://www.linkedin.com"
+    recorder.save(f"{base}/messaging/", _messaging_page(contacts), "messaging", flush=False)
+    for contact in contacts:
+        recorder.save(f"{base}/messaging/thread/{contact['thread']}/", _conversation_page(contact), "conversation", flush=False)
+        recorder.save(f"{base}/in/{contact['slug']}/", _profile_page(contact), "profile", flush=False)
+        recorder.save(f"{base}/in/{contact['slug']}/overlay/contact-info/", _contact_overlay_page(contact),
+                      "contact_overlay", flush=False)
+    recorder.flush()
+    return contacts
+
+
+class FakeLLMServer:
+    """
+    OpenAI-compatible chat completions endpoint answering with a canned email.
+
+    Each request waits `latency` plus or minus up to `jitter` seconds, and a
+    fraction `error_rate` of requests fails with HTTP 429 or 500. Usage is
+    reported like DeepSeek's, with the system prompt counted as cached after
+    the first request.
+    """
+
+    CONTENT = json.dumps({
+        "personalized_intro": "Thanks for your message on LinkedIn, it was great to hear about your agency.",
+        "main_content": "I am building a tool that takes listing paperwork and follow-ups off the plate of real estate agents.",
+        "call_to_action": "Would you be open to a 20 minute call next week?",
+        "topic": "Following up on our LinkedIn conversation",
+        "signature": "Best regards,\nKarim Abbes\nhttps://www.linkedin.com/in/karimabbes/"
+    })
+
+    def __init__(self, latency=0.2, jitter=0.1, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = None
+
+    @property
+    def api_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def _answer(self, payload):
+        """Return (status, body) for a request payload."""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0))
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(delay)
+        if failed:
+            status = self._random.choice((429, 500))
+            return status, {"error": {"message": "rate limited" if status == 429 else "internal error"}}
+
+        messages = payload.get("messages", [])
+        system = "".join(m["content"] for m in messages if m.get("role") == "system")
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        with self._lock:
+            cached = len(system) // 4 if system in self._cached_prefixes else 0
+            self._cached_prefixes.add(system)
+        return 200, {
+            "model": payload.get("model", "fake"),
+            "choices": [{"message": {"role": "assistant", "content": self.CONTENT}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(self.CONTENT) // 4,
+                "prompt_cache_hit_tokens": cached,
+                "prompt_cache_miss_tokens": prompt_tokens - cached
+            }
+        }
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                status, body = server._answer(payload)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="fake-llm")
+        self._thread.start()
+        return self.api_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Request:
+    """Mimics the googleapiclient request objects: work happens on execute()."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def execute(self):
+        return self.func()
+
+
+class InMemoryGmailService:
+    """
+    Double of the object returned by googleapiclient's build('gmail', 'v1').
+
+    Supports users().drafts().create() and users().messages().list()/get(),
+    which is what GmailIntegration and GmailChecker call. Drafts are decoded
+    and kept in memory; no message has ever been sent.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.drafts_created = []
+        self._lock = threading.Lock()
+
+    def users(self):
+        return self
+
+    def drafts(self):
+        return self
+
+    def messages(self):
+        return _GmailMessages()
+
+    def create(self, userId, body):
+        def create_draft():
+            if self.latency:
+                time.sleep(self.latency)
+            message = message_from_bytes(base64.urlsafe_b64decode(body["message"]["raw"]))
+            with self._lock:
+                draft = {"id": f"draft-{len(self.drafts_created) + 1}", "message": {"id": f"msg-{len(self.drafts_created) + 1}"}}
+                self.drafts_created.append({"id": draft["id"], "to": message["to"], "subject": message["subject"]})
+            return draft
+        return _Request(create_draft)
+
+
+class _GmailMessages:
+    def list(self, userId, q=None, labelIds=None, maxResults=None):
+        return _Request(lambda: {"messages": [], "resultSizeEstimate": 0})
+
+    def get(self, userId, id, format=None, metadataHeaders=None):
+        return _Request(lambda: {"id": id, "payload": {"headers": []}})
@@ -9,12 +9,23 @@ import os
 import sys
 import argparse
 import time
+import socket
 from datetime import datetime
 
 # Add the parent directory to the path to import from modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from modules.linkedin_scraper import LinkedInScraper
 from modules.email_generator import EmailGenerator
+from modules.browser_profile import BrowserProfile
+from modules.keyword_matcher import KeywordMatcher
+from modules.usage_ledger import RunBudget
+from modules.instrumentation import metrics
+from modules.profiling import profiler
+from modules.replay import SnapshotRecorder, ReplayServer
+from modules.rate_scheduler import rate_scheduler
+from modules.work_queue import WorkQueue
+from modules.distributed_scrape import ScrapeCoordinator, ScrapeWorker
+from modules.contact_priority import Deadline
 
 def parse_arguments():
     """Parse command line arguments."""
@@ -24,15 +35,53 @@ def parse_arguments():
     parser.add_argument('--use-cookies', action='store_true', help='Use cookies for authentication')
     parser.add_argument('--force-login', action='store_true', help='Force login even if cookies are valid')
     parser.add_argument('--output', type=str, help='Output filename for the CSV file')
-    parser.add_argument('--filter', type=str, help='Filter contacts by keyword in name or message')
+    parser.add_argument('--filter', type=str, help='Filter contacts by keywords in the message: a comma-separated list or an AND/OR/NOT expression')
+    parser.add_argument('--match-substrings', action='store_true', help='Match keywords inside words too (by default "agent" does not match "management")')
+    parser.add_argument('--top-n', type=int, help='Only enrich and generate emails for the N most relevant contacts')
+    parser.add_argument('--min-score', type=float, help='Only enrich and generate emails for contacts scoring at least this relevance (-1 to 1)')
     parser.add_argument('--max-threads', type=int, default=4, help='Maximum number of threads for scraping')
+    parser.add_argument('--recycle-pages', type=int, default=100, help='Recycle the browser after this many page loads (0 to disable)')
+    parser.add_argument('--recycle-memory-mb', type=int, default=1500, help='Recycle the browser when it uses more memory than this (0 to disable)')
+    parser.add_argument('--tabs', type=int, default=1, help='Load this many profiles concurrently in tabs of one browser (default: 1, sequential)')
+    parser.add_argument('--browser-profile', choices=['lean', 'full'], default='lean', help='Chrome launch profile: lean blocks images, media, fonts and trackers (default: lean)')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome without a window')
+    parser.add_argument('--metrics-dir', type=str, help='Directory for the run metrics JSON and Prometheus files (default: data/metrics)')
+    parser.add_argument('--profile', action='store_true', help='Profile CPU and memory of each pipeline stage (cProfile, flamegraph stacks, tracemalloc)')
+    parser.add_argument('--profile-dir', type=str, help='Directory for the profiling reports (default: data/profiles/<timestamp>)')
+    parser.add_argument('--resume', action='store_true', help='Resume the previous run from its journal, redoing only in-flight work')
+    parser.add_argument('--deadline', type=str, help='Stop cleanly after this much wall time, e.g. 20m or 1h30m, processing the highest priority contacts first')
+    parser.add_argument('--record-dir', type=str, help='Save compressed snapshots of the messaging, conversation and profile pages visited to this directory')
+    parser.add_argument('--replay-dir', type=str, help='Scrape snapshots saved with --record-dir from a local server instead of LinkedIn')
+    parser.add_argument('--replay-latency-ms', type=float, default=0, help='Latency the replay server adds to every page (default: 0)')
+    parser.add_argument('--replay-jitter-ms', type=float, default=0, help='Maximum random deviation from the replay latency (default: 0)')
+    parser.add_argument('--replay-port', type=int, default=8765, help='Port of the replay server, kept fixed so --resume matches the journal of a replayed run (default: 8765)')
+    parser.add_argument('--replay-wait-scale', type=float, default=0.1, help='Multiplier for the fixed page waits when replaying (default: 0.1)')
+    
+    # Distributed scraping options
+    parser.add_argument('--coordinator', action='store_true', help='Queue the conversations in a shared work queue and scrape them together with --worker processes')
+    parser.add_argument('--worker', action='store_true', help='Work scraping tasks from the shared queue of a --coordinator run, then exit')
+    parser.add_argument('--queue', type=str, help='Shared work queue file (default: data/work_queue.db)')
+    parser.add_argument('--worker-id', type=str, help='Name of this process in the work queue (default: hostname-pid)')
+    parser.add_argument('--account', type=str, help='Log in with LINKEDIN_EMAIL_<ACCOUNT> and LINKEDIN_PASSWORD_<ACCOUNT> and keep its own cookie file')
+    parser.add_argument('--lease-minutes', type=float, default=5, help='Minutes after which a task held by an unresponsive worker is given to another one (default: 5)')
     
     # Email generation options
     parser.add_argument('--generate-emails', action='store_true', help='Generate emails after scraping')
     parser.add_argument('--gmail', action='store_true', help='Save generated emails as Gmail drafts')
     parser.add_argument('--sender-email', type=str, help='Email address to send from when saving drafts')
     parser.add_argument('--check-sent-emails', action='store_true', help='Check if emails have already been sent to contacts')
+    parser.add_argument('--no-reuse-duplicates', action='store_true', help='Generate a separate email for every near-duplicate message instead of reusing one per template')
+    parser.add_argument('--no-template-tier', action='store_true', help='Send every contact to the LLM instead of answering short, low-signal messages from local templates')
+    parser.add_argument('--regenerate', action='store_true', help='Generate emails again for contacts that already have one in the contact store')
+    parser.add_argument('--max-prompt-tokens', type=int, default=1500, help='Token budget for each generation prompt; long messages are truncated to fit')
+    parser.add_argument('--conversation-window', type=int, default=10, help='Number of most recent conversation messages to include in the prompt (0 for the first message only)')
     parser.add_argument('--api-key', type=str, help='DeepSeek API key (overrides config)')
+    parser.add_argument('--budget-tokens', type=int, help='Stop generating before the batch uses more than this many tokens')
+    parser.add_argument('--budget-usd', type=float, help='Stop generating before the batch costs more than this many US dollars')
+    parser.add_argument('--budget-minutes', type=float, help='Stop generating before the batch runs longer than this many minutes')
+    parser.add_argument('--llm-config', type=str, help='LLM backends configuration file (default: config/llm_backends.json)')
+    parser.add_argument('--email-format', choices=['mbox', 'txt'], default='mbox', help='Save generated emails to mbox files with an offset index, or one text file each (default: mbox)')
+    parser.add_argument('--mbox-shard-size', type=int, default=5000, help='Emails per mbox file (default: 5000, 0 for a single file)')
     
     return parser.parse_args()
 
@@ -40,21 +89,110 @@ def main():
     """Main function to run the LinkedIn scraper and email generator."""
     args = parse_arguments()
     
+    # Compile the keyword filter before starting the browser so a bad expression fails fast
+    keywords = None
+    if args.filter:
+        try:
+            keywords = KeywordMatcher.from_keywords(args.filter, whole_words=not args.match_substrings)
+        except ValueError as e:
+            print(f"Invalid --filter expression: {e}")
+            return
+    
+    # The deadline covers the whole run, from scraping to the last draft
+    try:
+        deadline = Deadline.parse(args.deadline)
+    except ValueError as e:
+        print(f"Invalid --deadline: {e}")
+        return
+    
+    if args.profile:
+        profiler.enable(args.profile_dir)
+    
+    if args.coordinator and args.worker:
+        print("Use either --coordinator or --worker, not both")
+        return
+    if (args.coordinator or args.worker) and args.tabs > 1:
+        print("--tabs does not apply to queue tasks, start more --worker processes instead")
+        return
+    
+    # Each account logs in with its own credentials and keeps its own session cookies
+    credentials = None
+    cookie_file = "linkedin_cookies.pkl"
+    if args.account:
+        suffix = args.account.upper()
+        credentials = (os.getenv(f"LINKEDIN_EMAIL_{suffix}"), os.getenv(f"LINKEDIN_PASSWORD_{suffix}"))
+        if not all(credentials):
+            print(f"LINKEDIN_EMAIL_{suffix} and LINKEDIN_PASSWORD_{suffix} must be set for --account {args.account}")
+            return
+        cookie_file = f"linkedin_cookies_{args.account.lower()}.pkl"
+    
+    # Serve recorded pages locally instead of scraping LinkedIn
+    replay_server = None
+    if args.replay_dir:
+        replay_server = ReplayServer(args.replay_dir, latency=args.replay_latency_ms / 1000, jitter=args.replay_jitter_ms / 1000,
+                                     port=args.replay_port)
+        replay_server.start()
+    
     # Initialize the LinkedIn scraper
-    scraper = LinkedInScraper()
+    scraper = LinkedInScraper(
+        max_pages_per_browser=args.recycle_pages,
+        max_browser_memory_mb=args.recycle_memory_mb,
+        browser_profile=BrowserProfile.from_name(args.browser_profile, headless=args.headless),
+        base_url=replay_server.base_url if replay_server else None,
+        wait_scale=args.replay_wait_scale if replay_server else 1.0,
+        recorder=SnapshotRecorder(args.record_dir) if args.record_dir else None,
+        cookie_file=cookie_file,
+        credentials=credentials
+    )
+    
+    queue = None
+    worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    if args.coordinator or args.worker:
+        queue = WorkQueue(args.queue, lease_seconds=args.lease_minutes * 60)
+    
+    # A worker only works queue tasks; the coordinator saves and emails the results
+    if args.worker:
+        try:
+            ScrapeWorker(scraper, queue, worker_id).run(use_cookies=args.use_cookies or args.resume)
+        finally:
+            scraper.driver.quit()
+            if replay_server:
+                replay_server.stop()
+        rate_scheduler.print_report()
+        return
     
     # Scrape LinkedIn messages
     print("Starting LinkedIn scraping...")
-    messages = scraper.scrape_linkedin(
-        use_cookies=args.use_cookies,
-        keywords=args.filter.split(',') if args.filter else None,
-        max_threads=args.max_threads
-    )
+    if args.coordinator:
+        if keywords is None:
+            keywords = KeywordMatcher.from_keywords(LinkedInScraper.DEFAULT_KEYWORDS, whole_words=not args.match_substrings)
+        messages = ScrapeCoordinator(scraper, queue, worker_id).run(
+            keywords,
+            max_threads=args.max_threads,
+            resume=args.resume,
+            top_n=args.top_n,
+            min_score=args.min_score,
+            deadline=deadline,
+            use_cookies=args.use_cookies or args.resume
+        )
+    else:
+        messages = scraper.scrape_linkedin(
+            use_cookies=args.use_cookies,
+            keywords=keywords,
+            max_threads=args.max_threads,
+            resume=args.resume,
+            tabs=args.tabs,
+            whole_words=not args.match_substrings,
+            top_n=args.top_n,
+            min_score=args.min_score,
+            deadline=deadline
+        )
     
     # Save messages to CSV
     if messages:
         output_file = args.output if args.output else None
-        csv_file = scraper.save_messages_to_csv(messages, filename=output_file)
+        with profiler.stage("csv_write"):
+            csv_file = scraper.save_messages_to_csv(messages, filename=output_file)
         print(f"Scraped data saved to {csv_file}")
         
         # Generate emails if requested
@@ -63,7 +201,18 @@ def main():
             generator = EmailGenerator(
                 api_key=args.api_key,
                 use_gmail=args.gmail,
-                check_sent_emails=args.check_sent_emails
+                check_sent_emails=args.check_sent_emails,
+                reuse_duplicates=not args.no_reuse_duplicates,
+                template_tier=not args.no_template_tier,
+                contact_store=scraper.contact_store,
+                conversation_window=args.conversation_window,
+                max_prompt_tokens=args.max_prompt_tokens,
+                llm_config=args.llm_config,
+                budget=RunBudget(
+                    max_tokens=args.budget_tokens,
+                    max_cost=args.budget_usd,
+                    max_seconds=args.budget_minutes * 60 if args.budget_minutes else None
+                )
             )
      
             if args.gmail:
@@ -74,13 +223,25 @@ def main():
                 print("\nGenerating emails...")
 
             # Generate emails for all contacts
-            generator.batch_generate_emails(csv_file_path=csv_file, output_dir=args.output, save_as_drafts=args.gmail, sender_email=args.sender_email)
+            generator.batch_generate_emails(contacts=messages, output_dir=args.output, save_as_drafts=args.gmail, sender_email=args.sender_email,
+                                            top_n=args.top_n, min_score=args.min_score, regenerate=args.regenerate,
+                                            export_format=args.email_format, mbox_shard_size=args.mbox_shard_size,
+                                            deadline=deadline)
            
     else:
         print("No messages found matching the criteria.")
     
     # Close the browser
     scraper.driver.quit()
+    if replay_server:
+        replay_server.stop()
+    
+    # Report where the run spent its time
+    rate_scheduler.print_report()
+    metrics.print_summary()
+    json_path, prom_path = metrics.write_reports(args.metrics_dir)
+    print(f"Run metrics saved to {json_path} and {prom_path}")
+    profiler.finish()
 
 if __name__ == "__main__":
     main()
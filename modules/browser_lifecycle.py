@@ -0,0 +1,222 @@
+import os
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class BrowserLifecycleManager:
+    """
+    Tracks how hard the scraper's Chrome instance has been worked and recycles
+    it before it degrades.
+
+    The manager counts page loads and samples the resident memory of the
+    chromedriver/Chrome process tree. When either passes its threshold it
+    quits the driver between items, starts a fresh one through the scraper
+    and carries the LinkedIn cookies over, so no re-login is needed.
+    """
+
+    # Number of page loads averaged when comparing latency before and after a recycle
+    LATENCY_WINDOW = 10
+
+    def __init__(self, scraper, max_pages=100, max_memory_mb=1500, memory_check_interval=5):
+        """
+        Initialize the lifecycle manager.
+
+        Args:
+            scraper (LinkedInScraper): Scraper owning the driver to manage
+            max_pages (int): Page loads after which the browser is recycled (0 disables)
+            max_memory_mb (int): Browser RSS in MB after which it is recycled (0 disables)
+            memory_check_interval (int): Sample memory every N page loads
+        """
+        self.scraper = scraper
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_interval = max(1, memory_check_interval)
+
+        self.events = []
+        self.total_pages = 0
+        self.reset()
+
+    def reset(self):
+        """Start tracking a new browser instance."""
+        self.page_count = 0
+        self.page_latencies = []
+        self.last_rss_mb = None
+
+    def record_page(self, seconds):
+        """
+        Record a page load on the current browser.
+
+        Args:
+            seconds (float): Time the page load took
+        """
+        self.page_count += 1
+        self.total_pages += 1
+        self.page_latencies.append(seconds)
+
+        # Fill in the post-recycle latency of the last event once enough pages have loaded
+        if self.events and self.events[-1]["latency_after"] is None and self.page_count >= self.LATENCY_WINDOW:
+            self.events[-1]["latency_after"] = self._mean(self.page_latencies[:self.LATENCY_WINDOW])
+
+    def browser_rss_mb(self):
+        """
+        Return the resident memory of chromedriver and all its Chrome children in MB.
+
+        Returns:
+            float: Memory in MB, or None if it cannot be measured
+        """
+        try:
+            pid = self.scraper.driver.service.process.pid
+        except Exception:
+            return None
+
+        try:
+            if psutil:
+                root = psutil.Process(pid)
+                processes = [root] + root.children(recursive=True)
+                return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+            return self._proc_tree_rss(pid) / (1024 * 1024)
+        except Exception:
+            return None
+
+    def _proc_tree_rss(self, pid):
+        """Sum RSS of a process tree from /proc (Linux fallback when psutil is missing)."""
+        total = 0
+        pending = [pid]
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+            try:
+                with open(f"/proc/{current}/task/{current}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+            except OSError:
+                pass
+        return total
+
+    def should_recycle(self):
+        """
+        Decide whether the browser should be recycled before the next item.
+
+        Returns:
+            str: The reason to recycle, or None
+        """
+        if self.max_pages and self.page_count >= self.max_pages:
+            return f"{self.page_count} pages loaded"
+
+        if self.max_memory_mb and self.page_count and self.page_count % self.memory_check_interval == 0:
+            self.last_rss_mb = self.browser_rss_mb()
+            if self.last_rss_mb and self.last_rss_mb >= self.max_memory_mb:
+                return f"browser using {self.last_rss_mb:.0f} MB"
+
+        return None
+
+    def maybe_recycle(self):
+        """
+        Recycle the browser if a threshold has been reached. Call this between items only.
+
+        Returns:
+            bool: True if the browser was recycled (element references are now stale)
+        """
+        reason = self.should_recycle()
+        if not reason:
+            return False
+        return self.recycle(reason)
+
+    def recycle(self, reason):
+        """
+        Replace the browser with a fresh instance, carrying the cookies over.
+
+        Args:
+            reason (str): Why the browser is being recycled
+
+        Returns:
+            bool: True if the browser was recycled
+        """
+        print(f"Recycling browser ({reason})...")
+        start = time.time()
+        latency_before = self._mean(self.page_latencies[-self.LATENCY_WINDOW:])
+        pages = self.page_count
+
+        try:
+            cookies = self.scraper.driver.get_cookies()
+        except Exception as e:
+            print(f"Could not read cookies before recycling: {e}")
+            return False
+
+        try:
+            self.scraper.driver.quit()
+        except Exception:
+            pass
+
+        self.scraper.driver = self.scraper._create_driver()
+        self.reset()
+
+        # Cookies can only be set on the matching domain
+        self.scraper.driver.get(f"{self.scraper.base_url}/")
+        for cookie in cookies:
+            try:
+                self.scraper.driver.add_cookie(cookie)
+            except Exception as e:
+                print(f"Error adding cookie: {e}")
+        self.scraper.driver.refresh()
+        self.scraper.save_cookies(cookies)
+
+        self.events.append({
+            "reason": reason,
+            "pages": pages,
+            "rss_mb": self.last_rss_mb,
+            "recycle_seconds": time.time() - start,
+            "latency_before": latency_before,
+            "latency_after": None
+        })
+        print(f"Browser recycled in {time.time() - start:.1f}s")
+        return True
+
+    def _mean(self, values):
+        return sum(values) / len(values) if values else None
+
+    def report(self):
+        """
+        Summarize recycle events.
+
+        Returns:
+            dict: Recycle count, cost and estimated page-load time saved
+        """
+        saved = 0.0
+        cost = 0.0
+        for i, event in enumerate(self.events):
+            cost += event["recycle_seconds"]
+            if event["latency_before"] is None or event["latency_after"] is None:
+                continue
+            # Pages served by the fresh browser until the next recycle (or the end of the run)
+            if i + 1 < len(self.events):
+                pages_after = self.events[i + 1]["pages"]
+            else:
+                pages_after = self.page_count
+            saved += (event["latency_before"] - event["latency_after"]) * pages_after
+
+        return {
+            "recycles": len(self.events),
+            "total_pages": self.total_pages,
+            "recycle_seconds": cost,
+            "estimated_seconds_saved": saved - cost,
+            "events": self.events
+        }
+
+    def print_report(self):
+        """Print a summary of recycle events."""
+        report = self.report()
+        if not report["recycles"]:
+            print(f"Browser was not recycled ({report['total_pages']} pages loaded)")
+            return
+        print(f"Browser recycled {report['recycles']} time(s) over {report['total_pages']} pages")
+        for event in report["events"]:
+            after = f"{event['latency_after']:.2f}s" if event["latency_after"] is not None else "n/a"
+            before = f"{event['latency_before']:.2f}s" if event["latency_before"] is not None else "n/a"
+            print(f"- {event['reason']}: page load {before} -> {after}, recycle took {event['recycle_seconds']:.1f}s")
+        print(f"Estimated page-load time saved (net of recycle cost): {report['estimated_seconds_saved']:.1f}s")
@@ -0,0 +1,157 @@
+from selenium import webdriver
+
+
+class BrowserProfile:
+    """
+    Launch settings for the scraper's Chrome instances.
+
+    The scraper only reads a name, a contact overlay and message text, so the
+    lean profile skips everything a human needs to see the page: images,
+    media, fonts, trackers, extensions and animations. Navigation returns as
+    soon as the DOM is ready (page-load strategy `eager`).
+    """
+
+    # URL patterns blocked for each resource type (DevTools Network.setBlockedURLs)
+    RESOURCE_TYPE_PATTERNS = {
+        "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*media.licdn.com/dms/image*"],
+        "media": ["*.mp4", "*.webm", "*.m3u8", "*.mp3", "*dms.licdn.com/playlist*"],
+        "font": ["*.woff", "*.woff2", "*.ttf", "*.otf"],
+    }
+
+    # Third-party and LinkedIn analytics endpoints that never affect page content
+    TRACKER_PATTERNS = [
+        "*px.ads.linkedin.com*",
+        "*linkedin.com/li/track*",
+        "*linkedin.com/sensorCollect*",
+        "*doubleclick.net*",
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*facebook.net*",
+    ]
+
+    # Injected into every document to skip CSS animations and transitions
+    DISABLE_ANIMATIONS_SCRIPT = """
+(function() {
+    var style = document.createElement('style');
+    style.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; }';
+    document.addEventListener('DOMContentLoaded', function() { document.head.appendChild(style); });
+})();
+"""
+
+    def __init__(self, headless=False, blocked_resource_types=None, blocked_url_patterns=None,
+                 block_trackers=True, disable_extensions=True, disable_animations=True,
+                 page_load_strategy="eager", window_size="1280,900"):
+        """
+        Initialize the browser profile.
+
+        Args:
+            headless (bool): Run Chrome without a window
+            blocked_resource_types (list, optional): Resource types to block ("image", "media", "font")
+            blocked_url_patterns (list, optional): Extra URL patterns to block
+            block_trackers (bool): Block known analytics and ad endpoints
+            disable_extensions (bool): Start Chrome without extensions
+            disable_animations (bool): Turn off CSS animations and transitions
+            page_load_strategy (str): Selenium page-load strategy ("normal", "eager" or "none")
+            window_size (str): Window size as "width,height"
+        """
+        self.headless = headless
+        self.blocked_resource_types = list(blocked_resource_types) if blocked_resource_types is not None else ["image", "media", "font"]
+        self.blocked_url_patterns = list(blocked_url_patterns or [])
+        self.block_trackers = block_trackers
+        self.disable_extensions = disable_extensions
+        self.disable_animations = disable_animations
+        self.page_load_strategy = page_load_strategy
+        self.window_size = window_size
+
+    @classmethod
+    def lean(cls, headless=False):
+        """Profile for scraping runs: resource blocking, no extensions or animations, eager loads."""
+        return cls(headless=headless)
+
+    @classmethod
+    def full(cls, headless=False):
+        """Profile matching a stock Chrome: nothing blocked, normal page loads."""
+        return cls(
+            headless=headless,
+            blocked_resource_types=[],
+            block_trackers=False,
+            disable_extensions=False,
+            disable_animations=False,
+            page_load_strategy="normal",
+            window_size=None
+        )
+
+    @classmethod
+    def from_name(cls, name, headless=False):
+        """
+        Build one of the named profiles.
+
+        Args:
+            name (str): "lean" or "full"
+            headless (bool): Run Chrome without a window
+        """
+        profiles = {"lean": cls.lean, "full": cls.full}
+        if name not in profiles:
+            raise ValueError(f"Unknown browser profile '{name}'. Choose from: {', '.join(profiles)}")
+        return profiles[name](headless=headless)
+
+    def blocked_urls(self):
+        """Return every URL pattern to block for this profile."""
+        patterns = []
+        for resource_type in self.blocked_resource_types:
+            patterns.extend(self.RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+        if self.block_trackers:
+            patterns.extend(self.TRACKER_PATTERNS)
+        patterns.extend(self.blocked_url_patterns)
+        return patterns
+
+    def build_options(self):
+        """
+        Build the ChromeOptions for this profile.
+
+        Returns:
+            webdriver.ChromeOptions: Options to pass to webdriver.Chrome
+        """
+        options = webdriver.ChromeOptions()
+        options.page_load_strategy = self.page_load_strategy
+
+        if self.headless:
+            options.add_argument("--headless=new")
+        if self.window_size:
+            options.add_argument(f"--window-size={self.window_size}")
+        if self.disable_extensions:
+            options.add_argument("--disable-extensions")
+            options.add_argument("--disable-component-extensions-with-background-pages")
+        if self.disable_animations:
+            options.add_argument("--force-prefers-reduced-motion")
+        if "image" in self.blocked_resource_types:
+            # Also stop images at the content-settings level, before any request is made
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-sync")
+        options.add_argument("--no-first-run")
+        return options
+
+    def apply(self, driver):
+        """
+        Apply the DevTools-level settings to a freshly started driver.
+
+        Args:
+            driver (webdriver.Chrome): The driver to configure
+        """
+        try:
+            patterns = self.blocked_urls()
+            if patterns:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+            if self.disable_animations:
+                driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": self.DISABLE_ANIMATIONS_SCRIPT})
+        except Exception as e:
+            print(f"Could not apply DevTools settings for browser profile: {e}")
+
+    def describe(self):
+        """Return a short human-readable description of the profile."""
+        return (f"headless={self.headless}, page_load_strategy={self.page_load_strategy}, "
+                f"blocked_types={','.join(self.blocked_resource_types) or 'none'}, "
+                f"blocked_patterns={len(self.blocked_urls())}")
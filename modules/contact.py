@@ -0,0 +1,144 @@
+import csv
+import json
+import hashlib
+from operator import attrgetter
+
+
+class Contact:
+    """
+    A LinkedIn contact as it moves through scraping, enrichment and email generation.
+
+    Uses __slots__ so large batches don't carry a per-instance dict, and
+    every stage reads and writes the same explicitly named fields.
+    """
+
+    __slots__ = (
+        "name",
+        "profile_url",
+        "message",
+        "email",
+        "website",
+        "company",
+        "title",
+        "relevance_score",
+        "cluster_id",
+        "status",
+    )
+
+    FIELDS = __slots__
+    CSV_COLUMNS = FIELDS
+
+    # Column names written by older versions of the scraper
+    LEGACY_KEYS = {"profile url": "profile_url"}
+    CONVERTERS = {"relevance_score": float, "cluster_id": int}
+
+    _values = attrgetter(*FIELDS)
+
+    def __init__(self, name=None, profile_url=None, message=None, email=None, website=None,
+                 company=None, title=None, relevance_score=None, cluster_id=None, status=None):
+        self.name = name
+        self.profile_url = profile_url
+        self.message = message
+        self.email = email
+        self.website = website
+        self.company = company
+        self.title = title
+        self.relevance_score = relevance_score
+        self.cluster_id = cluster_id
+        self.status = status
+
+    def __repr__(self):
+        return f"Contact(name={self.name!r}, profile_url={self.profile_url!r}, email={self.email!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Contact) and self._values(self) == other._values(other)
+
+    @property
+    def key(self):
+        """Stable identifier: the profile URL without query string, or a hash of the message."""
+        if self.profile_url:
+            return self.profile_url.split('?')[0]
+        digest = hashlib.sha1((self.message or "").encode('utf-8')).hexdigest()
+        return f"message:{digest}"
+
+    @property
+    def display_name(self):
+        return self.name or self.profile_url or "Unknown contact"
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a contact from a dictionary, CSV row or database row.
+
+        Unknown keys are ignored, legacy column names are mapped, empty strings
+        become None and numeric fields are converted.
+        """
+        contact = cls()
+        for key, value in data.items():
+            field = cls.LEGACY_KEYS.get(key, key)
+            if field not in cls.FIELDS:
+                continue
+            if value == "":
+                value = None
+            elif value is not None and field in cls.CONVERTERS:
+                value = cls.CONVERTERS[field](value)
+            setattr(contact, field, value)
+        return contact
+
+    def to_dict(self):
+        return dict(zip(self.FIELDS, self._values(self)))
+
+    def update(self, other):
+        """Copy every field that is set on another contact (or dict) onto this one."""
+        if isinstance(other, dict):
+            other = Contact.from_dict(other)
+        for field, value in zip(self.FIELDS, self._values(other)):
+            if value is not None:
+                setattr(self, field, value)
+        return self
+
+    def to_csv_row(self):
+        return ["" if value is None else value for value in self._values(self)]
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def read_csv(cls, filepath):
+        """
+        Read contacts from a CSV file written by write_csv (or by older versions of the scraper).
+
+        Returns:
+            list: Contact objects
+        """
+        with open(filepath, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                return []
+            # Map column positions to fields once instead of building a dict per row
+            columns = [(i, cls.LEGACY_KEYS.get(name, name)) for i, name in enumerate(header)]
+            columns = [(i, field) for i, field in columns if field in cls.FIELDS]
+            contacts = []
+            for row in reader:
+                contact = cls()
+                for i, field in columns:
+                    value = row[i] if i < len(row) else ""
+                    if value == "":
+                        continue
+                    setattr(contact, field, cls.CONVERTERS[field](value) if field in cls.CONVERTERS else value)
+                contacts.append(contact)
+            return contacts
+
+    @classmethod
+    def write_csv(cls, filepath, contacts):
+        """Write contacts to a CSV file with one column per field."""
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(cls.CSV_COLUMNS)
+            writer.writerows(contact.to_csv_row() for contact in contacts)
+        return filepath
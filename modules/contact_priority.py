@@ -0,0 +1,163 @@
+import re
+import time
+
+
+def parse_duration(text):
+    """
+    Parse a duration such as "20m", "1h30m", "90s" or "45" (minutes).
+
+    Returns:
+        float: Seconds
+
+    Raises:
+        ValueError: If the text is not a duration
+    """
+    text = str(text).strip().lower()
+    if re.fullmatch(r"\d+(\.\d+)?", text):
+        return float(text) * 60
+    parts = re.findall(r"(\d+(?:\.\d+)?)\s*([hms])", text)
+    if not parts or re.sub(r"(\d+(?:\.\d+)?)\s*([hms])", "", text).strip():
+        raise ValueError(f"Invalid duration '{text}', use for example 20m, 1h30m or 90s")
+    units = {"h": 3600, "m": 60, "s": 1}
+    return sum(float(value) * units[unit] for value, unit in parts)
+
+
+class Deadline:
+    """
+    Wall-clock deadline shared by the stages of a run.
+
+    Stages ask allows(estimate) before starting the next item, with the
+    mean time an item has taken so far, so work stops before the deadline
+    instead of running past it. A deadline of None never expires.
+    """
+
+    def __init__(self, seconds=None):
+        """
+        Start the clock.
+
+        Args:
+            seconds (float, optional): Time allowed from now
+        """
+        self.seconds = seconds
+        self.expires_at = time.time() + seconds if seconds else None
+
+    @classmethod
+    def parse(cls, text):
+        """Build a deadline from a duration string such as "20m"; None for no deadline."""
+        return cls(parse_duration(text) if text else None)
+
+    @property
+    def enabled(self):
+        return self.expires_at is not None
+
+    def remaining(self):
+        """Seconds left, or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.time())
+
+    def allows(self, estimate=0.0):
+        """Whether an item expected to take `estimate` seconds can still finish in time."""
+        return self.expires_at is None or time.time() + estimate <= self.expires_at
+
+    def describe(self):
+        if self.expires_at is None:
+            return "no deadline"
+        return f"{self.remaining() / 60:.1f} of {self.seconds / 60:.0f} min left"
+
+
+class ContactPrioritizer:
+    """
+    Orders contacts so the most valuable are enriched and emailed first.
+
+    A contact's priority is a weighted sum of three signals in [0, 1]:
+    - recency: how recent the conversation is (position in the messaging
+      list, which LinkedIn sorts by last activity, or when its newest
+      message was first captured)
+    - keywords: its relevance score, and the share of filter terms the
+      message mentions when a keyword filter is given
+    - email: whether an email address is already known, so the contact
+      can get a draft even if enrichment is cut short
+    """
+
+    DEFAULT_WEIGHTS = {"recency": 0.35, "keywords": 0.45, "email": 0.2}
+
+    def __init__(self, weights=None):
+        """
+        Initialize the prioritizer.
+
+        Args:
+            weights (dict, optional): Weight of each signal (defaults to DEFAULT_WEIGHTS)
+        """
+        self.weights = dict(self.DEFAULT_WEIGHTS, **(weights or {}))
+        self.priorities = {}
+
+    @staticmethod
+    def recency_from_order(contacts):
+        """Recency of contacts listed most recent first: 1 for the first, falling to 0 for the last."""
+        if len(contacts) < 2:
+            return {contact.key: 1.0 for contact in contacts}
+        return {contact.key: 1 - i / (len(contacts) - 1) for i, contact in enumerate(contacts)}
+
+    @staticmethod
+    def recency_from_timestamps(timestamps):
+        """
+        Recency from ISO timestamps: 1 for the newest, 0 for the oldest.
+
+        Args:
+            timestamps (dict): Contact key -> ISO timestamp
+        """
+        if not timestamps:
+            return {}
+        ordered = sorted(set(timestamps.values()))
+        if len(ordered) < 2:
+            return {key: 1.0 for key in timestamps}
+        position = {stamp: i / (len(ordered) - 1) for i, stamp in enumerate(ordered)}
+        return {key: position[stamp] for key, stamp in timestamps.items()}
+
+    def keyword_strength(self, contact, keywords=None):
+        """Relevance score mapped to [0, 1], averaged with the share of filter terms found."""
+        strength = ((contact.relevance_score or 0.0) + 1) / 2
+        if keywords is not None and keywords.terms:
+            coverage = len(keywords.find_terms(contact.message or "")) / len(keywords.terms)
+            strength = (strength + coverage) / 2
+        return strength
+
+    def priority(self, contact, recency=0.0, keywords=None, email_known=False):
+        return round(
+            self.weights["recency"] * recency
+            + self.weights["keywords"] * self.keyword_strength(contact, keywords)
+            + self.weights["email"] * (1.0 if email_known else 0.0),
+            4
+        )
+
+    def prioritize(self, contacts, recency=None, keywords=None, known_emails=None):
+        """
+        Sort contacts highest priority first.
+
+        Args:
+            contacts (list): Contact objects
+            recency (dict, optional): Contact key -> recency in [0, 1] (defaults to the list order)
+            keywords (KeywordMatcher, optional): The filter the contacts matched
+            known_emails (set, optional): Keys of contacts with a known email, besides those with contact.email set
+
+        Returns:
+            list: The contacts, highest priority first
+        """
+        if recency is None:
+            recency = self.recency_from_order(contacts)
+        known_emails = known_emails or set()
+        self.priorities = {
+            contact.key: self.priority(contact, recency.get(contact.key, 0.0), keywords,
+                                       bool(contact.email) or contact.key in known_emails)
+            for contact in contacts
+        }
+        return sorted(contacts, key=lambda contact: self.priorities[contact.key], reverse=True)
+
+    def describe(self, contacts):
+        """One line with the priority range of the first and last contacts."""
+        if not contacts:
+            return "no contacts"
+        first = self.priorities.get(contacts[0].key, 0.0)
+        last = self.priorities.get(contacts[-1].key, 0.0)
+        return f"{len(contacts)} contacts, priority {first:.2f} down to {last:.2f}"
@@ -0,0 +1,293 @@
+import os
+import hashlib
+import sqlite3
+from datetime import datetime
+
+from modules.contact import Contact
+
+
+class ContactStore:
+    """
+    SQLite-backed store of every contact seen across runs.
+
+    Contacts are upserted on their profile URL, so re-scraping a contact
+    updates it instead of duplicating it. Each pipeline stage (scraped,
+    enriched, generated, drafted) stamps its own column and advances the
+    status, and every write happens in a single transaction.
+
+    The store also keeps every captured message of each conversation, so a
+    later run only has to add the events newer than the last stored one.
+    """
+
+    STAGES = ("scraped", "enriched", "generated", "drafted")
+    FIELDS = tuple(field for field in Contact.FIELDS if field not in ("profile_url", "status"))
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    profile_url TEXT PRIMARY KEY,
+    name TEXT,
+    message TEXT,
+    email TEXT,
+    website TEXT,
+    company TEXT,
+    title TEXT,
+    relevance_score REAL,
+    cluster_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'scraped',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    scraped_at TEXT,
+    enriched_at TEXT,
+    generated_at TEXT,
+    drafted_at TEXT,
+    email_content TEXT,
+    draft_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_contacts_email ON contacts(email);
+CREATE INDEX IF NOT EXISTS idx_contacts_status ON contacts(status, last_seen);
+CREATE INDEX IF NOT EXISTS idx_contacts_last_seen ON contacts(last_seen);
+CREATE INDEX IF NOT EXISTS idx_contacts_pending ON contacts(last_seen)
+    WHERE email IS NOT NULL AND generated_at IS NULL;
+CREATE TABLE IF NOT EXISTS conversation_events (
+    conversation_key TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    contact_key TEXT,
+    sender TEXT,
+    sent_at TEXT,
+    body TEXT,
+    captured_at TEXT NOT NULL,
+    PRIMARY KEY (conversation_key, event_id)
+);
+CREATE INDEX IF NOT EXISTS idx_events_conversation ON conversation_events(conversation_key, seq);
+CREATE INDEX IF NOT EXISTS idx_events_contact ON conversation_events(contact_key, captured_at, seq);
+"""
+
+    def __init__(self, db_path=None):
+        """
+        Open (and create if needed) the contact store.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database file
+        """
+        self.db_path = db_path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "contacts.db"
+        )
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def contact_key(contact):
+        """Return the key a contact is stored under."""
+        return contact.key
+
+    def _stage_rank_sql(self, column):
+        cases = " ".join(f"WHEN '{stage}' THEN {rank}" for rank, stage in enumerate(self.STAGES))
+        return f"(CASE {column} {cases} ELSE -1 END)"
+
+    def _upsert_sql(self, stage):
+        columns = ("profile_url",) + self.FIELDS
+        updates = ", ".join(f"{field} = COALESCE(excluded.{field}, contacts.{field})" for field in self.FIELDS)
+        return f"""
+INSERT INTO contacts ({', '.join(columns)}, status, first_seen, last_seen, {stage}_at)
+VALUES ({', '.join('?' for _ in columns)}, ?, ?, ?, ?)
+ON CONFLICT(profile_url) DO UPDATE SET
+    {updates},
+    last_seen = excluded.last_seen,
+    {stage}_at = excluded.{stage}_at,
+    status = CASE WHEN {self._stage_rank_sql('excluded.status')} > {self._stage_rank_sql('contacts.status')}
+                  THEN excluded.status ELSE contacts.status END
+"""
+
+    def _upsert_rows(self, contacts, stage):
+        now = datetime.now().isoformat()
+        rows = []
+        for contact in contacts:
+            values = [contact.key] + [getattr(contact, field) for field in self.FIELDS]
+            rows.append(values + [stage, now, now, now])
+        return rows
+
+    def upsert_contacts(self, contacts, stage="scraped"):
+        """
+        Insert or update contacts and record that they reached a stage.
+
+        Fields that are empty in the new data keep their stored value, and the
+        status never moves backwards.
+
+        Args:
+            contacts (list): Contact objects
+            stage (str): Pipeline stage the contacts just completed
+        """
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown stage '{stage}'")
+        with self.conn:
+            self.conn.executemany(self._upsert_sql(stage), self._upsert_rows(contacts, stage))
+
+    def mark_generated(self, contact, email_content):
+        """Record the email generated for a contact."""
+        self._mark(contact, "generated", email_content=email_content)
+
+    def mark_drafted(self, contact, draft_id):
+        """Record the Gmail draft created for a contact."""
+        self._mark(contact, "drafted", draft_id=draft_id)
+
+    def _mark(self, contact, stage, **fields):
+        # Upsert the contact and stamp the stage-specific columns in one transaction
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.conn:
+            self.conn.executemany(self._upsert_sql(stage), self._upsert_rows([contact], stage))
+            self.conn.execute(f"UPDATE contacts SET {assignments} WHERE profile_url = ?",
+                              list(fields.values()) + [contact.key])
+
+    def get_contacts(self, status=None, has_email=None, pending_generation=False, limit=None):
+        """
+        Query contacts.
+
+        Args:
+            status (str, optional): Only contacts with this status
+            has_email (bool, optional): Only contacts with (True) or without (False) an email address
+            pending_generation (bool): Only contacts with an email and no generated draft yet
+            limit (int, optional): Maximum number of contacts to return
+
+        Returns:
+            list: Contact objects, most recently seen first
+        """
+        clauses = []
+        params = []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if has_email is True or pending_generation:
+            clauses.append("email IS NOT NULL")
+        elif has_email is False:
+            clauses.append("email IS NULL")
+        if pending_generation:
+            # Matches the partial index idx_contacts_pending
+            clauses.append("generated_at IS NULL")
+
+        sql = "SELECT * FROM contacts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY last_seen DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        contacts = []
+        for row in self.conn.execute(sql, params):
+            contact = Contact.from_dict(dict(row))
+            # Contacts without a profile URL are stored under a message hash
+            if contact.profile_url and contact.profile_url.startswith("message:"):
+                contact.profile_url = None
+            contacts.append(contact)
+        return contacts
+
+    def generated_keys(self):
+        """Return the keys of every contact that already has a generated email."""
+        rows = self.conn.execute("SELECT profile_url FROM contacts WHERE generated_at IS NOT NULL")
+        return {row["profile_url"] for row in rows}
+
+    def email_keys(self):
+        """Return the keys of every contact with a known email address."""
+        rows = self.conn.execute("SELECT profile_url FROM contacts WHERE email IS NOT NULL")
+        return {row["profile_url"] for row in rows}
+
+    def last_activity(self):
+        """Return when the newest message exchanged with each contact was first captured, keyed on contact key."""
+        rows = self.conn.execute(
+            "SELECT contact_key, MAX(captured_at) AS captured_at FROM conversation_events "
+            "WHERE contact_key IS NOT NULL GROUP BY contact_key"
+        )
+        return {row["contact_key"]: row["captured_at"] for row in rows}
+
+    def count_by_status(self):
+        """Return the number of contacts in each status."""
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM contacts GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    @staticmethod
+    def event_id(event):
+        """Return the id of a conversation event, hashing its content when LinkedIn gave none."""
+        if event.get("event_id"):
+            return event["event_id"]
+        content = "\x1f".join(event.get(field) or "" for field in ("sender", "sent_at", "body"))
+        return "hash:" + hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def last_event_id(self, conversation_key):
+        """Return the id of the newest stored event of a conversation, or None."""
+        row = self.conn.execute(
+            "SELECT event_id FROM conversation_events WHERE conversation_key = ? ORDER BY seq DESC LIMIT 1",
+            (conversation_key,)
+        ).fetchone()
+        return row["event_id"] if row else None
+
+    def add_events(self, conversation_key, events, contact_key=None):
+        """
+        Append events to a conversation, ignoring the ones already stored.
+
+        Args:
+            conversation_key (str): Stable identifier of the conversation
+            events (list): Event dictionaries (sender, sent_at, body, event_id), oldest first
+            contact_key (str, optional): Key of the contact the conversation is with
+
+        Returns:
+            int: Number of events added
+        """
+        now = datetime.now().isoformat()
+        with self.conn:
+            row = self.conn.execute("SELECT MAX(seq) AS seq FROM conversation_events WHERE conversation_key = ?",
+                                    (conversation_key,)).fetchone()
+            next_seq = (row["seq"] or 0) + 1
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO conversation_events "
+                "(conversation_key, event_id, seq, contact_key, sender, sent_at, body, captured_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(conversation_key, self.event_id(event), next_seq + i, contact_key,
+                  event.get("sender"), event.get("sent_at"), event.get("body"), now)
+                 for i, event in enumerate(events)]
+            )
+            return self.conn.total_changes - before
+
+    def recent_events(self, contact_key, limit=10):
+        """
+        Return the most recent events exchanged with a contact.
+
+        Args:
+            contact_key (str): Key of the contact
+            limit (int): Maximum number of events
+
+        Returns:
+            list: Event dictionaries, oldest first
+        """
+        rows = self.conn.execute(
+            "SELECT sender, sent_at, body FROM conversation_events WHERE contact_key = ? "
+            "ORDER BY captured_at DESC, seq DESC LIMIT ?",
+            (contact_key, limit)
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def export_csv(self, filepath, contacts=None):
+        """
+        Export contacts to a CSV file.
+
+        Args:
+            filepath (str): Destination path
+            contacts (list, optional): Contacts to export (defaults to every stored contact)
+
+        Returns:
+            str: The path written
+        """
+        if contacts is None:
+            contacts = self.get_contacts()
+        return Contact.write_csv(filepath, contacts)
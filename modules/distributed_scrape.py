@@ -0,0 +1,326 @@
+import time
+
+from modules.contact import Contact
+from modules.contact_priority import Deadline
+from modules.instrumentation import metrics
+from modules.keyword_matcher import KeywordMatcher
+from modules.work_queue import WorkQueue
+
+
+THREAD_TASK = "thread"
+PROFILE_TASK = "profile"
+
+
+class LeaseLost(Exception):
+    """The lease on a task expired mid-task and another worker may have claimed it."""
+
+
+class ScrapeWorker:
+    """
+    Works scraping tasks from a shared WorkQueue with its own browser session.
+
+    Each worker runs a LinkedInScraper with its own Chrome and cookie file,
+    possibly logged into its own account. A thread task opens a conversation
+    by URL and returns its events and the matching contact (or nothing); a
+    profile task enriches one contact with its email and website. Run
+    several workers, on one machine or several sharing the queue file, to
+    scale throughput. Workers store events in their own contact store too,
+    but only the coordinator's store receives every conversation.
+    """
+
+    def __init__(self, scraper, queue, worker_id, poll_interval=5):
+        """
+        Initialize the worker.
+
+        Args:
+            scraper (LinkedInScraper): Scraper owning this worker's browser
+            queue (WorkQueue): The shared queue
+            worker_id (str): Name of this worker in the queue (hostname-pid by default in main.py)
+            poll_interval (float): Seconds to wait before polling an empty queue again
+        """
+        self.scraper = scraper
+        self.queue = queue
+        self.worker_id = worker_id
+        self.poll_interval = poll_interval
+        self.processed = {THREAD_TASK: 0, PROFILE_TASK: 0}
+        self.failed = 0
+        self.task_seconds = 0.0
+        self._keywords = None
+
+    def keywords(self):
+        """The run's keyword filter, as published by the coordinator."""
+        if self._keywords is None:
+            expression = self.queue.get_meta("keywords")
+            self._keywords = KeywordMatcher(expression, whole_words=self.queue.get_meta("whole_words", True))
+        return self._keywords
+
+    def deadline_allows(self):
+        """Whether a task of this worker's mean duration still ends before the run's deadline."""
+        expires_at = self.queue.get_meta("deadline_at")
+        if expires_at is None:
+            return True
+        tasks = sum(self.processed.values()) + self.failed
+        return time.time() + (self.task_seconds / tasks if tasks else 0.0) <= expires_at
+
+    def renew(self, task):
+        """
+        Extend the lease on a task between two of its steps.
+
+        Raises:
+            LeaseLost: If the lease already ran out
+        """
+        if not self.queue.extend(task["id"], self.worker_id):
+            raise LeaseLost(task["key"])
+
+    def process(self, task):
+        """
+        Run one task in this worker's browser, renewing its lease between steps.
+
+        A step that hangs for longer than the lease still loses the task to
+        another worker, as intended.
+
+        Returns:
+            dict: For a thread, its contact key, events and matching contact (None if it did not
+                match); for a profile, the enriched contact
+        """
+        # Recycle the browser between tasks if it has grown too large
+        self.scraper.lifecycle.maybe_recycle()
+        if not self.scraper.is_browser_window_open() and not self.scraper.restart_browser_if_needed():
+            raise RuntimeError("browser could not be restarted")
+        self.renew(task)
+
+        if task["kind"] == THREAD_TASK:
+            self.scraper.navigate(task["key"])
+            self.renew(task)
+            self.scraper.handle_page_challenges()
+            self.renew(task)
+            self.scraper.last_conversation = None
+            contact = self.scraper.read_open_thread(task["key"], self.keywords())
+            # The events go back with the result, so the coordinator's store gets them whatever store this worker uses
+            _, contact_key, events = self.scraper.last_conversation or (None, None, [])
+            return {
+                "contact": contact.to_dict() if contact is not None else None,
+                "contact_key": contact_key,
+                "events": events
+            }
+
+        if task["kind"] == PROFILE_TASK:
+            contact = Contact.from_dict(task["payload"])
+            if self.scraper.extract_single_profile(contact, on_loaded=lambda: self.renew(task)) is None:
+                raise RuntimeError("browser could not be restarted")
+            return contact.to_dict()
+
+        raise ValueError(f"Unknown task kind: {task['kind']}")
+
+    def run_once(self, kinds=None):
+        """
+        Claim and run one task.
+
+        Returns:
+            bool: Whether a task was claimed
+        """
+        # Past the deadline, tasks stay pending for the next run
+        if not self.deadline_allows():
+            return False
+        task = self.queue.claim(self.worker_id, kinds)
+        if task is None:
+            return False
+
+        print(f"[{self.worker_id}] {task['kind']} task {task['key']} (attempt {task['attempts']})")
+        started = time.time()
+        try:
+            result = self.process(task)
+        except LeaseLost:
+            print(f"[{self.worker_id}] Lease on {task['key']} expired, another worker took it over")
+            return True
+        except Exception as e:
+            print(f"[{self.worker_id}] Error processing {task['kind']} task: {str(e)}")
+            self.queue.fail(task["id"], self.worker_id, e)
+            self.failed += 1
+            self.task_seconds += time.time() - started
+            return True
+        self.task_seconds += time.time() - started
+
+        if not self.queue.complete(task["id"], self.worker_id, result):
+            print(f"[{self.worker_id}] Lease on {task['key']} expired, another worker took it over")
+        else:
+            self.processed[task["kind"]] += 1
+        return True
+
+    def run(self, use_cookies=True):
+        """
+        Work tasks until the coordinator marks the run finished.
+
+        Args:
+            use_cookies (bool): Restore the session from saved cookies before logging in
+
+        Returns:
+            dict: Number of tasks completed per kind
+        """
+        if not self.scraper.restore_session(use_cookies):
+            print(f"[{self.worker_id}] Could not log in to LinkedIn, not joining the run")
+            return self.processed
+
+        print(f"[{self.worker_id}] Working tasks from {self.queue.path}")
+        while True:
+            if self.run_once():
+                continue
+            if self.queue.get_meta("finished", False):
+                break
+            time.sleep(self.poll_interval)
+
+        self.scraper.selectors.save()
+        print(f"[{self.worker_id}] Run finished: {self.processed[THREAD_TASK]} threads and "
+              f"{self.processed[PROFILE_TASK]} profiles done, {self.failed} failed attempts")
+        return self.processed
+
+
+class ScrapeCoordinator:
+    """
+    Splits a scraping run into queue tasks and gathers the results.
+
+    The coordinator loads the conversation list once and queues one thread
+    task per conversation. When every thread is done it ranks and clusters
+    the matches (as scrape_linkedin does) and queues one profile task per
+    kept contact, highest priority first. It works tasks itself with its own
+    browser while waiting, so a single coordinator behaves like a normal run.
+    """
+
+    def __init__(self, scraper, queue, worker_id, poll_interval=5):
+        """
+        Initialize the coordinator.
+
+        Args:
+            scraper (LinkedInScraper): Scraper used to list conversations and to work tasks
+            queue (WorkQueue): The shared queue
+            worker_id (str): Name of the coordinator's own worker
+            poll_interval (float): Seconds between progress checks while other workers hold the last tasks
+        """
+        self.scraper = scraper
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.worker = ScrapeWorker(scraper, queue, worker_id, poll_interval)
+
+    def seed(self, keywords, max_threads):
+        """
+        Queue a thread task for each of the first `max_threads` conversations.
+
+        Returns:
+            int: Number of tasks queued
+        """
+        print("Looking for message threads...")
+        chat_threads = self.scraper._load_chat_threads(max_threads)
+        keys = [self.scraper._thread_key(thread, i) for i, thread in enumerate(chat_threads[:max_threads])]
+
+        # Workers open conversations by URL, so list items without a link cannot be shared out
+        urls = [key for key in keys if key.startswith("http")]
+        if len(urls) < len(keys):
+            print(f"Skipping {len(keys) - len(urls)} conversations without a link")
+
+        # Publish the filter before the tasks, workers read it on their first claim
+        self.queue.set_meta("keywords", keywords.describe())
+        self.queue.set_meta("whole_words", keywords.whole_words)
+        self.queue.set_meta("finished", False)
+        added = self.queue.enqueue_many(THREAD_TASK, [(url, None, 0) for url in urls])
+        self.queue.set_meta("phase", THREAD_TASK)
+        print(f"Queued {added} conversations in {self.queue.path}")
+        return added
+
+    def _drain(self, kind):
+        """Work tasks of a kind until none is pending or leased, or only pending ones the deadline leaves over."""
+        last_report = 0
+        while True:
+            if self.worker.run_once((kind,)):
+                continue
+            counts = self.queue.counts(kind)
+            if not counts[WorkQueue.LEASED] and (not counts[WorkQueue.PENDING] or not self.worker.deadline_allows()):
+                return counts
+            if time.time() - last_report > 30:
+                print(f"Waiting for other workers: {counts[WorkQueue.LEASED]} {kind} tasks in progress")
+                last_report = time.time()
+            time.sleep(self.poll_interval)
+
+    def _stop_at_deadline(self, counts, kind):
+        """End a run cut short by the deadline, leaving the pending tasks for --coordinator --resume."""
+        print(f"Deadline reached: {counts[WorkQueue.PENDING]} {kind} tasks left in the queue, "
+              f"run with --coordinator --resume to process them")
+        metrics.increment("deferred", counts[WorkQueue.PENDING], stage=f"{kind}s")
+        self.queue.set_meta("finished", True)
+
+    def run(self, keywords, max_threads=10, resume=False, top_n=None, min_score=None, deadline=None, use_cookies=True):
+        """
+        Run the distributed scrape to the end, or until the deadline.
+
+        Args:
+            keywords (KeywordMatcher): Filter applied to every conversation
+            max_threads (int): Maximum number of conversations to process
+            resume (bool): Continue the run already in the queue instead of starting over
+            top_n (int, optional): Only enrich the N most relevant contacts
+            min_score (float, optional): Only enrich contacts scoring at least this relevance
+            deadline (Deadline, optional): No worker starts a task that would end after it
+            use_cookies (bool): Restore the session from saved cookies before logging in
+
+        Returns:
+            list: The enriched contacts, highest priority first
+        """
+        deadline = deadline or Deadline()
+        if not self.scraper.restore_session(use_cookies):
+            print("Could not log in to LinkedIn. Aborting scraping.")
+            return []
+
+        if resume and self.queue.get_meta("phase"):
+            print(f"Resuming the run in {self.queue.path}: {self.queue.counts()}")
+            self.queue.set_meta("finished", False)
+        else:
+            self.queue.reset()
+            self.seed(keywords, max_threads)
+        # Workers compare it with their own clock, so machines sharing a queue need synchronized clocks
+        self.queue.set_meta("deadline_at", deadline.expires_at)
+        if deadline.enabled:
+            print(f"Deadline: {deadline.describe()}")
+
+        counts = self._drain(THREAD_TASK)
+        print(f"Conversations done: {counts[WorkQueue.DONE]}, failed: {counts[WorkQueue.FAILED]}")
+        if counts[WorkQueue.PENDING]:
+            # Ranking needs every conversation, so profiles are only queued once all are read
+            self._stop_at_deadline(counts, THREAD_TASK)
+            return []
+
+        if self.queue.get_meta("phase") == THREAD_TASK:
+            matches = []
+            for key, result in self.queue.results(THREAD_TASK):
+                if not result:
+                    continue
+                # Events already stored are ignored, so a worker sharing this store adds nothing twice
+                if result["events"]:
+                    self.scraper.contact_store.add_events(key, result["events"], contact_key=result["contact_key"])
+                if result["contact"]:
+                    matches.append(Contact.from_dict(result["contact"]))
+            print(f"{len(matches)} conversations matched the keywords")
+            if matches:
+                matches = self.scraper.rank_and_cluster(matches, top_n=top_n, min_score=min_score, keywords=keywords)
+            # Queue priorities follow the enrichment order, so the most valuable contacts go first
+            self.queue.enqueue_many(PROFILE_TASK, [
+                (contact.key, contact.to_dict(), len(matches) - rank) for rank, contact in enumerate(matches)
+            ])
+            self.queue.set_meta("phase", PROFILE_TASK)
+
+        counts = self._drain(PROFILE_TASK)
+        print(f"Profiles done: {counts[WorkQueue.DONE]}, failed: {counts[WorkQueue.FAILED]}")
+        self.scraper.selectors.save()
+        self.scraper.selectors.print_report()
+
+        # Results come back in queue order, which is the enrichment order. Only finished
+        # profiles are marked enriched, those left by the deadline stay at the scraped stage
+        contacts = [Contact.from_dict(result) for _, result in self.queue.results(PROFILE_TASK) if result]
+        if contacts:
+            self.scraper.contact_store.upsert_contacts(contacts, "enriched")
+        if counts[WorkQueue.PENDING]:
+            self._stop_at_deadline(counts, PROFILE_TASK)
+        else:
+            self.queue.set_meta("finished", True)
+
+        print("\nTasks done per worker:")
+        for worker, done in sorted(self.queue.worker_stats().items()):
+            print(f"- {worker}: " + ", ".join(f"{n} {kind}s" for kind, n in sorted(done.items())))
+        return contacts
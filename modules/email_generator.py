@@ -1,37 +1,85 @@
 import os
 import sys
-import csv
+import argparse
 import json
 import time
-import random
-import requests
+import re
 from datetime import datetime
 
 # Add the parent directory to the path to import from config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.credentials import DEEPSEEK_API_KEY
 from modules.gmail_integration import GmailIntegration
-from modules.email_prompt_template import get_email_prompt_template
+from modules.email_prompt_template import get_email_prompt_template, get_email_system_prompt
 from modules.gmail_checker import GmailChecker
+from modules.relevance_scorer import RelevanceScorer
+from modules.near_duplicates import NearDuplicateIndex
+from modules.contact_store import ContactStore
+from modules.contact import Contact
+from modules.prompt_builder import PromptBuilder, estimate_tokens
+from modules.llm_backends import load_backends, APIError
+from modules.usage_ledger import UsageLedger, RunBudget
+from modules.instrumentation import metrics
+from modules.profiling import profiler
+from modules.rate_scheduler import rate_scheduler, is_throttle
+from modules.mbox_export import MboxExporter
+from modules.contact_priority import ContactPrioritizer, Deadline
+from modules.template_tier import TemplateTier
 
 class EmailGenerator:
-    def __init__(self, api_key=None, use_gmail=False, check_sent_emails=False):
-        """Initialize the EmailGenerator with DeepSeek API key."""
+    def __init__(self, api_key=None, use_gmail=False, check_sent_emails=False, reuse_duplicates=True, contact_store=None,
+                 conversation_window=10, max_conversation_chars=4000, max_prompt_tokens=1500, llm=None, llm_config=None,
+                 budget=None, template_tier=True):
+        """Initialize the EmailGenerator with DeepSeek API key and the LLM backends from config/llm_backends.json."""
         self.api_key = api_key or DEEPSEEK_API_KEY
-        self.api_url = "https://api.deepseek.com/v1/chat/completions"
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        # Completions go through the configured backends, hedging slow calls when there are several
+        self.llm = llm or load_backends(llm_config, api_key=self.api_key)
         self.use_gmail = use_gmail
         self.gmail_integration = GmailIntegration() if use_gmail else None
         self.check_sent_emails = check_sent_emails
         self.gmail_checker = GmailChecker() if check_sent_emails else None
         
-        # Follow-up email template
-        self.template = """
-Subject: {topic}
+        # Generated emails and drafts are recorded against the contact in the store
+        self.contact_store = contact_store
+        
+        # The prompt only carries the most recent part of each conversation
+        self.conversation_window = conversation_window
+        self.max_conversation_chars = max_conversation_chars
+        
+        # Near-identical messages share one completion instead of one API call each
+        self.duplicate_index = NearDuplicateIndex() if reuse_duplicates else None
+        self.api_calls = 0
+        self.reused_completions = 0
+        
+        # Static instructions go first as the system prompt so the API's prefix cache can reuse them;
+        # the per-contact template is compiled once and every prompt is kept under the token budget
+        self.system_prompt = get_email_system_prompt()
+        self.prompt_builder = PromptBuilder(get_email_prompt_template(), max_input_tokens=max_prompt_tokens,
+                                            prefix=self.system_prompt)
+        # Contacts without a stored thread only have their message, which is not repeated as a conversation
+        self.message_prompt_builder = PromptBuilder(get_email_prompt_template(with_conversation=False),
+                                                    max_input_tokens=max_prompt_tokens, prefix=self.system_prompt)
+        
+        # Tokens and money spent, and the limits a batch must stay within. Close to a limit,
+        # prompts drop the conversation history and use a tighter budget
+        self.ledger = UsageLedger()
+        self.budget = budget or RunBudget()
+        self.degraded = False
+        self.short_prompt_builder = PromptBuilder(get_email_prompt_template(with_conversation=False),
+                                                  max_input_tokens=max_prompt_tokens // 2,
+                                                  max_field_tokens={"message": 150}, prefix=self.system_prompt)
+        
+        # Orders each batch so recent contacts with a known email are generated first
+        self.prioritizer = ContactPrioritizer()
         
+        # Low-signal messages ("thanks for connecting") get a local template instead of an API call
+        self.template_tier = TemplateTier.from_config() if template_tier else None
+        self.routing = self._new_routing()
+        
+        # Follow-up email template. Subject and body are also formatted separately,
+        # so exports and drafts never have to parse them back out of the text
+        self.subject_template = "{topic}"
+        self.body_template = """
 {personalized_intro}
 
 {main_content}
@@ -40,22 +88,28 @@ Subject: {topic}
 
 {signature}
 """
+        self.template = "\nSubject: " + self.subject_template + "\n" + self.body_template
     
+    @metrics.timed("generate_email")
     def generate_email(self, contact_data, custom_prompt=None):
         """
-        Generate a personalized email for a contact using the DeepSeek API.
+        Generate a personalized email for a contact using the DeepSeek API, or a local
+        template when the conversation carries too little for a completion to help.
         
         Args:
-            contact_data (dict): Dictionary containing contact information
+            contact_data (Contact or dict): The contact to write to
             custom_prompt (str, optional): Custom prompt to use instead of the default
             
         Returns:
             dict: Dictionary containing the generated email and metadata
         """
+        if isinstance(contact_data, dict):
+            contact_data = Contact.from_dict(contact_data)
+        
         try:
             # Check if we've already sent an email to this contact
             if self.check_sent_emails and self.gmail_checker:
-                email = contact_data.get('email')
+                email = contact_data.email
                 if email:
                     if self.gmail_checker.check_if_email_sent(email):
                         print(f"Email already sent to {email} in the past 30 days. Skipping.")
@@ -64,70 +118,310 @@ Subject: {topic}
                             "skipped": True,
                             "reason": "Email already sent",
                             "last_email_date": last_email_date,
-                            "contact": contact_data
+                            "contact": contact_data.to_dict()
                         }
             
+            # Answer low-signal conversations from a template, only substantive ones need the LLM
+            if self.template_tier is not None and not custom_prompt:
+                start = time.time()
+                route, reason, language = self.template_tier.classifier.classify(self._contact_text(contact_data))
+                metrics.increment("email_route", route=route)
+                if route == "template":
+                    topics = self.template_tier.render(contact_data, language)
+                    self.routing["template"] += 1
+                    self.routing["template_seconds"] += time.time() - start
+                    return {
+                        **self._email_parts(contact_data, topics),
+                        "topics": topics,
+                        "contact": contact_data.to_dict(),
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "model": "template",
+                        "template_language": language,
+                        "route_reason": reason
+                    }
+            
+            # Reuse the completion of a near-identical message if we already have one
+            cluster_id = None
+            if self.duplicate_index is not None and not custom_prompt:
+                cluster_id = self.duplicate_index.cluster_for(contact_data.message or "", record=False)
+                cached = self.duplicate_index.get_completion(cluster_id)
+                if cached:
+                    self.reused_completions += 1
+                    self.routing["reused"] += 1
+                    topics = self._adapt_topics(cached, contact_data)
+                    return {
+                        **self._email_parts(contact_data, topics),
+                        "topics": topics,
+                        "contact": contact_data.to_dict(),
+                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "model": "reused",
+                        "reused_from_cluster": cluster_id
+                    }
+            
             # Create the prompt for the AI
-            prompt = custom_prompt or self._create_default_prompt(contact_data)
+            if custom_prompt:
+                prompt_stats = {"prompt_tokens": estimate_tokens(self.system_prompt) + estimate_tokens(custom_prompt),
+                                "truncated": []}
+                prompt = custom_prompt
+            else:
+                prompt, prompt_stats = self._create_default_prompt(contact_data)
             
-            # Call the DeepSeek API
-            response = self._call_deepseek_api(prompt)
+            # Call the DeepSeek API at the pace it currently accepts, slowing down when it pushes back
+            rate_scheduler.acquire("llm")
+            self.api_calls += 1
+            # Counted only when the backend is called, not for completions reused from a cluster
+            self.routing["llm"] += 1
+            start = time.time()
+            try:
+                response = self._call_llm(prompt)
+            except APIError as e:
+                if is_throttle(e):
+                    rate_scheduler.throttled("llm", f"http_{e.status_code}", e.retry_after)
+                raise
+            rate_scheduler.success("llm")
+            self.routing["llm_calls"] += 1
+            self.routing["llm_seconds"] += time.time() - start
             
             if "error" in response:
                 return {"error": response["error"]}
             
+            usage = self._record_usage(contact_data, response, prompt_stats)
+            
             # Extract the generated email content
-            email_content = response.get("choices", [{}])[0].get("message", {}).get("content", "")
+            choice = response.get("choices", [{}])[0]
+            email_content = choice.get("message", {}).get("content", "")
+            if choice.get("finish_reason") == "length":
+                print(f"Warning: completion for {contact_data.display_name} hit the {self.prompt_builder.max_completion_tokens} token limit")
             
             # Extract topics from the email content
             topics = self._extract_topics(email_content)
             
-            # Format the email with the template
-            formatted_email = self.template.format(
-                name=contact_data.get("name", "there"),
-                topic=topics.get("topic", "our conversation"),
-                personalized_intro=topics.get("personalized_intro", ""),
-                main_content=topics.get("main_content", ""),
-                call_to_action=topics.get("call_to_action", ""),
-                signature=topics.get("signature", "Best regards,\nKarim Abbes\nhttps://www.linkedin.com/in/karimabbes/"),
-            )
+            if cluster_id is not None and topics.get("main_content"):
+                self.duplicate_index.set_completion(cluster_id, topics, contact_data)
             
             return {
-                "email_content": formatted_email,
+                **self._email_parts(contact_data, topics),
                 "topics": topics,
-                "contact": contact_data,
+                "contact": contact_data.to_dict(),
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "model": response.get("model", "deepseek-chat")
+                "model": response.get("model", "deepseek-chat"),
+                "backend": response.get("backend"),
+                "usage": usage
             }
             
         except Exception as e:
             return {"error": str(e)}
     
+    @staticmethod
+    def _new_routing():
+        return {"template": 0, "reused": 0, "llm": 0, "template_seconds": 0.0, "llm_calls": 0, "llm_seconds": 0.0}
+    
+    def routing_summary(self):
+        """
+        Summarize how the batch's contacts were routed and what the template tier saved.
+        
+        Time saved is the mean LLM call latency of the batch minus the mean template
+        render time, for every templated contact; cost saved uses the mean cost per call.
+        
+        Returns:
+            dict: Contacts answered from templates, from reused completions and by LLM calls,
+                and the estimated seconds and USD saved by the templates
+        """
+        routing = self.routing
+        summary = {"template": routing["template"], "reused": routing["reused"], "llm": routing["llm"],
+                   "estimated_seconds_saved": None, "estimated_cost_saved_usd": None}
+        if routing["template"] and routing["llm_calls"]:
+            per_call = routing["llm_seconds"] / routing["llm_calls"] - routing["template_seconds"] / routing["template"]
+            summary["estimated_seconds_saved"] = round(routing["template"] * per_call, 1)
+        if routing["template"] and self.ledger.calls:
+            summary["estimated_cost_saved_usd"] = round(routing["template"] * self.ledger.cost / self.ledger.calls, 6)
+        return summary
+    
+    def _template_values(self, contact_data, topics):
+        return {
+            "name": contact_data.name or "there",
+            "topic": topics.get("topic") or "our conversation",
+            "personalized_intro": topics.get("personalized_intro", ""),
+            "main_content": topics.get("main_content", ""),
+            "call_to_action": topics.get("call_to_action", ""),
+            "signature": topics.get("signature", "Best regards,\nKarim Abbes\nhttps://www.linkedin.com/in/karimabbes/"),
+        }
+    
+    def _email_parts(self, contact_data, topics):
+        """
+        Format the email sections with the templates, subject and body separately.
+        
+        Returns:
+            dict: email_content (subject line and body, as stored), subject and body
+        """
+        values = self._template_values(contact_data, topics)
+        return {
+            "email_content": self.template.format(**values),
+            "subject": self.subject_template.format(**values),
+            "body": self.body_template.format(**values).strip()
+        }
+    
+    def _adapt_topics(self, completion, contact_data):
+        """
+        Adapt a completion generated for another contact of the same cluster.
+        
+        Replaces the original contact's profile URL and name (full name first,
+        then individual name parts) with the new contact's.
+        
+        Args:
+            completion (dict): Stored completion with topics, name and profile_url
+            contact_data (Contact): The contact to adapt the completion for
+            
+        Returns:
+            dict: Adapted email sections
+        """
+        replacements = []
+        if completion.get("profile_url") and contact_data.profile_url:
+            replacements.append((completion["profile_url"], contact_data.profile_url))
+        
+        old_name = (completion.get("name") or "").strip()
+        new_name = (contact_data.name or "").strip()
+        if old_name and new_name:
+            replacements.append((old_name, new_name))
+            old_parts, new_parts = old_name.split(), new_name.split()
+            if old_parts and new_parts:
+                replacements.append((old_parts[0], new_parts[0]))
+                if len(old_parts) > 1 and len(new_parts) > 1:
+                    replacements.append((old_parts[-1], new_parts[-1]))
+        
+        topics = {}
+        for key, value in completion.get("topics", {}).items():
+            if isinstance(value, str):
+                for old, new in replacements:
+                    if len(old) > 2:
+                        value = re.sub(r"(?<!\w)" + re.escape(old) + r"(?!\w)", new, value)
+            topics[key] = value
+        return topics
+    
+    def _conversation_text(self, contact_data):
+        """
+        Render the most recent stored events of the contact's conversation.
+        
+        Walks back from the newest event and stops at conversation_window events
+        or max_conversation_chars characters, whichever comes first.
+        
+        Args:
+            contact_data (Contact): The contact to write to
+            
+        Returns:
+            str: One "sender (time): body" line per event, oldest first, or "" if nothing is stored
+        """
+        if self.contact_store is None or not self.conversation_window:
+            return ""
+        
+        lines = []
+        total = 0
+        for event in reversed(self.contact_store.recent_events(contact_data.key, limit=self.conversation_window)):
+            sender = event["sender"] or "Unknown"
+            if event["sent_at"]:
+                sender = f"{sender} ({event['sent_at']})"
+            line = f"{sender}: {event['body'] or ''}"
+            if lines and total + len(line) > self.max_conversation_chars:
+                break
+            lines.append(line[:self.max_conversation_chars])
+            total += len(line)
+        return "\n".join(reversed(lines))
+    
+    def _contact_text(self, contact_data):
+        """
+        Return what the contact wrote, for routing.
+        
+        Our own messages, sender names and times would count towards the
+        classifier's thresholds, so only the bodies of the contact's stored
+        events are used. Without them, or without a name to recognize the
+        contact by, the scraped message is used.
+        
+        Args:
+            contact_data (Contact): The contact to write to
+            
+        Returns:
+            str: The contact's messages, oldest first
+        """
+        if self.contact_store is not None and self.conversation_window and contact_data.name:
+            name = contact_data.name.strip().lower()
+            bodies = [event["body"] for event in self.contact_store.recent_events(contact_data.key, limit=self.conversation_window)
+                      if event["body"] and (event["sender"] or "").strip().lower() == name]
+            if bodies:
+                return "\n".join(bodies)
+        return contact_data.message or ""
+    
     def _create_default_prompt(self, contact_data):
         """
         Create a default prompt for the AI based on contact data.
         
         Args:
-            contact_data (dict): Dictionary containing contact information
+            contact_data (Contact): The contact to write to
             
         Returns:
-            str: Prompt for the AI
+            tuple: (prompt, stats) with the estimated prompt tokens and the fields that were truncated
         """
-        name = contact_data.get("name", "the contact")
-        message = contact_data.get("message", "")
-        profile_url = contact_data.get("profile_url", "")
+        values = {
+            "name": contact_data.name or "the contact",
+            "message": contact_data.message or "",
+            "profile_url": contact_data.profile_url or ""
+        }
+        if self.degraded:
+            return self.short_prompt_builder.build(**values)
+        conversation = self._conversation_text(contact_data)
+        if not conversation:
+            return self.message_prompt_builder.build(**values)
+        return self.prompt_builder.build(conversation=conversation, **values)
+    
+    def _record_usage(self, contact_data, response, prompt_stats):
+        """
+        Log one API call and add its tokens and cost to the ledger.
         
-        # Get the prompt template from the separate file
-        template = get_email_prompt_template()
+        Args:
+            contact_data (Contact): The contact the call was for
+            response (dict): API response
+            prompt_stats (dict): Estimated prompt tokens and truncated fields from the prompt builder
+            
+        Returns:
+            dict: Prompt, cached and completion tokens as reported by the API, the local estimate and the cost
+        """
+        reported = response.get("usage") or {}
+        usage = {
+            "prompt_tokens": reported.get("prompt_tokens", prompt_stats["prompt_tokens"]),
+            "cached_prompt_tokens": self._cached_tokens(reported),
+            "completion_tokens": reported.get("completion_tokens", 0),
+            "estimated_prompt_tokens": prompt_stats["prompt_tokens"],
+            "truncated": prompt_stats["truncated"]
+        }
+        backend = self.llm.backend(response.get("backend"))
+        usage["cost_usd"] = round(self.ledger.record(usage, backend=response.get("backend"),
+                                                     pricing=backend.pricing if backend else None), 6)
         
-        # Format the template with the contact data
-        prompt = template.format(
-            name=name,
-            message=message,
-            profile_url=profile_url
-        )
+        # Hedged duplicates that lost the race were still paid for
+        for wasted_backend, wasted in self.llm.drain_wasted():
+            self.ledger.record_wasted({
+                "prompt_tokens": wasted.get("prompt_tokens", 0),
+                "cached_prompt_tokens": self._cached_tokens(wasted),
+                "completion_tokens": wasted.get("completion_tokens", 0)
+            }, pricing=wasted_backend.pricing)
         
-        return prompt
+        metrics.increment("llm_tokens", usage["prompt_tokens"] - usage["cached_prompt_tokens"], kind="prompt")
+        metrics.increment("llm_tokens", usage["cached_prompt_tokens"], kind="cached_prompt")
+        metrics.increment("llm_tokens", usage["completion_tokens"], kind="completion")
+        metrics.increment("llm_cost_usd", usage["cost_usd"])
+        
+        truncated = f", truncated {', '.join(usage['truncated'])}" if usage["truncated"] else ""
+        print(f"Tokens for {contact_data.display_name}: prompt {usage['prompt_tokens']} "
+              f"({usage['cached_prompt_tokens']} cached, estimated {usage['estimated_prompt_tokens']}{truncated}), "
+              f"completion {usage['completion_tokens']}, ${usage['cost_usd']:.4f}")
+        return usage
+    
+    @staticmethod
+    def _cached_tokens(usage):
+        """Prompt tokens served from the provider's prefix cache (DeepSeek and OpenAI report them differently)."""
+        if "prompt_cache_hit_tokens" in usage:
+            return usage["prompt_cache_hit_tokens"] or 0
+        details = usage.get("prompt_tokens_details") or {}
+        return details.get("cached_tokens") or 0
     
     def _extract_topics(self, message):
         """
@@ -194,34 +488,34 @@ Subject: {topic}
         
         return topics
     
-    def _call_deepseek_api(self, prompt):
-        """Call the DeepSeek API with the given prompt."""
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "system", "content": "You are an expert email writer who creates personalized, professional emails."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 1000
-        }
-        
-        response = requests.post(self.api_url, headers=self.headers, json=payload)
-        
-        if response.status_code != 200:
-            raise Exception(f"API call failed with status code {response.status_code}: {response.text}")
-        
-        return response.json()
+    @metrics.timed("llm_call")
+    def _call_llm(self, prompt):
+        """Call the configured LLM backends with the given prompt."""
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        # Sized to the JSON sections the prompt asks for rather than a fixed 1000
+        return self.llm.complete(messages, max_tokens=self.prompt_builder.max_completion_tokens, temperature=0.7)
     
-    def batch_generate_emails(self, csv_file_path, output_dir=None, save_as_drafts=False, sender_email=None):
+    def batch_generate_emails(self, csv_file_path=None, output_dir=None, save_as_drafts=False, sender_email=None,
+                              top_n=None, min_score=None, contacts=None, regenerate=False, export_format="mbox",
+                              mbox_shard_size=5000, deadline=None):
         """
-        Generate emails for all contacts in a CSV file.
+        Generate emails for all contacts in a CSV file, a list, or pending in the contact store.
         
         Args:
-            csv_file_path (str): Path to the CSV file
+            csv_file_path (str, optional): Path to the CSV file
             output_dir (str, optional): Directory to save the generated emails
             save_as_drafts (bool): Whether to save emails as Gmail drafts
             sender_email (str, optional): Email address to send from
+            top_n (int, optional): Only generate emails for the N most relevant contacts
+            min_score (float, optional): Only generate emails for contacts scoring at least this relevance
+            contacts (list, optional): Contact objects (or dictionaries) to use instead of reading a CSV file
+            regenerate (bool): Generate again for contacts the store already has an email for
+            export_format (str): "mbox" to append the emails to mbox shards, "txt" for one text file per email
+            mbox_shard_size (int): Emails per mbox file
+            deadline (Deadline, optional): Stop before the next contact would not finish in time
             
         Returns:
             list: List of dictionaries containing the generated emails and metadata
@@ -232,86 +526,145 @@ Subject: {topic}
         
         os.makedirs(output_dir, exist_ok=True)
         
-        # Read contacts from CSV
-        contacts = []
-        with open(csv_file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                contacts.append(row)
+        # Read contacts from CSV, or take the store's contacts that have no email generated yet
+        if contacts is None and csv_file_path:
+            contacts = Contact.read_csv(csv_file_path)
+        elif contacts is None:
+            if self.contact_store is None:
+                self.contact_store = ContactStore()
+            contacts = self.contact_store.get_contacts(pending_generation=True)
+            print(f"Found {len(contacts)} contacts with an email and no generated draft in the contact store")
+        
+        contacts = [Contact.from_dict(c) if isinstance(c, dict) else c for c in contacts]
+        
+        # Don't pay twice for contacts generated in an earlier run
+        if self.contact_store is not None and not regenerate:
+            already_generated = self.contact_store.generated_keys()
+            fresh = [c for c in contacts if c.key not in already_generated]
+            if len(fresh) < len(contacts):
+                print(f"Skipping {len(contacts) - len(fresh)} contacts that already have a generated email (use --regenerate to override)")
+            contacts = fresh
+        
+        # Contacts arrive most recent first (scrape order or the store's last_seen); the store's
+        # conversation history is more precise where it has one
+        recency = self.prioritizer.recency_from_order(contacts)
+        if self.contact_store is not None:
+            recency.update(self.prioritizer.recency_from_timestamps(self.contact_store.last_activity()))
+        
+        # Spend API budget on the most relevant contacts first
+        ranked = RelevanceScorer().rank(contacts, top_n=top_n, min_score=min_score)
+        if len(ranked) < len(contacts):
+            print(f"Generating emails for the {len(ranked)} most relevant of {len(contacts)} contacts")
+        
+        # Within those, recent contacts with a known email address come first, so a batch
+        # stopped by its deadline or budget has reached the most valuable ones
+        contacts = self.prioritizer.prioritize(ranked, recency)
+        print(f"Generation order: {self.prioritizer.describe(contacts)}")
         
         # Generate emails for each contact
         results = []
         gmail_drafts = []
         skipped_contacts = []
+        budget_stopped = []
+        deferred = []
+        deadline = deadline or Deadline()
+        self.budget.start()
+        self.degraded = False
+        self.routing = self._new_routing()
+        if self.budget.enabled:
+            print(f"Budget for this batch: {self.budget.describe()}")
+        if deadline.enabled:
+            print(f"Deadline: {deadline.describe()}")
         
-        for i, contact in enumerate(contacts):
-            print(f"Processing {contact.get('name', f'Contact {i+1}')} ({i+1}/{len(contacts)})...")
+        # Emails are streamed into mbox shards with an offset index, instead of a small file per contact
+        exporter = MboxExporter(output_dir, shard_size=mbox_shard_size, sender=sender_email) if export_format == "mbox" else None
+        
+        try:
+            for i, contact in enumerate(contacts):
+                # Stop before the next contact would go over a limit, shorten prompts when close to one
+                status, limit = self.budget.status(self.ledger)
+                if status == RunBudget.STOP:
+                    print(f"Stopping: the {limit} budget would be exceeded, {len(contacts) - i} contacts left without an email")
+                    budget_stopped = [{"skipped": True, "reason": f"{limit} budget exhausted", "contact": c.to_dict()}
+                                      for c in contacts[i:]]
+                    break
+                if not deadline.allows((time.time() - self.budget.started) / i if i else 0.0):
+                    print(f"Stopping: the deadline would be missed, deferring {len(contacts) - i} contacts to a later batch")
+                    deferred = [{"skipped": True, "reason": "deadline reached", "contact": c.to_dict(),
+                                 "priority": self.prioritizer.priorities.get(c.key)} for c in contacts[i:]]
+                    metrics.increment("deferred", len(deferred), stage="generation")
+                    break
+                if status == RunBudget.DEGRADE and not self.degraded:
+                    print(f"Over {self.budget.degrade_at:.0%} of the {limit} budget, switching to shorter prompts")
+                    self.degraded = True
+            
+                print(f"Processing {contact.name or f'Contact {i+1}'} ({i+1}/{len(contacts)})...")
             
-            # Generate the email
-            result = self.generate_email(contact)
+                # Generate the email
+                with profiler.stage("generation"):
+                    result = self.generate_email(contact)
+                self.budget.contact_done()
             
-            # Check if the email was skipped
-            if result.get("skipped", False):
-                print(f"Skipped {contact.get('name', f'Contact {i+1}')}: {result.get('reason', 'Unknown reason')}")
-                if result.get("last_email_date"):
-                    print(f"Last email sent on: {result.get('last_email_date')}")
-                skipped_contacts.append(result)
-                continue
+                # Check if the email was skipped
+                if result.get("skipped", False):
+                    print(f"Skipped {contact.name or f'Contact {i+1}'}: {result.get('reason', 'Unknown reason')}")
+                    if result.get("last_email_date"):
+                        print(f"Last email sent on: {result.get('last_email_date')}")
+                    skipped_contacts.append(result)
+                    continue
 
-            # Save the email to a file
-            if "error" not in result:
-                email_filename = f"email_{contact.get('name', f'contact_{i+1}').replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-                email_filepath = os.path.join(output_dir, email_filename)
-                
-                with open(email_filepath, 'w', encoding='utf-8') as f:
-                    f.write(result["email_content"])
-                
-                result["saved_to"] = email_filepath
-                # Save as Gmail draft if requested
-                if save_as_drafts and self.gmail_integration:
-                    # Extract subject and body from the email content
-                    email_content = result["email_content"]
-                    
-                    # Find the subject line by looking for "Subject: " at the beginning of a line
-                    subject = ""
-                    body = email_content
-                    
-                    # Split the email content into lines
-                    lines = email_content.split('\n')
+                # Save the email
+                if "error" not in result:
+                    if exporter is not None:
+                        entry = exporter.add(contact.email, result["subject"], result["body"],
+                                             profile_url=contact.profile_url, contact_key=contact.key)
+                        result["saved_to"] = os.path.join(output_dir, entry["shard"])
+                        result["mbox_offset"] = entry["offset"]
+                    else:
+                        email_filename = f"email_{(contact.name or f'contact_{i+1}').replace(' ', '_').lower()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+                        email_filepath = os.path.join(output_dir, email_filename)
                     
-                    # Look for the subject line
-                    for i, line in enumerate(lines):
-                        if line.strip().startswith("Subject:"):
-                            subject = line.replace("Subject:", "").strip()
-                            # Join the remaining lines as the body
-                            body = '\n'.join(lines[i+1:]).strip()
-                            break
+                        with open(email_filepath, 'w', encoding='utf-8') as f:
+                            f.write(result["email_content"])
                     
-                    # Get recipient email from contact data
-                    to_email = contact.get('email')
-                    if not to_email:
-                        print(f"Warning: No email address found for {contact.get('name', f'Contact {i+1}')}")
-                        continue
+                        result["saved_to"] = email_filepath
+                    if self.contact_store is not None:
+                        self.contact_store.mark_generated(contact, result["email_content"])
+                    # Save as Gmail draft if requested
+                    if save_as_drafts and self.gmail_integration:
+                        # Get recipient email from contact data
+                        to_email = contact.email
+                        if not to_email:
+                            print(f"Warning: No email address found for {contact.name or f'Contact {i+1}'}")
+                            continue
                     
-                    # Create draft in Gmail
-                    draft = self.gmail_integration.create_draft(
-                        to=to_email,
-                        subject=subject,
-                        body=body,
-                        from_email=sender_email
-                    )
+                        # Create draft in Gmail
+                        with profiler.stage("drafting"):
+                            draft = self.gmail_integration.create_draft(
+                                to=to_email,
+                                subject=result["subject"],
+                                body=result["body"],
+                                from_email=sender_email
+                            )
                     
-                    if draft:
-                        result["gmail_draft_id"] = draft.get('id')
-                        gmail_drafts.append(draft)
-                        print(f"Created Gmail draft for {contact.get('name', f'Contact {i+1}')}")
-                    else:
-                        print(f"Failed to create Gmail draft for {contact.get('name', f'Contact {i+1}')}")
+                        if draft:
+                            result["gmail_draft_id"] = draft.get('id')
+                            gmail_drafts.append(draft)
+                            if self.contact_store is not None:
+                                self.contact_store.mark_drafted(contact, draft.get('id'))
+                            print(f"Created Gmail draft for {contact.name or f'Contact {i+1}'}")
+                        else:
+                            print(f"Failed to create Gmail draft for {contact.name or f'Contact {i+1}'}")
             
-            results.append(result)
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(random.uniform(1, 3))
+                results.append(result)
+        finally:
+            # Flush and close the open shard and index even when a contact fails
+            if exporter is not None:
+                exporter.close()
+        
+        if exporter is not None and exporter.count:
+            print(f"Wrote {exporter.count} emails to {len(exporter.shards)} mbox file(s) in {output_dir} "
+                  f"(index: {os.path.basename(exporter.index_path)})")
         
         # Save all results to a JSON file
         results_filename = f"email_generation_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -320,40 +673,82 @@ Subject: {topic}
         with open(results_filepath, 'w', encoding='utf-8') as f:
             json.dump({
                 "generated_emails": results,
-                "skipped_contacts": skipped_contacts
+                "skipped_contacts": skipped_contacts + budget_stopped + deferred,
+                "usage_summary": self.ledger.summary(),
+                "routing": self.routing_summary()
             }, f, indent=2)
         
+        if self.duplicate_index is not None:
+            self.duplicate_index.save()
+        
         # Print summary
         print(f"\nEmail generation complete!")
         print(f"Generated {len(results)} emails")
+        print(f"API calls: {self.api_calls}, completions reused from near-duplicate messages: {self.reused_completions}")
+        if self.template_tier is not None:
+            routing = self.routing_summary()
+            saved = []
+            if routing["estimated_seconds_saved"] is not None:
+                saved.append(f"~{routing['estimated_seconds_saved']:.0f}s")
+            if routing["estimated_cost_saved_usd"] is not None:
+                saved.append(f"~${routing['estimated_cost_saved_usd']:.4f}")
+            print(f"Routing: {routing['template']} contacts answered from templates, {routing['reused']} from reused "
+                  f"completions, {routing['llm']} LLM calls"
+                  + (f", saving {' and '.join(saved)}" if saved else ""))
         print(f"Skipped {len(skipped_contacts)} contacts (already sent emails)")
+        if budget_stopped:
+            print(f"Stopped {len(budget_stopped)} contacts short of the budget ({self.budget.describe()})")
+        if deferred:
+            best = max(entry["priority"] or 0.0 for entry in deferred)
+            print(f"Deferred {len(deferred)} contacts because of the deadline (highest priority left: {best:.2f}); "
+                  f"they stay pending in the contact store for the next batch")
+        self.print_usage_summary()
         if save_as_drafts and self.gmail_integration:
             print(f"Created {len(gmail_drafts)} Gmail drafts")
+        self.llm.print_report()
         
         return results
 
+    def print_usage_summary(self):
+        """Print the tokens, cache hits and cost of the run."""
+        summary = self.ledger.summary()
+        print(f"\nUsage: {summary['calls']} calls, {summary['prompt_tokens']} prompt tokens "
+              f"({summary['cached_prompt_tokens']} cached), {summary['completion_tokens']} completion tokens, "
+              f"${summary['cost_usd']:.4f}")
+        if summary["prompt_tokens"]:
+            print(f"Prompt cache: {100 * summary['cached_prompt_tokens'] / summary['prompt_tokens']:.0f}% of prompt tokens served from cache")
+        if summary["wasted_calls"]:
+            print(f"Hedged duplicates: {summary['wasted_calls']} unused answers, ${summary['wasted_cost_usd']:.4f}")
+        for name, stats in summary["per_backend"].items():
+            print(f"- {name}: {stats['calls']} calls, {stats['tokens']} tokens, ${stats['cost']:.4f}")
+        if self.degraded:
+            print("Shorter prompts were used for part of the batch to stay within budget")
+
 # Example usage
 if __name__ == "__main__":
-    # Get the CSV file path from command line arguments or use a default
-    if len(sys.argv) > 1:
-        csv_file_path = sys.argv[1]
-    else:
-        # Find the most recent CSV file in the data directory
-        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
-        csv_files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
-        
-        if not csv_files:
-            print("No CSV files found in the data directory.")
-            sys.exit(1)
-        
-        # Sort by modification time (most recent first)
-        csv_files.sort(key=lambda x: os.path.getmtime(os.path.join(data_dir, x)), reverse=True)
-        csv_file_path = os.path.join(data_dir, csv_files[0])
+    parser = argparse.ArgumentParser(description='Generate follow-up emails for scraped LinkedIn contacts')
+    parser.add_argument('csv_file_path', nargs='?', help='CSV file of contacts (default: contacts pending generation in the contact store)')
+    parser.add_argument('--profile', action='store_true', help='Profile CPU and memory of the generation and drafting stages')
+    parser.add_argument('--profile-dir', type=str, help='Directory for the profiling reports (default: data/profiles/<timestamp>)')
+    parser.add_argument('--deadline', type=str, help='Stop cleanly after this much wall time, e.g. 20m or 1h30m, highest priority contacts first')
+    args = parser.parse_args()
+    deadline = Deadline.parse(args.deadline)
+    if args.profile:
+        profiler.enable(args.profile_dir)
     
-    print(f"Using CSV file: {csv_file_path}")
+    # Use the CSV file if one was given, otherwise the contact store
+    csv_file_path = args.csv_file_path
+    if csv_file_path:
+        print(f"Using CSV file: {csv_file_path}")
+    else:
+        print("Using contacts pending generation in the contact store")
     
     # Initialize the email generator
-    generator = EmailGenerator()
+    generator = EmailGenerator(contact_store=ContactStore())
     
-    # Generate emails for all contacts in the CSV file
-    generator.batch_generate_emails(csv_file_path) 
\ No newline at end of file
+    # Generate emails for all contacts
+    generator.batch_generate_emails(csv_file_path, deadline=deadline)
+    rate_scheduler.print_report()
+    metrics.print_summary()
+    metrics.write_reports()
+    profiler.finish()
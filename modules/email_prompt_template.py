@@ -1,23 +1,23 @@
 """
 Email prompt template for the LinkedIn scraper.
 This file contains the template used to generate follow-up emails.
+
+The prompt is split in two: a system prompt that is identical for every
+contact, and a short contact template that comes last. Keeping everything
+static in front lets the API's prefix cache serve it for every call after
+the first one.
 """
 
-def get_email_prompt_template():
+def get_email_system_prompt():
     """
-    Returns the template for generating follow-up emails.
+    Returns the static part of the prompt, shared by every contact.
     
     Returns:
-        str: The email prompt template
+        str: The system prompt
     """
-    template = """
+    system_prompt = """
 You are an expert email writer specializing in personalized follow-up emails.
 
-Contact Information:
-- Name: {name}
-- LinkedIn Message: {message}
-- LinkedIn Profile: {profile_url}
-
 Sender Background:
 - Technical background in fintech and startups
 - Passionate about helping professionals optimize their time with technology
@@ -26,12 +26,12 @@ Sender Background:
 
 Instructions:
 1. Write a concise, informal (formal but make it less polite and more chilled-out/casual), personalized follow-up email (2-3 paragraphs)
-2. Use the same language as the original LinkedIn message
+2. Use the same language as the original LinkedIn message, and build on what was already said in the conversation
 3. Include a clear call to action
 4. Mention that free usage of the tool will be granted once developed (if not mentioned in previous message)
 5. Include a professional signature with name and LinkedIn profile
 6. Please use the formal greeting 'Bonjour Monsieur/Madame [Last Name]' but only if the message is in french.
-7. Add the {profile_url} to the email before the greeting part. 
+7. Add the contact's LinkedIn profile URL (given with the contact information) to the email before the greeting part.
 
 Format your response as a JSON object with these keys:
 - personalized_intro: A brief, personalized introduction
@@ -41,6 +41,31 @@ Format your response as a JSON object with these keys:
 - signature: A professional signature with name and LinkedIn profile URL
 
 Make the email professional, engaging, and tailored to the recipient's interests.
+The contact information follows.
+"""
+    
+    return system_prompt
+
+def get_email_prompt_template(with_conversation=True):
+    """
+    Returns the contact-specific part of the prompt.
+    
+    Args:
+        with_conversation (bool): Include the conversation history, for contacts with a stored thread
+    
+    Returns:
+        str: The email prompt template
+    """
+    template = """
+Contact Information:
+- Name: {name}
+- LinkedIn Profile: {profile_url}
+- LinkedIn Message: {message}
+"""
+    if with_conversation:
+        template += """
+Recent LinkedIn Conversation (oldest first):
+{conversation}
 """
     
-    return template 
\ No newline at end of file
+    return template
\ No newline at end of file
@@ -6,6 +6,9 @@ from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+from modules.instrumentation import metrics
+from modules.rate_scheduler import rate_scheduler, is_throttle
+
 class GmailChecker:
     """
     Class to check if an email has already been sent to a contact in Gmail.
@@ -84,6 +87,7 @@ class GmailChecker:
             print(f"Authentication error: {e}")
             return False
     
+    @metrics.timed("gmail_check_sent")
     def check_if_email_sent(self, email_address, days_back=30):
         """
         Check if an email has been sent to the given address in the last X days.
@@ -108,6 +112,7 @@ class GmailChecker:
             query = f"to:{email_address} after:{after_date}"
             
             # Search for messages matching the query
+            rate_scheduler.acquire("gmail")
             results = self.service.users().messages().list(
                 userId='me',
                 q=query,
@@ -115,6 +120,8 @@ class GmailChecker:
                 maxResults=10
             ).execute()
             
+            rate_scheduler.success("gmail")
+            
             # Check if any messages were found
             messages = results.get('messages', [])
             
@@ -123,12 +130,14 @@ class GmailChecker:
             
             # Check the first few messages to confirm they were actually sent by the user
             for message in messages[:3]:
+                rate_scheduler.acquire("gmail")
                 msg = self.service.users().messages().get(
                     userId='me',
                     id=message['id'],
                     format='metadata',
                     metadataHeaders=['From']
                 ).execute()
+                rate_scheduler.success("gmail")
                 
                 # Check if the message was sent by the user
                 headers = msg.get('payload', {}).get('headers', [])
@@ -140,6 +149,8 @@ class GmailChecker:
             
             return False
         except Exception as e:
+            if is_throttle(e):
+                rate_scheduler.throttled("gmail", "rate_limit")
             print(f"Error checking sent emails: {e}")
             return False
     
@@ -164,12 +175,15 @@ class GmailChecker:
             query = f"to:{email_address} in:sent after:{days_back}d"
             
             # Search for messages matching the query
+            rate_scheduler.acquire("gmail")
             results = self.service.users().messages().list(
                 userId='me',
                 q=query,
                 maxResults=1
             ).execute()
             
+            rate_scheduler.success("gmail")
+            
             # Check if any messages were found
             messages = results.get('messages', [])
             
@@ -177,12 +191,14 @@ class GmailChecker:
                 return None
             
             # Get the date of the most recent message
+            rate_scheduler.acquire("gmail")
             msg = self.service.users().messages().get(
                 userId='me',
                 id=messages[0]['id'],
                 format='metadata',
                 metadataHeaders=['Date']
             ).execute()
+            rate_scheduler.success("gmail")
             
             # Extract the date from the headers
             headers = msg.get('payload', {}).get('headers', [])
@@ -192,5 +208,7 @@ class GmailChecker:
             
             return None
         except Exception as e:
+            if is_throttle(e):
+                rate_scheduler.throttled("gmail", "rate_limit")
             print(f"Error getting last email date: {e}")
             return None 
\ No newline at end of file
@@ -6,6 +6,9 @@ from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+from modules.instrumentation import metrics
+from modules.rate_scheduler import rate_scheduler, is_throttle
+
 class GmailIntegration:
     """
     Class to handle Gmail API integration for saving emails as drafts.
@@ -71,6 +74,7 @@ class GmailIntegration:
         self.service = build('gmail', 'v1', credentials=creds)
         return True
     
+    @metrics.timed("gmail_create_draft")
     def create_draft(self, to, subject, body, from_email=None):
         """
         Create a draft email in Gmail.
@@ -100,13 +104,17 @@ class GmailIntegration:
             raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')
             
             # Create the draft
+            rate_scheduler.acquire("gmail")
             draft = self.service.users().drafts().create(
                 userId='me',
                 body={'message': {'raw': raw_message}}
             ).execute()
+            rate_scheduler.success("gmail")
             
             return draft
         except Exception as e:
+            if is_throttle(e):
+                rate_scheduler.throttled("gmail", "rate_limit")
             print(f"Error creating draft: {e}")
             return None
     
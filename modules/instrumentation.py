@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+
+class Metrics:
+    """
+    In-process timing spans and counters.
+
+    Spans time a block of code under a name and optional labels; counters
+    add up numbers such as tokens or seconds slept. Everything is kept in
+    memory, costs a perf_counter call and a list append per span, and is
+    written out once at the end of a run as a JSON summary and a
+    Prometheus text-format file.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, namespace="linkedin_scraper"):
+        self.namespace = namespace
+        self.timings = {}
+        self.counters = {}
+        self.started = datetime.now()
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.timings = {}
+            self.counters = {}
+            self.started = datetime.now()
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def observe(self, name, seconds, **labels):
+        """Record one duration for a span."""
+        key = self._key(name, labels)
+        with self._lock:
+            self.timings.setdefault(key, []).append(seconds)
+
+    def increment(self, name, value=1, **labels):
+        """Add to a counter."""
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time a block of code.
+
+        Failed blocks are recorded with status="error" so they do not skew the
+        timings of successful ones.
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, status=status, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator timing every call of a function as a span."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def sleep(self, seconds, reason):
+        """Sleep and count the time slept, so waits show up next to real work."""
+        time.sleep(seconds)
+        self.increment("sleep_seconds", seconds, reason=reason)
+
+    def summary(self):
+        """
+        Summarize every span and counter.
+
+        Returns:
+            dict: Per span count, total, mean, p50/p90/p99 and max seconds; counter values
+        """
+        with self._lock:
+            timings = {key: list(values) for key, values in self.timings.items()}
+            counters = dict(self.counters)
+
+        spans = []
+        for (name, labels), values in sorted(timings.items()):
+            samples = np.array(values)
+            p50, p90, p99 = np.quantile(samples, self.QUANTILES)
+            spans.append({
+                "name": name,
+                "labels": dict(labels),
+                "count": len(values),
+                "total": round(float(samples.sum()), 6),
+                "mean": round(float(samples.mean()), 6),
+                "p50": round(float(p50), 6),
+                "p90": round(float(p90), 6),
+                "p99": round(float(p99), 6),
+                "max": round(float(samples.max()), 6)
+            })
+        return {
+            "started": self.started.isoformat(),
+            "finished": datetime.now().isoformat(),
+            "spans": spans,
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(counters.items())]
+        }
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return ""
+        escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                   for k, v in labels.items())
+        return "{" + ",".join(escaped) + "}"
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        summary = self.summary()
+        span_metric = f"{self.namespace}_span_seconds"
+        lines = [f"# HELP {span_metric} Duration of instrumented pipeline stages",
+                 f"# TYPE {span_metric} summary"]
+        for span in summary["spans"]:
+            labels = dict(span["labels"], span=span["name"])
+            for quantile in self.QUANTILES:
+                value = span[f"p{int(quantile * 100)}"]
+                lines.append(f"{span_metric}{self._labels(dict(labels, quantile=str(quantile)))} {value}")
+            lines.append(f"{span_metric}_sum{self._labels(labels)} {span['total']}")
+            lines.append(f"{span_metric}_count{self._labels(labels)} {span['count']}")
+
+        typed = set()
+        for counter in summary["counters"]:
+            metric = f"{self.namespace}_{counter['name']}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{self._labels(counter['labels'])} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write_reports(self, output_dir=None):
+        """
+        Write the JSON summary and the Prometheus file of the run.
+
+        Args:
+            output_dir (str, optional): Directory for the reports (defaults to data/metrics)
+
+        Returns:
+            tuple: (JSON path, Prometheus path)
+        """
+        output_dir = output_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "metrics"
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        json_path = os.path.join(output_dir, f"run_metrics_{timestamp}.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+        # A fixed name so the node exporter textfile collector always picks up the latest run
+        prom_path = os.path.join(output_dir, "linkedin_scraper.prom")
+        tmp_path = prom_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, prom_path)
+        return json_path, prom_path
+
+    def print_summary(self):
+        """Print the slowest stages by total time."""
+        spans = sorted(self.summary()["spans"], key=lambda s: s["total"], reverse=True)
+        if not spans:
+            return
+        print("\nTime per stage:")
+        for span in spans:
+            labels = ", ".join(f"{k}={v}" for k, v in span["labels"].items() if k != "status" or v != "ok")
+            name = f"{span['name']} ({labels})" if labels else span["name"]
+            print(f"- {name}: {span['count']} x, total {span['total']:.1f}s, "
+                  f"p50 {span['p50']:.2f}s, p99 {span['p99']:.2f}s")
+        slept = sum(c["value"] for c in self.summary()["counters"] if c["name"] == "sleep_seconds")
+        if slept:
+            print(f"- fixed sleeps: {slept:.1f}s")
+
+
+# Shared by every module so one run produces one report
+metrics = Metrics()
@@ -0,0 +1,265 @@
+import re
+import unicodedata
+
+
+# Combining diacritical marks left over after NFKD decomposition
+COMBINING_MARKS = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+
+def fold_text(text):
+    """
+    Fold text for matching: case-fold and strip accents, so "Immobilière" becomes "immobiliere".
+    """
+    text = text or ""
+    if text.isascii():
+        return text.lower()
+    return COMBINING_MARKS.sub("", unicodedata.normalize("NFKD", text)).casefold()
+
+
+class KeywordMatcher:
+    """
+    Keyword filter compiled once per run.
+
+    All terms are folded and merged into a single trie-shaped regular
+    expression, so one scan of a message finds every term it contains and
+    the cost stays flat as the keyword list grows. The boolean expression
+    is then evaluated against the set of terms found.
+
+    Expression syntax (as accepted by --filter):
+        real estate, immobilier*          either term (a comma means OR)
+        agent AND (immobilier* OR "real estate")
+        agent AND NOT recruiter
+
+    Operators must be upper case. Consecutive words form a phrase, quotes
+    keep operators literal, and a trailing * matches any word ending.
+    """
+
+    OPERATORS = ("AND", "OR", "NOT")
+    TOKEN_PATTERN = re.compile(r'\(|\)|,|"[^"]*"|[^\s(),"]+')
+    END = ""
+
+    def __init__(self, expression, whole_words=True):
+        """
+        Compile a filter expression.
+
+        Args:
+            expression (str): Boolean keyword expression
+            whole_words (bool): Only match terms on word boundaries ("agent" will not match "management")
+
+        Raises:
+            ValueError: If the expression cannot be parsed
+        """
+        self.expression = expression
+        self.whole_words = whole_words
+        self.terms = []
+        self._exact_terms = {}
+        self._prefix_terms = {}
+
+        self._tokens = self._tokenize(expression)
+        self._position = 0
+        self.tree = self._parse_or()
+        if self._position < len(self._tokens):
+            raise ValueError(f"Unexpected '{self._tokens[self._position]}' in filter expression")
+
+        self.regex = self._compile()
+        # A plain list of alternatives only needs to know whether anything matched
+        self._any_term = self.tree[0] == "term" or (self.tree[0] == "or" and all(node[0] == "term" for node in self.tree[1]))
+
+    @classmethod
+    def from_keywords(cls, keywords, whole_words=True):
+        """
+        Build a matcher from a keyword list (any of them) or an expression string.
+
+        Args:
+            keywords (list or str): Keywords, or a filter expression
+            whole_words (bool): Only match terms on word boundaries
+        """
+        if isinstance(keywords, str):
+            return cls(keywords, whole_words=whole_words)
+        quoted = ['"' + k.strip().replace('"', '') + '"' for k in keywords if k and k.strip()]
+        return cls(", ".join(quoted), whole_words=whole_words)
+
+    def _tokenize(self, expression):
+        tokens = self.TOKEN_PATTERN.findall(expression or "")
+        if not tokens:
+            raise ValueError("Filter expression is empty")
+        return tokens
+
+    def _peek(self):
+        return self._tokens[self._position] if self._position < len(self._tokens) else None
+
+    def _parse_or(self):
+        nodes = [self._parse_and()]
+        while self._peek() in ("OR", ","):
+            self._position += 1
+            nodes.append(self._parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _parse_and(self):
+        nodes = [self._parse_not()]
+        while self._peek() == "AND":
+            self._position += 1
+            nodes.append(self._parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _parse_not(self):
+        if self._peek() == "NOT":
+            self._position += 1
+            return ("not", self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("Filter expression ends unexpectedly")
+        if token == "(":
+            self._position += 1
+            node = self._parse_or()
+            if self._peek() != ")":
+                raise ValueError("Missing ')' in filter expression")
+            self._position += 1
+            return node
+        if token in (")", ",") or token in self.OPERATORS:
+            raise ValueError(f"Unexpected '{token}' in filter expression")
+
+        # Collect consecutive words into one phrase
+        words = []
+        while self._peek() is not None and self._peek() not in ("(", ")", ",") and self._peek() not in self.OPERATORS:
+            words.append(self._tokens[self._position].strip('"'))
+            self._position += 1
+        return ("term", self._add_term(" ".join(w for w in words if w)))
+
+    def _add_term(self, term):
+        folded = " ".join(fold_text(term).split())
+        if not folded:
+            raise ValueError("Empty term in filter expression")
+        prefix = folded.endswith("*")
+        folded = folded.rstrip("*")
+        table = self._prefix_terms if prefix else self._exact_terms
+        if folded not in table:
+            table[folded] = len(self.terms)
+            self.terms.append(term)
+        return table[folded]
+
+    def _compile(self):
+        """Build a single regex from a trie of all terms."""
+        self._trie = {}
+        for terms, kind in ((self._exact_terms, "exact"), (self._prefix_terms, "prefix")):
+            for term, term_id in terms.items():
+                node = self._trie
+                for ch in term:
+                    node = node.setdefault(ch, {})
+                node.setdefault(self.END, {})[kind] = term_id
+
+        body = self._trie_pattern(self._trie)
+        if self.whole_words:
+            pattern = r"(?<!\w)(" + body + r")(?!\w)"
+        else:
+            pattern = "(" + body + ")"
+        # Lookahead so overlapping terms ("real estate" and "estate agent") are all found
+        return re.compile("(?=" + pattern + ")")
+
+    def _trie_pattern(self, node):
+        branches = []
+        for ch in sorted(k for k in node if k != self.END):
+            # Words of a phrase may be separated by any run of whitespace
+            branches.append((r"\s+" if ch == " " else re.escape(ch)) + self._trie_pattern(node[ch]))
+        end = node.get(self.END, {})
+        if "prefix" in end:
+            # \w* also matches nothing, so no optional group is needed (and covers the exact term)
+            branches.append(r"\w*")
+        if not branches:
+            return ""
+        if "exact" in end:
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    @staticmethod
+    def _is_word_char(ch):
+        return ch.isalnum() or ch == "_"
+
+    def _terms_at(self, text, start, found):
+        """
+        Add every term that starts at `start` to `found`.
+
+        The regex only reports the longest term at a position, so the trie is
+        walked from there and each term ending on the way is collected:
+        "agent" and "agent immobilier" both count in "agent immobilier".
+        """
+        node = self._trie
+        i = start
+        while True:
+            end = node.get(self.END)
+            if end:
+                if "prefix" in end:
+                    found.add(end["prefix"])
+                if "exact" in end and (not self.whole_words or i == len(text) or not self._is_word_char(text[i])):
+                    found.add(end["exact"])
+            if i == len(text):
+                return
+            if text[i].isspace():
+                if " " not in node:
+                    return
+                node = node[" "]
+                while i < len(text) and text[i].isspace():
+                    i += 1
+            elif text[i] in node:
+                node = node[text[i]]
+                i += 1
+            else:
+                return
+
+    def find_terms(self, text):
+        """
+        Return the ids of every term found in the text.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            set: Indexes into self.terms
+        """
+        found = set()
+        text = fold_text(text)
+        for match in self.regex.finditer(text):
+            self._terms_at(text, match.start(), found)
+        return found
+
+    def _evaluate(self, node, found):
+        kind = node[0]
+        if kind == "term":
+            return node[1] in found
+        if kind == "not":
+            return not self._evaluate(node[1], found)
+        if kind == "and":
+            return all(self._evaluate(child, found) for child in node[1])
+        return any(self._evaluate(child, found) for child in node[1])
+
+    def matches(self, text):
+        """
+        Check whether the text satisfies the filter expression.
+
+        Args:
+            text (str): Text to check
+
+        Returns:
+            bool: True if the text matches
+        """
+        if self._any_term:
+            return self.regex.search(fold_text(text)) is not None
+        return self._evaluate(self.tree, self.find_terms(text))
+
+    def describe(self):
+        """Return the expression as a readable string."""
+        return self._describe(self.tree)
+
+    def _describe(self, node):
+        kind = node[0]
+        if kind == "term":
+            return f'"{self.terms[node[1]]}"'
+        if kind == "not":
+            return "NOT " + self._describe(node[1])
+        joiner = " AND " if kind == "and" else " OR "
+        return "(" + joiner.join(self._describe(child) for child in node[1]) + ")"
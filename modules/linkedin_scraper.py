@@ -4,7 +4,7 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException, StaleElementReferenceException
 import time
 import sys
 import os
@@ -12,27 +12,127 @@ import pickle
 import csv
 from datetime import datetime
 import re
+from collections import deque
 
 # Add the parent directory to the path to import from config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.credentials import LINKEDIN_EMAIL, LINKEDIN_PASSWORD
+from modules.run_journal import RunJournal
+from modules.browser_lifecycle import BrowserLifecycleManager
+from modules.browser_profile import BrowserProfile
+from modules.page_state import PageState, PageStateClassifier
+from modules.keyword_matcher import KeywordMatcher
+from modules.relevance_scorer import RelevanceScorer
+from modules.near_duplicates import NearDuplicateIndex
+from modules.contact_store import ContactStore
+from modules.contact import Contact
+from modules.instrumentation import metrics
+from modules.profiling import profiler
+from modules.rate_scheduler import rate_scheduler
+from modules.contact_priority import ContactPrioritizer, Deadline
+from modules.selector_registry import SelectorRegistry
 
 class LinkedInScraper:
-    def __init__(self):
+    LINKEDIN_URL = "https://www.linkedin.com"
+    DEFAULT_KEYWORDS = ["real estate", "agent", "agents", "immobilier*"]
+    
+    def __init__(self, max_pages_per_browser=100, max_browser_memory_mb=1500, browser_profile=None, contact_store=None,
+                 base_url=None, wait_scale=1.0, recorder=None, journal_path=None, duplicate_index_path=None,
+                 cookie_file="linkedin_cookies.pkl", credentials=None, selector_registry=None):
+        # Pages come from LinkedIn, or from a replay server of recorded snapshots (no login needed)
+        self.base_url = (base_url or self.LINKEDIN_URL).rstrip('/')
+        self.replaying = self.base_url != self.LINKEDIN_URL
+        # Page loads are paced by the shared rate scheduler; a replay server has its own, much faster pace
+        self.rate_target = "replay" if self.replaying else "linkedin"
+        # Multiplier for the fixed waits after page loads and clicks
+        self.wait_scale = wait_scale
+        # Saves snapshots of visited pages when set (see modules/replay.py)
+        self.recorder = recorder
+        # Run journal and near-duplicate index files (default to the ones in data/)
+        self.journal_path = journal_path
+        self.duplicate_index_path = duplicate_index_path
+        # Account to log in with and where its session cookies are kept (one pair per worker account)
+        self.cookie_file = cookie_file
+        self.credentials = credentials or (LINKEDIN_EMAIL, LINKEDIN_PASSWORD)
+        
+        # Launch settings shared by every Chrome instance this scraper starts
+        self.browser_profile = browser_profile or BrowserProfile.lean()
+        print(f"Browser profile: {self.browser_profile.describe()}")
+        self.driver = self._create_driver()
+        
+        # Recycle Chrome before it bloats on long runs
+        self.lifecycle = BrowserLifecycleManager(
+            self,
+            max_pages=max_pages_per_browser,
+            max_memory_mb=max_browser_memory_mb
+        )
+        
+        # Create config directory if it doesn't exist
+        config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+        if not os.path.exists(config_dir):
+            os.makedirs(config_dir)
+        
+        # Contacts persist across runs, keyed on their profile URL
+        self.contact_store = contact_store or ContactStore()
+        
+        # Cheap classifier deciding whether a page needs a challenge handler
+        self.page_classifier = PageStateClassifier()
+        
+        # Profile field selectors, tried in order of how often they matched on earlier pages
+        self.selectors = selector_registry or SelectorRegistry.from_config()
+        
+        # Compiled keyword matchers, keyed by the keywords they were built from
+        self._keyword_matchers = {}
+        
+        # Journal of the current run, set by scrape_linkedin
+        self.journal = None
+        
+        # Orders matched contacts for enrichment, and counts the work a deadline cut off
+        self.prioritizer = ContactPrioritizer()
+        self.deferred = {"threads": 0, "profiles": 0}
+        self.deferred_keys = set()
+        
+        # (conversation key, contact key, events) of the last conversation captured, for queue workers
+        self.last_conversation = None
+    
+    def _create_driver(self):
+        """Start a new Chrome instance configured with the scraper's browser profile."""
+        options = self.browser_profile.build_options()
+        
         # Set up ChromeDriver path
         driver_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'drivers', 'chromedriver')
         if os.path.exists(driver_path):
             # Use local ChromeDriver if available
             service = Service(executable_path=driver_path)
-            self.driver = webdriver.Chrome(service=service)
+            driver = webdriver.Chrome(service=service, options=options)
         else:
             # Fall back to system ChromeDriver
-            self.driver = webdriver.Chrome()
+            driver = webdriver.Chrome(options=options)
         
-        # Create config directory if it doesn't exist
-        config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
-        if not os.path.exists(config_dir):
-            os.makedirs(config_dir)
+        self.browser_profile.apply(driver)
+        return driver
+    
+    def _page_url(self, url):
+        """Map a LinkedIn URL or path onto the server pages come from, LinkedIn itself or a replay server."""
+        if not url.startswith('http'):
+            return self.base_url + url
+        if self.replaying and url.startswith(self.LINKEDIN_URL):
+            return self.base_url + url[len(self.LINKEDIN_URL):]
+        return url
+    
+    def _page_loaded(self, seconds):
+        """Account for a finished page load in the browser lifecycle and the rate scheduler."""
+        self.lifecycle.record_page(seconds)
+        rate_scheduler.success(self.rate_target)
+    
+    def navigate(self, url):
+        """Load a page, recording it against the browser lifecycle."""
+        url = self._page_url(url)
+        rate_scheduler.acquire(self.rate_target)
+        start = time.time()
+        with metrics.span("navigation"):
+            self.driver.get(url)
+        self._page_loaded(time.time() - start)
     
     # Function to check if login was successful
     def is_login_successful(self):
@@ -57,22 +157,22 @@ class LinkedInScraper:
                     # We're not on the login page and no error message, might be successful
                     return True
     
-    def save_cookies(self, cookies, filename="linkedin_cookies.pkl"):
+    def save_cookies(self, cookies, filename=None):
         # Create config directory if it doesn't exist
         config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
         if not os.path.exists(config_dir):
             os.makedirs(config_dir)
         
         # Save cookies to file
-        cookie_path = os.path.join(config_dir, filename)
+        cookie_path = os.path.join(config_dir, filename or self.cookie_file)
         with open(cookie_path, 'wb') as f:
             pickle.dump(cookies, f)
         print(f"Cookies saved to {cookie_path}")
     
-    def load_cookies(self, filename="linkedin_cookies.pkl"):
+    def load_cookies(self, filename=None):
         # Check if cookies file exists
         config_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
-        cookie_path = os.path.join(config_dir, filename)
+        cookie_path = os.path.join(config_dir, filename or self.cookie_file)
         
         if not os.path.exists(cookie_path):
             print(f"No cookies file found at {cookie_path}")
@@ -100,7 +200,7 @@ class LinkedInScraper:
             return False
         
         # Navigate to LinkedIn
-        self.driver.get("https://www.linkedin.com/")
+        self.driver.get(f"{self.base_url}/")
         
         # Add cookies to browser
         for cookie in cookies:
@@ -128,18 +228,7 @@ class LinkedInScraper:
         
         # Save messages to CSV
         filepath = os.path.join(data_dir, filename)
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['name', 'profile url', 'message', 'email', 'company', 'title'])
-            for message in messages:
-                writer.writerow([
-                    message.get('name', ''),
-                    message.get('profile_url', ''),
-                    message.get('message', ''),
-                    message.get('email', ''),
-                    message.get('company', ''),
-                    message.get('title', '')
-                ])
+        Contact.write_csv(filepath, messages)
         
         print(f"Saved {len(messages)} contacts to {filepath}")
         return filepath
@@ -148,165 +237,417 @@ class LinkedInScraper:
         if not keywords:
             return True
         
-        # Convert keywords to lowercase for case-insensitive matching
-        keywords = [k.lower() for k in keywords]
-        message_text = message_text.lower()
+        # Compile the keywords once and reuse the matcher for every message
+        if not isinstance(keywords, KeywordMatcher):
+            cache_key = keywords if isinstance(keywords, str) else tuple(keywords)
+            if self._keyword_matchers.get(cache_key) is None:
+                self._keyword_matchers[cache_key] = KeywordMatcher.from_keywords(keywords)
+            keywords = self._keyword_matchers[cache_key]
         
-        # Check if any keyword is in the message
-        return any(keyword in message_text for keyword in keywords)
+        return keywords.matches(message_text)
     
-    def extract_data_from_profile(self, messages):
+    @profiler.profiled("enrichment")
+    def extract_data_from_profile(self, messages, deadline=None):
         print("\nExtracting email addresses from profiles...")
+        deadline = deadline or Deadline()
+        started = time.time()
+        visited = 0
         
         for i, message in enumerate(messages):
-            print(f"Processing profile {i+1}/{len(messages)}: {message['profile_url']}")
+            # Leave the remaining profiles for a later run if the next one would not finish in time
+            if not deadline.allows((time.time() - started) / visited if visited else 0.0):
+                self._defer("profiles", len(messages) - i, messages[i:])
+                break
             
-            # Check if profile_url is valid
-            if not message.get('profile_url') or not isinstance(message['profile_url'], str):
-                print(f"Invalid profile URL for {message['name']}, skipping email extraction")
-                message['email'] = None
-                message['website'] = None
-                continue
+            print(f"Processing profile {i+1}/{len(messages)}: {message.profile_url}")
             
-            # Clean the profile URL if needed
-            profile_url = message['profile_url']
-            if not profile_url.startswith('http'):
-                profile_url = f"https://www.linkedin.com{profile_url}"
+            # Reuse profiles already enriched by a previous (crashed) run
+            if self.journal and message.profile_url:
+                enriched = self.journal.get_enriched_profile(message.profile_url)
+                if enriched is not None:
+                    message.update(enriched)
+                    print("Profile already enriched in the run journal, skipping")
+                    continue
+            
+            # Recycle the browser between profiles if it has grown too large
+            self.lifecycle.maybe_recycle()
+            
+            if self.extract_single_profile(message) is None:
+                return messages
+            visited += 1
+            
+            if self.journal and message.profile_url:
+                self.journal.finish_profile(message.profile_url, message)
+        
+        return messages
+    
+    # Marks the outgoing document so a tab is only considered loaded once the new page replaced it
+    FIRE_NAVIGATION_SCRIPT = "document.documentElement.setAttribute('data-scraper-stale', '1'); window.location.href = arguments[0];"
+    TAB_READY_SCRIPT = """
+return !document.documentElement.hasAttribute('data-scraper-stale') &&
+    document.readyState !== 'loading' &&
+    (document.querySelector('h1') !== null || document.readyState === 'complete');
+"""
+    
+    @profiler.profiled("enrichment")
+    def extract_data_from_profiles_in_tabs(self, messages, tabs=3, page_timeout=30, deadline=None, max_tab_retries=2):
+        """
+        Enrich profiles using several tabs of the same browser.
+        
+        Navigations to the next `tabs` profiles are fired at once without
+        waiting, then the tabs are polled round-robin and whichever has
+        finished loading is extracted and refilled. Network latency overlaps
+        while only one Chrome process tree stays alive.
+        
+        Args:
+            messages (list): Messages whose profiles should be enriched
+            tabs (int): Number of tabs to keep loading concurrently
+            page_timeout (int): Seconds after which a tab is extracted even if not fully loaded
+            deadline (Deadline, optional): Stop starting new profiles once one would not finish in time
+            max_tab_retries (int): Times a profile in flight when the tab pool broke is loaded again
             
+        Returns:
+            list: The enriched messages
+        """
+        print(f"\nExtracting email addresses from profiles using {tabs} tabs...")
+        deadline = deadline or Deadline()
+        started = time.time()
+        
+        pending = deque()
+        for message in messages:
+            if self.journal and message.profile_url:
+                enriched = self.journal.get_enriched_profile(message.profile_url)
+                if enriched is not None:
+                    message.update(enriched)
+                    continue
+            if self._profile_page_url(message):
+                pending.append(message)
+        
+        total = len(pending)
+        done = 0
+        attempts = {}
+        in_flight = {}
+        handles = []
+        recycle_reason = None
+        
+        while pending or in_flight:
             try:
-                # Check if browser is still open
-                if not self.is_browser_window_open():
-                    if not self.restart_browser_if_needed():
+                if not handles:
+                    if not self.is_browser_window_open() and not self.restart_browser_if_needed():
                         print("Failed to restart browser. Aborting email extraction.")
                         return messages
+                    handles = self._open_tabs(tabs)
                 
-                # Navigate to the profile page
-                self.driver.get(profile_url)
-                time.sleep(3)
+                # Leave the remaining profiles for a later run once one would not finish in time
+                if pending and not deadline.allows((time.time() - started) / done * tabs if done else 0.0):
+                    self._defer("profiles", len(pending), pending)
+                    pending.clear()
                 
-                # Check for Microsoft authentication error
-                if self.handle_microsoft_auth_error():
-                    print("Handled Microsoft authentication error, continuing with profile extraction...")
+                # Fire navigations into idle tabs, unless the browser is due for recycling
+                for handle in handles:
+                    if recycle_reason or not pending:
+                        break
+                    if handle in in_flight:
+                        continue
+                    if not rate_scheduler.try_acquire(self.rate_target):
+                        break  # Not LinkedIn's turn yet, keep extracting the loaded tabs
+                    message = pending.popleft()
+                    self.driver.switch_to.window(handle)
+                    if self.journal:
+                        self.journal.start_profile(message.profile_url)
+                    self.driver.execute_script(self.FIRE_NAVIGATION_SCRIPT, self._profile_page_url(message))
+                    in_flight[handle] = (message, time.time())
                 
-                # Extract the full name from the profile
-                try:
-                    # Look for the name in the profile header using a simpler h1 selector
-                    name_element = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "h1"))
-                    )
-                    full_name = name_element.text.strip()
-                    if full_name:
-                        message['name'] = full_name
-                        print(f"Found full name: {full_name}")
-                except (TimeoutException, NoSuchElementException) as e:
-                    print(f"Could not extract full name: {str(e)}")
+                # Recycle only once every tab has drained
+                if recycle_reason and not in_flight:
+                    self._close_tabs(handles)
+                    handles = []
+                    self.lifecycle.recycle(recycle_reason)
+                    recycle_reason = None
+                    continue
                 
-                # Try to find the contact info button
-                try:
-                    # Look for the contact info button with a more reliable selector
-                    contact_info_button = WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='overlay/contact-info']"))
-                    )
-                    contact_info_button.click()
-                    time.sleep(2)
+                # Extract whichever tabs have finished loading
+                extracted = False
+                for handle in list(in_flight):
+                    message, tab_started = in_flight[handle]
+                    self.driver.switch_to.window(handle)
+                    elapsed = time.time() - tab_started
+                    if not self.driver.execute_script(self.TAB_READY_SCRIPT) and elapsed < page_timeout:
+                        continue
                     
-                    contact_info = {}
+                    del in_flight[handle]
+                    done += 1
+                    if elapsed < page_timeout:
+                        metrics.observe("navigation", elapsed, status="ok")
+                        self._page_loaded(elapsed)
+                    else:
+                        metrics.observe("navigation", elapsed, status="timeout")
+                        self.lifecycle.record_page(elapsed)
+                    print(f"Processing profile {done}/{total}: {message.profile_url} (loaded in {elapsed:.1f}s)")
+                    self.extract_loaded_profile(message)
+                    if self.journal:
+                        self.journal.finish_profile(message.profile_url, message)
+                    extracted = True
+                    if not recycle_reason:
+                        recycle_reason = self.lifecycle.should_recycle()
+                
+                if not extracted:
+                    time.sleep(0.2)
+            except Exception as e:
+                print(f"Error in tab pool: {str(e)}")
+                browser_alive = self.is_browser_window_open()
+                # Requeue in-flight profiles, giving up on one only after it broke several tab pools
+                for message, _ in in_flight.values():
+                    attempts[message.key] = attempts.get(message.key, 0) + 1
+                    if attempts[message.key] > max_tab_retries:
+                        print(f"Giving up on {message.profile_url} after {attempts[message.key]} failed loads")
+                        message.email = None
+                        message.website = None
+                        done += 1
+                    else:
+                        pending.appendleft(message)
+                if browser_alive:
+                    # A tab went away under us, rebuild the pool
+                    self._close_tabs(self.driver.window_handles)
+                in_flight = {}
+                handles = []
+        
+        self._close_tabs(handles)
+        return messages
+    
+    def _defer(self, stage, count, contacts=()):
+        """Record work left undone because the run deadline was reached, and the contacts it concerns."""
+        self.deferred[stage] += count
+        self.deferred_keys.update(contact.key for contact in contacts)
+        metrics.increment("deferred", count, stage=stage)
+        print(f"Deadline reached, deferring {count} {stage} to a later run (--resume picks them up)")
+    
+    def _open_tabs(self, count):
+        """Open tabs in the current browser until there are `count` of them and return their handles."""
+        handles = list(self.driver.window_handles)
+        while len(handles) < count:
+            self.driver.switch_to.window(handles[-1])
+            self.driver.switch_to.new_window('tab')
+            handles.append(self.driver.current_window_handle)
+        return handles[:count]
+    
+    def _close_tabs(self, handles):
+        """Close every tab but the first one and switch back to it."""
+        if not handles:
+            return
+        try:
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(handles[0])
+        except Exception as e:
+            print(f"Error closing tabs: {str(e)}")
+    
+    def _profile_page_url(self, message):
+        """
+        Return the absolute profile URL of a message, or None if it has no usable URL.
+        """
+        # Check if profile_url is valid
+        if not message.profile_url or not isinstance(message.profile_url, str):
+            print(f"Invalid profile URL for {message.display_name}, skipping email extraction")
+            message.email = None
+            message.website = None
+            return None
+        
+        # Relative URLs, and LinkedIn URLs while replaying, point at the server pages come from
+        return self._page_url(message.profile_url)
+    
+    @metrics.timed("profile_enrichment")
+    def extract_single_profile(self, message, on_loaded=None):
+        """
+        Visit a contact's profile and fill in name, email and website.
+        
+        Args:
+            message (Contact): The contact to enrich
+            on_loaded (callable, optional): Called between loading the page and reading it
+        
+        Returns:
+            dict: The updated message, or None if the browser could not be restarted
+        """
+        profile_url = self._profile_page_url(message)
+        if not profile_url:
+            return message
+        
+        try:
+            # Check if browser is still open
+            if not self.is_browser_window_open():
+                if not self.restart_browser_if_needed():
+                    print("Failed to restart browser. Aborting email extraction.")
+                    return None
+            
+            if self.journal:
+                self.journal.start_profile(message.profile_url)
+            
+            # Navigate to the profile page and wait for its header, or for a redirect away from it
+            self.navigate(profile_url)
+            try:
+                WebDriverWait(self.driver, 10).until(
+                    lambda d: d.find_elements(By.CSS_SELECTOR, "main h1, .pv-top-card, .top-card-layout")
+                    or "/in/" not in d.current_url
+                )
+            except TimeoutException:
+                print(f"Profile of {message.display_name} did not finish loading, reading what is there")
+        except Exception as e:
+            print(f"Error extracting email for {message.display_name}: {str(e)}")
+            message.email = None
+            message.website = None
+            return message
+        
+        if on_loaded is not None:
+            on_loaded()
+        return self.extract_loaded_profile(message)
+    
+    @metrics.timed("profile_extract")
+    def extract_loaded_profile(self, message):
+        """
+        Read name, email and website from the profile page loaded in the current tab.
+        
+        Args:
+            message (dict): The message whose profile is loaded
+            
+        Returns:
+            dict: The updated message
+        """
+        try:
+            # Check for Microsoft authentication or verification challenges
+            if self.handle_page_challenges() in PageState.CHALLENGES:
+                print("Handled authentication challenge, continuing with profile extraction...")
+            
+            if self.recorder:
+                self.recorder.record(self.driver, "profile")
+            
+            # Extract the full name from the profile header
+            name_element = self.selectors.find(self.driver, "name")
+            full_name = name_element.text.strip() if name_element is not None else None
+            if full_name:
+                message.name = full_name
+                print(f"Found full name: {full_name}")
+            else:
+                print(f"Could not extract full name for {message.display_name}")
+            
+            # Try to find the contact info button
+            try:
+                contact_info_button = self.selectors.find(self.driver, "contact_info_button")
+                if contact_info_button is None:
+                    raise NoSuchElementException("No contact info link on the profile")
+                contact_info_button.click()
+                self._wait(2, "contact_info_overlay")
+                if self.recorder:
+                    self.recorder.record(self.driver, "contact_overlay")
+                
+                contact_info = {}
 
-                    # Try to find the contact info section
-                    try:
-                        # Look for the contact info container
-                        contact_info_sections = self.driver.find_elements(By.CLASS_NAME, "pv-contact-info__contact-type")
-                        
-                        if not contact_info_sections:
-                            print(f"No contact info sections found for {message['name']}")
-                            # Try alternative selectors
-                            contact_info_sections = self.driver.find_elements(By.CSS_SELECTOR, ".pv-contact-info__contact-type, .pv-contact-info__ci-container")
-                        
-                        # Process each contact info section
-                        for section in contact_info_sections:
-                            # First try to find <a> tags (links)
-                            links = section.find_elements(By.TAG_NAME, "a")
-                            for link in links:
-                                try:
-                                    href = link.get_attribute("href")
-                                    if href:
-                                        if "mailto:" in href:  # Extract email
-                                            email = href.replace("mailto:", "").strip()
-                                            if re.match(r"[^@]+@[^@]+\.[^@]+", email):  # Validate email format
-                                                contact_info["email"] = email
-                                                print(f"Found email for {message['name']}: {email}")
-                                        elif "http" in href:  # Extract website or social media link
-                                            if "linkedin.com" not in href:  # Exclude LinkedIn URLs
-                                                contact_info["website"] = href
-                                                print(f"Found website for {message['name']}: {href}")
-                                except Exception as e:
-                                    print(f"Error processing link: {str(e)}")
-                            
-                            # Then try to find <span> tags (text content)
-                            spans = section.find_elements(By.TAG_NAME, "span")
-                            for span in spans:
-                                try:
-                                    text = span.text.strip()
-                                    if text:
-                                        # Check if it looks like an email
-                                        if re.match(r"[^@]+@[^@]+\.[^@]+", text):
-                                            contact_info["email"] = text
-                                            print(f"Found email in span for {message['name']}: {text}")
-                                        # Check if it looks like a website
-                                        elif text.startswith(("http://", "https://", "www.")):
-                                            if "linkedin.com" not in text:  # Exclude LinkedIn URLs
-                                                contact_info["website"] = text
-                                                print(f"Found website in span for {message['name']}: {text}")
-                                except Exception as e:
-                                    print(f"Error processing span: {str(e)}")
-                        
-                        # If no email found in links or spans, try the old method as fallback
-                        if "email" not in contact_info:
+                # Try to find the contact info section
+                try:
+                    # Look for the contact info sections, with the alternative selectors polled under the same timeout
+                    contact_info_sections = self.selectors.find_all(self.driver, "contact_sections")
+                    if not contact_info_sections:
+                        print(f"No contact info sections found for {message.display_name}")
+                    
+                    # Process each contact info section
+                    for section in contact_info_sections:
+                        # First try to find <a> tags (links)
+                        links = section.find_elements(By.TAG_NAME, "a")
+                        for link in links:
                             try:
-                                email_element = WebDriverWait(self.driver, 3).until(
-                                    EC.presence_of_element_located((By.CSS_SELECTOR, ".ci-email .pv-contact-info__ci-container"))
-                                )
-                                email = email_element.text.strip()
-                                
-                                # Validate email format
-                                if re.match(r"[^@]+@[^@]+\.[^@]+", email):
-                                    contact_info["email"] = email
-                                    print(f"Found email using fallback method for {message['name']}: {email}")
-                            except (TimeoutException, NoSuchElementException):
-                                pass
+                                href = link.get_attribute("href")
+                                if href:
+                                    if "mailto:" in href:  # Extract email
+                                        email = href.replace("mailto:", "").strip()
+                                        if re.match(r"[^@]+@[^@]+\.[^@]+", email):  # Validate email format
+                                            contact_info["email"] = email
+                                            print(f"Found email for {message.display_name}: {email}")
+                                    elif "http" in href:  # Extract website or social media link
+                                        if "linkedin.com" not in href and not href.startswith(self.base_url):  # Exclude LinkedIn URLs
+                                            contact_info["website"] = href
+                                            print(f"Found website for {message.display_name}: {href}")
+                            except Exception as e:
+                                print(f"Error processing link: {str(e)}")
                         
-                    except Exception as e:
-                        print(f"Error extracting contact info for {message['name']}: {str(e)}")
-                    
-                    # Update message with contact info
-                    message['email'] = contact_info.get("email")
-                    message['website'] = contact_info.get("website")
+                        # Then try to find <span> tags (text content)
+                        spans = section.find_elements(By.TAG_NAME, "span")
+                        for span in spans:
+                            try:
+                                text = span.text.strip()
+                                if text:
+                                    # Check if it looks like an email
+                                    if re.match(r"[^@]+@[^@]+\.[^@]+", text):
+                                        contact_info["email"] = text
+                                        print(f"Found email in span for {message.display_name}: {text}")
+                                    # Check if it looks like a website
+                                    elif text.startswith(("http://", "https://", "www.")):
+                                        if "linkedin.com" not in text:  # Exclude LinkedIn URLs
+                                            contact_info["website"] = text
+                                            print(f"Found website in span for {message.display_name}: {text}")
+                            except Exception as e:
+                                print(f"Error processing span: {str(e)}")
                     
-                    # Close the contact info overlay if it's open
-                    try:
-                        close_button = self.driver.find_element(By.CSS_SELECTOR, "button[aria-label='Dismiss']")
-                        close_button.click()
-                        time.sleep(1)
-                    except:
-                        pass
+                    # If no email found in links or spans, try the old method as fallback
+                    # (short-circuited once profiles consistently have no such element)
+                    if "email" not in contact_info:
+                        email_element = self.selectors.find(self.driver, "email")
+                        if email_element is not None:
+                            email = email_element.text.strip()
+                            
+                            # Validate email format
+                            if re.match(r"[^@]+@[^@]+\.[^@]+", email):
+                                contact_info["email"] = email
+                                print(f"Found email using fallback method for {message.display_name}: {email}")
                     
-                except (TimeoutException, NoSuchElementException, ElementClickInterceptedException):
-                    print(f"Could not access contact info for {message['name']}")
-                    message['email'] = None
-                    message['website'] = None
-            
-            except Exception as e:
-                print(f"Error extracting email for {message['name']}: {str(e)}")
-                message['email'] = None
-                message['website'] = None
+                except Exception as e:
+                    print(f"Error extracting contact info for {message.display_name}: {str(e)}")
+                
+                # Update message with contact info
+                message.email = contact_info.get("email")
+                message.website = contact_info.get("website")
+                
+                # Close the contact info overlay if it's open
+                try:
+                    close_button = self.driver.find_element(By.CSS_SELECTOR, "button[aria-label='Dismiss']")
+                    close_button.click()
+                    time.sleep(1)
+                except:
+                    pass
+                
+            except (TimeoutException, NoSuchElementException, ElementClickInterceptedException):
+                print(f"Could not access contact info for {message.display_name}")
+                message.email = None
+                message.website = None
         
-        return messages
+        except Exception as e:
+            print(f"Error extracting email for {message.display_name}: {str(e)}")
+            message.email = None
+            message.website = None
+        
+        return message
     
-    def handle_microsoft_auth_error(self):
+    def handle_page_challenges(self):
+        """
+        Classify the current page once and run the matching challenge handler, if any.
+        
+        Returns:
+            str: The PageState of the page before any handler ran
+        """
+        state = self.page_classifier.classify(self.driver)
+        if state in PageState.CHALLENGES:
+            rate_scheduler.throttled(self.rate_target, state)
+        if state == PageState.AUTH_INTERSTITIAL:
+            self.handle_microsoft_auth_error(state)
+        elif state == PageState.VERIFICATION:
+            self.handle_verification_request(state)
+        return state
+    
+    def handle_microsoft_auth_error(self, state=None):
         try:
-            # Check if there's an error message related to Microsoft authentication
-            error_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'Microsoft') or contains(text(), 'authentication')]")
-            if error_elements:
+            # Check if the page is a Microsoft authentication interstitial
+            if state is None:
+                state = self.page_classifier.classify(self.driver)
+            if state == PageState.AUTH_INTERSTITIAL:
                 print("Detected Microsoft authentication error. Attempting to work around...")
                 
                 # Try to refresh the page
@@ -339,37 +680,183 @@ class LinkedInScraper:
     def restart_browser_if_needed(self):
         if not self.is_browser_window_open():
             print("Browser window is closed. Restarting...")
-            # Set up ChromeDriver path
-            driver_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'drivers', 'chromedriver')
-            if os.path.exists(driver_path):
-                # Use local ChromeDriver if available
-                service = Service(executable_path=driver_path)
-                self.driver = webdriver.Chrome(service=service)
-            else:
-                # Fall back to system ChromeDriver
-                self.driver = webdriver.Chrome()
-            return True
+            self.driver = self._create_driver()
+            self.lifecycle.reset()
+            
+            # A fresh browser has no cookies, log back in before continuing
+            return self.restore_session()
         return False
     
-    def scrape_linkedin(self, use_cookies=True, keywords=None, max_threads=10):
+    def restore_session(self, use_cookies=True):
+        """
+        Restore the LinkedIn session from saved cookies, logging in again if they are stale.
+        
+        Args:
+            use_cookies (bool): Try the saved cookies first, otherwise log in with credentials right away
+        """
+        if self.replaying:
+            return True
+        if not use_cookies:
+            return self.login_with_credentials()
+        print("Restoring LinkedIn session...")
+        if self.use_existing_session():
+            print("Session restored from cookies")
+            return True
+        print("Could not restore session from cookies. Logging in with credentials...")
+        return self.login_with_credentials()
+    
+    def _thread_key(self, thread, index):
+        """Return a stable identifier for a conversation list item."""
+        try:
+            href = thread.get_attribute("href")
+            if href:
+                return href.split('?')[0]
+        except Exception:
+            pass
+        return f"thread-{index}"
+    
+    def _load_chat_threads(self, max_threads):
+        """Navigate to the messaging page and return the conversation list items."""
+        self.navigate(f"{self.base_url}/messaging/")
+        
+        # Check for verification request after navigation
+        self.handle_page_challenges()
+        try:
+            WebDriverWait(self.driver, 15).until(
+                EC.presence_of_element_located((By.CLASS_NAME, "msg-conversation-listitem__link"))
+            )
+        except TimeoutException:
+            pass
+        
+        # Find the message list container element
+        message_list = self.driver.find_element(By.CLASS_NAME, "msg-conversations-container__conversations-list")
+        
+        chat_threads = self.driver.find_elements(By.CLASS_NAME, "msg-conversation-listitem__link")
+        
+        # Scroll to load more threads if necessary, until the list stops growing
+        while len(chat_threads) < max_threads:
+            self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", message_list)
+            self._wait(2, "thread_list_scroll")
+            loaded = self.driver.find_elements(By.CLASS_NAME, "msg-conversation-listitem__link")
+            if len(loaded) <= len(chat_threads):
+                break
+            chat_threads = loaded
+        
+        if self.recorder:
+            self.recorder.record(self.driver, "messaging")
+        return chat_threads
+    
+    def _wait(self, seconds, reason):
+        """Fixed wait for the page to settle, scaled by wait_scale (replayed pages need far less)."""
+        if self.wait_scale:
+            metrics.sleep(seconds * self.wait_scale, reason)
+    
+    # Walks the loaded events of the open conversation in one call. Sender, day and time
+    # are only rendered on the first event of a group, so they carry over to the next ones.
+    THREAD_EVENTS_SCRIPT = """
+const events = [];
+let sender = null, day = null, clock = null;
+for (const item of document.querySelectorAll('.msg-s-message-list__event')) {
+    const heading = item.querySelector('.msg-s-message-list__time-heading');
+    if (heading) day = heading.textContent.trim();
+    const name = item.querySelector('.msg-s-message-group__name');
+    if (name) sender = name.textContent.trim();
+    const time = item.querySelector('.msg-s-message-group__timestamp');
+    if (time) clock = time.textContent.trim();
+    const body = item.querySelector('.msg-s-event-listitem__body');
+    if (!body) continue;
+    const event = item.querySelector('[data-event-urn]');
+    events.push({
+        event_id: event ? event.getAttribute('data-event-urn') : null,
+        sender: sender,
+        sent_at: [day, clock].filter(Boolean).join(' ') || null,
+        body: body.innerText.trim()
+    });
+}
+return events;
+"""
+    SCROLL_HISTORY_SCRIPT = """
+const list = document.querySelector('.msg-s-message-list');
+if (list) list.scrollTop = 0;
+"""
+    
+    @metrics.timed("thread_capture")
+    def sync_conversation(self, conversation_key, profile_url=None, history_scrolls=3):
+        """
+        Capture the events of the open conversation and store the ones not seen before.
+        
+        Only the events after the newest stored one are added. Older history is
+        loaded by scrolling up, but only as far as needed: until the last stored
+        event shows up, or at most `history_scrolls` times for a new conversation.
+        
+        Args:
+            conversation_key (str): Stable identifier of the conversation
+            profile_url (str, optional): Profile URL of the contact the conversation is with
+            history_scrolls (int): Maximum number of times to scroll up for older events
+            
+        Returns:
+            tuple: (loaded events oldest first, number of new events stored)
+        """
+        last_id = self.contact_store.last_event_id(conversation_key)
+        events = self.driver.execute_script(self.THREAD_EVENTS_SCRIPT) or []
+        
+        for _ in range(history_scrolls):
+            ids = [self.contact_store.event_id(event) for event in events]
+            if last_id in ids:
+                break
+            self.driver.execute_script(self.SCROLL_HISTORY_SCRIPT)
+            self._wait(1.5, "history_scroll")
+            loaded = self.driver.execute_script(self.THREAD_EVENTS_SCRIPT) or []
+            if len(loaded) <= len(events):
+                break  # Reached the start of the conversation
+            events = loaded
+        
+        ids = [self.contact_store.event_id(event) for event in events]
+        new_events = events[ids.index(last_id) + 1:] if last_id in ids else events
+        
+        # Events are stored under the same key as the contact built from this thread
+        contact = Contact(message=events[0]["body"] if events else None, profile_url=profile_url)
+        added = self.contact_store.add_events(conversation_key, new_events, contact_key=contact.key)
+        self.last_conversation = (conversation_key, contact.key, events)
+        return events, added
+    
+    @metrics.timed("scrape_linkedin")
+    @profiler.profiled("harvesting")
+    def scrape_linkedin(self, use_cookies=True, keywords=None, max_threads=10, resume=False, tabs=1, whole_words=None,
+                        top_n=None, min_score=None, deadline=None):
         global driver
+        deadline = deadline or Deadline()
+        self.deferred = {"threads": 0, "profiles": 0}
+        self.deferred_keys = set()
         
         # Default keywords if none provided
         if keywords is None:
-            keywords = ["real estate", "agent", "immobilier"]
-        elif isinstance(keywords, str):
-            # Split comma-separated string into list
-            keywords = [k.strip() for k in keywords.split(",")]
+            keywords = self.DEFAULT_KEYWORDS
+        
+        # Compile the filter once for the whole run (a string is parsed as a boolean expression)
+        if not isinstance(keywords, KeywordMatcher):
+            keywords = KeywordMatcher.from_keywords(keywords, whole_words=True if whole_words is None else whole_words)
+        elif whole_words is not None and keywords.whole_words != whole_words:
+            # An explicit whole_words applies to a compiled filter too
+            keywords = KeywordMatcher(keywords.describe(), whole_words=whole_words)
         
-        print(f"Filtering messages for keywords: {', '.join(keywords)}")
+        print(f"Filtering messages for keywords: {keywords.describe()}")
         print(f"Maximum number of threads to process: {max_threads}")
+        if deadline.enabled:
+            print(f"Deadline: {deadline.describe()}")
+        
+        # Open the run journal, picking up a previous run if requested
+        self.journal = RunJournal(path=self.journal_path, resume=resume)
+        self.journal.start_run(keywords=keywords.describe(), max_threads=max_threads)
         
         # Check if browser is open, restart if needed
         if not self.is_browser_window_open():
             self.restart_browser_if_needed()
         
         # Try to use cookies first (more reliable and less likely to trigger verification)
-        if use_cookies:
+        if self.replaying:
+            print(f"Replaying recorded pages from {self.base_url}, skipping login")
+        elif use_cookies or resume:
             print("Attempting to use existing session via cookies...")
             if self.use_existing_session():
                 print("Successfully loaded existing session!")
@@ -379,38 +866,20 @@ class LinkedInScraper:
         else:
             self.login_with_credentials()
         
-        # Navigate to the Messaging section
+        # Scrape messages related to real estate professionals, starting with
+        # the ones already recorded by a previous run
+        messages = list(self.journal.matched_messages)
         print("Navigating to LinkedIn Messaging...")
-        try:
-            self.driver.get("https://www.linkedin.com/messaging/")
-            time.sleep(5)
-            
-            # Check for verification request after navigation
-            self.handle_verification_request()
-        except Exception as e:
-            print(f"Error navigating to messaging page: {str(e)}")
-            if "no such window" in str(e):
-                self.restart_browser_if_needed()
-                self.driver.get("https://www.linkedin.com/messaging/")
-                time.sleep(5)
-                self.handle_verification_request()
-        
-        # Scrape messages related to real estate professionals
-        messages = []
         print("Looking for message threads...")
         
         try:
-            # Find the message list container element
-            message_list = self.driver.find_element(By.CLASS_NAME, "msg-conversations-container__conversations-list")
-
-            chat_threads = self.driver.find_elements(By.CLASS_NAME, "msg-conversation-listitem__link")
-            
-            # Scroll to load more threads if necessary
-            while len(chat_threads) < max_threads:
-                self.driver.execute_script("arguments[0].scrollTop = arguments[0].scrollHeight", message_list)
-                time.sleep(2)
-                chat_threads = self.driver.find_elements(By.CLASS_NAME, "msg-conversation-listitem__link")
-            
+            try:
+                chat_threads = self._load_chat_threads(max_threads)
+            except Exception as e:
+                print(f"Error navigating to messaging page: {str(e)}")
+                if "no such window" not in str(e) or not self.restart_browser_if_needed():
+                    raise
+                chat_threads = self._load_chat_threads(max_threads)
             
             if not chat_threads:
                 print("No message threads found. The page structure might have changed or you might not have any messages.")
@@ -420,44 +889,67 @@ class LinkedInScraper:
                 
                 # Determine how many threads to process
                 threads_to_process = min(len(chat_threads), max_threads)
+                thread_keys = [self._thread_key(thread, i) for i, thread in enumerate(chat_threads[:threads_to_process])]
+                started = time.time()
+                read = 0
                 
-                for i, thread in enumerate(chat_threads[:threads_to_process]):
+                for i, key in enumerate(thread_keys):
+                    if self.journal.is_thread_done(key):
+                        print(f"Skipping thread {i+1}/{threads_to_process} (already processed)")
+                        continue
+                    
+                    # Stop reading conversations when the next one would not finish in time
+                    if not deadline.allows((time.time() - started) / read if read else 0.0):
+                        self._defer("threads", sum(1 for k in thread_keys[i:] if not self.journal.is_thread_done(k)))
+                        break
+                    read += 1
+                    
                     print(f"Processing thread {i+1}/{threads_to_process}...")
                     
+                    # Recycle the browser between threads if it has grown too large
+                    if self.lifecycle.maybe_recycle():
+                        chat_threads = None
+                    
                     # Check if browser is still open before each thread
                     if not self.is_browser_window_open():
                         if not self.restart_browser_if_needed():
                             print("Failed to restart browser. Aborting scraping.")
                             return messages
+                        chat_threads = None
                     
+                    previous = None
                     try:
-                        thread.click()
-                        time.sleep(3)
+                        if self.replaying and key.startswith("http"):
+                            # Recorded pages are static, so a click would navigate away from the list:
+                            # open the thread's snapshot directly instead
+                            self.journal.start_thread(key)
+                            with metrics.span("thread_click"):
+                                self.navigate(key)
+                        else:
+                            # Thread elements are stale after a restart, reload the list and find the item again
+                            if chat_threads is None:
+                                chat_threads = self._load_chat_threads(max_threads)
+                            thread = next((t for j, t in enumerate(chat_threads) if self._thread_key(t, j) == key), None)
+                            if thread is None:
+                                print(f"Thread {key} is no longer in the conversation list, skipping")
+                                continue
+                            
+                            self.journal.start_thread(key)
+                            # The conversation open before the click stays in the page until the new one replaces it
+                            if self.driver.current_url.split('?')[0].rstrip('/') != key.rstrip('/'):
+                                previous = self._open_conversation()
+                            rate_scheduler.acquire(self.rate_target)
+                            start = time.time()
+                            with metrics.span("thread_click"):
+                                thread.click()
+                            self.lifecycle.record_page(time.time() - start)
+                            rate_scheduler.success(self.rate_target)
                         
                         try:
-                            message_content = self.driver.find_element(By.CLASS_NAME, "msg-s-event-listitem__body").text  # Extract message content
-                            
-                            # Get the profile URL
-                            try:
-                                profile_link = self.driver.find_element(By.CLASS_NAME, "msg-thread__link-to-profile")
-                                profile_url = profile_link.get_attribute("href")
-                                
-                                # Clean the profile URL if needed
-                                if profile_url and not profile_url.startswith('http'):
-                                    profile_url = f"https://www.linkedin.com{profile_url}"
-                            except:
-                                profile_url = None
-                            
-                            # Filter messages based on keywords
-                            if self.message_contains_keywords(message_content, keywords):
-                                messages.append({
-                                    "message": message_content, 
-                                    "profile_url": profile_url,
-                                    "name": None, 
-                                    "email": None,  # Initialize email field
-                                    "website": None  # Initialize website field
-                                })
-                                print(f"Found message matching keywords from: {profile_url}")
+                            contact = self.read_open_thread(key, keywords, previous)
+                            if contact is not None:
+                                messages.append(contact)
+                            self.journal.finish_thread(key, contact)
                         except NoSuchElementException as e:
                             print(f"Error extracting message data: {e}")
                             continue
@@ -467,6 +959,7 @@ class LinkedInScraper:
                             if not self.restart_browser_if_needed():
                                 print("Failed to restart browser. Aborting scraping.")
                                 return messages
+                            chat_threads = None
                         continue
         except Exception as e:
             print(f"Error finding message threads: {str(e)}")
@@ -477,31 +970,165 @@ class LinkedInScraper:
         
         # Print results
         if messages:
+            messages = self.rank_and_cluster(messages, top_n=top_n, min_score=min_score, keywords=keywords)
+            
             # Extract emails from profiles
-            messages = self.extract_data_from_profile(messages)
+            if tabs > 1:
+                messages = self.extract_data_from_profiles_in_tabs(messages, tabs=tabs, deadline=deadline)
+            else:
+                messages = self.extract_data_from_profile(messages, deadline=deadline)
+            # Deferred profiles were not visited and stay at the scraped stage
+            self.contact_store.upsert_contacts([msg for msg in messages if msg.key not in self.deferred_keys], "enriched")
             
             print(f"\nFound {len(messages)} messages matching your keywords:")
             for msg in messages:
-                print(f"- From: {msg['name']}")
-                print(f"  Message: {msg['message'][:100]}...")  # Print first 100 chars
-                print(f"  Profile: {msg['profile_url']}")
-                print(f"  Email: {msg['email'] or 'Not found'}")
-                print(f"  Website: {msg['website'] or 'Not found'}")
+                print(f"- From: {msg.name}")
+                print(f"  Message: {msg.message[:100]}...")  # Print first 100 chars
+                print(f"  Profile: {msg.profile_url}")
+                print(f"  Email: {msg.email or 'Not found'}")
+                print(f"  Website: {msg.website or 'Not found'}")
                 print()
         else:
             print("\nNo messages matching your keywords were found.")
         
+        # A run cut short by its deadline stays open so --resume finishes the deferred work
+        if any(self.deferred.values()):
+            print(f"\nDeadline reached: {self.deferred['threads']} conversations and {self.deferred['profiles']} "
+                  f"profiles deferred, run with --resume to process them")
+        else:
+            self.journal.complete()
+        self.journal.close()
+        
+        self.lifecycle.print_report()
+        self.page_classifier.print_report()
+        self.selectors.save()
+        self.selectors.print_report()
+        
+        return messages
+    
+    def _open_conversation(self):
+        """
+        Identify the conversation currently shown, to tell when another one has replaced it.
+        
+        Returns:
+            tuple: (first message element, its text, profile link), with None for what is missing
+        """
+        try:
+            bodies = self.driver.find_elements(By.CLASS_NAME, "msg-s-event-listitem__body")
+            links = self.driver.find_elements(By.CLASS_NAME, "msg-thread__link-to-profile")
+            return (bodies[0] if bodies else None, bodies[0].text if bodies else None,
+                    links[0].get_attribute("href") if links else None)
+        except StaleElementReferenceException:
+            return None, None, None
+    
+    def read_open_thread(self, key, keywords, previous=None):
+        """
+        Capture the conversation open in the current tab and filter it on the keywords.
+        
+        Args:
+            key (str): Stable identifier of the conversation
+            keywords (KeywordMatcher): Filter applied to the whole exchange
+            previous (tuple, optional): _open_conversation() from before the click that opened this one
+            
+        Returns:
+            Contact: The contact the conversation is with, or None if it does not match
+        """
+        def conversation_ready(driver):
+            bodies = driver.find_elements(By.CLASS_NAME, "msg-s-event-listitem__body")
+            if not bodies:
+                return False
+            if previous is None:
+                return True
+            old_body, old_text, old_link = previous
+            # The previous conversation's messages are gone, or updated in place for another contact
+            if old_body is None or EC.staleness_of(old_body)(driver):
+                return True
+            links = driver.find_elements(By.CLASS_NAME, "msg-thread__link-to-profile")
+            return bool(links) and links[0].get_attribute("href") != old_link and bodies[0].text != old_text
+        
+        # Wait for this conversation to render rather than for a fixed time
+        try:
+            WebDriverWait(self.driver, 10, ignored_exceptions=(StaleElementReferenceException,)).until(conversation_ready)
+        except TimeoutException:
+            print("Conversation did not finish loading, reading what is there")
+        
+        # Get the profile URL
+        try:
+            profile_link = self.driver.find_element(By.CLASS_NAME, "msg-thread__link-to-profile")
+            profile_url = profile_link.get_attribute("href")
+            
+            # Clean the profile URL if needed
+            if profile_url and not profile_url.startswith('http'):
+                profile_url = f"{self.base_url}{profile_url}"
+        except:
+            profile_url = None
+        
+        # Capture the whole exchange, storing only events newer than the last run's
+        events, added = self.sync_conversation(key, profile_url)
+        if self.recorder:
+            self.recorder.record(self.driver, "conversation")
+        if events:
+            print(f"Captured {len(events)} messages in the conversation ({added} new)")
+            message_content = events[0]["body"]
+            thread_text = "\n".join(event["body"] for event in events)
+        else:
+            message_content = self.driver.find_element(By.CLASS_NAME, "msg-s-event-listitem__body").text  # Extract message content
+            thread_text = message_content
+        
+        # Filter messages based on keywords anywhere in the exchange
+        if not self.message_contains_keywords(thread_text, keywords):
+            return None
+        print(f"Found message matching keywords from: {profile_url}")
+        return Contact(message=message_content, profile_url=profile_url)
+    
+    def rank_and_cluster(self, messages, top_n=None, min_score=None, keywords=None):
+        """
+        Rank matched contacts, cluster their messages and store them as scraped.
+        
+        Args:
+            messages (list): Contacts whose conversation matched the keywords, in conversation list order
+            top_n (int, optional): Keep only the N most relevant contacts
+            min_score (float, optional): Drop contacts scoring below this
+            keywords (KeywordMatcher, optional): The filter, whose terms count towards priority
+            
+        Returns:
+            list: The kept contacts, highest priority first
+        """
+        # LinkedIn lists conversations by last activity, so list order gives their recency
+        recency = ContactPrioritizer.recency_from_order(messages)
+        
+        # Rank matches locally so browser time goes to the best leads first
+        ranked = RelevanceScorer().rank(messages, top_n=top_n, min_score=min_score)
+        if len(ranked) < len(messages):
+            print(f"Keeping the {len(ranked)} most relevant of {len(messages)} matching messages")
+        messages = ranked
+        
+        # Cluster templated outreach so generation can reuse one completion per template
+        duplicate_index = NearDuplicateIndex(path=self.duplicate_index_path)
+        for msg in messages:
+            msg.cluster_id = duplicate_index.cluster_for(msg.message)
+        duplicate_index.save()
+        summary = duplicate_index.summary([msg.cluster_id for msg in messages])
+        print(f"Near-duplicate check: {summary['messages']} messages in {summary['clusters']} clusters "
+              f"({summary['duplicates']} duplicates, {summary['seen_before']} templates seen in earlier runs)")
+        self.contact_store.upsert_contacts(messages, "scraped")
+        
+        # Enrich recent, strongly matching contacts and those with a known email first,
+        # so a run cut short by its deadline has reached the most valuable ones
+        messages = self.prioritizer.prioritize(messages, recency, keywords, self.contact_store.email_keys())
+        print(f"Enrichment order: {self.prioritizer.describe(messages)}")
         return messages
     
     def login_with_credentials(self):
         print("Attempting to log in to LinkedIn...")
-        self.driver.get("https://www.linkedin.com/login")
+        self.driver.get(f"{self.base_url}/login")
         time.sleep(2)
         
         username = self.driver.find_element(By.ID, "username")
         password = self.driver.find_element(By.ID, "password")
-        username.send_keys(LINKEDIN_EMAIL)  # Using credentials from .env file
-        password.send_keys(LINKEDIN_PASSWORD)  # Using credentials from .env file
+        email, secret = self.credentials  # From .env, or the worker's account
+        username.send_keys(email)
+        password.send_keys(secret)
         password.send_keys(Keys.RETURN)
         time.sleep(5)
         
@@ -519,11 +1146,12 @@ class LinkedInScraper:
         
         return True
     
-    def handle_verification_request(self):
+    def handle_verification_request(self, state=None):
         try:
-            # Check if there's a verification code input field
-            verification_elements = self.driver.find_elements(By.XPATH, "//input[contains(@id, 'pin') or contains(@id, 'verification') or contains(@id, 'code')]")
-            if verification_elements:
+            # Check if LinkedIn is showing a verification challenge
+            if state is None:
+                state = self.page_classifier.classify(self.driver)
+            if state == PageState.VERIFICATION:
                 print("LinkedIn is requesting verification. Please enter the verification code manually.")
                 print("After entering the code, the script will continue automatically.")
                 
@@ -531,10 +1159,7 @@ class LinkedInScraper:
                 # We'll wait for the verification input to disappear or for the feed page to load
                 try:
                     WebDriverWait(self.driver, 300).until(
-                        lambda d: (
-                            len(d.find_elements(By.XPATH, "//input[contains(@id, 'pin') or contains(@id, 'verification') or contains(@id, 'code')]")) == 0 or
-                            "feed" in d.current_url
-                        )
+                        lambda d: self.page_classifier.classify(d) != PageState.VERIFICATION
                     )
                     print("Verification completed or timed out. Continuing...")
                     
@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import requests
+
+
+class APIError(Exception):
+    """A completion request the API answered with an error status."""
+
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """Keeps the most recent call latencies of a backend and reports percentiles."""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def percentile(self, p):
+        """Return the p-th percentile latency in seconds, or None without samples."""
+        with self._lock:
+            samples = list(self.samples)
+        return float(np.percentile(samples, p)) if samples else None
+
+
+class OpenAICompatibleBackend:
+    """
+    Chat completions over HTTP for any OpenAI-compatible API (DeepSeek, OpenAI, vLLM, ...).
+    """
+
+    def __init__(self, name, api_url, api_key, model, timeout=120, pricing=None):
+        """
+        Initialize the backend.
+
+        Args:
+            name (str): Name used in logs and reports
+            api_url (str): Full chat completions URL
+            api_key (str): Bearer token
+            model (str): Model to request
+            timeout (float): Seconds before a request is abandoned
+            pricing (dict, optional): USD per million tokens for input_cache_hit, input_cache_miss and output
+        """
+        self.name = name
+        self.api_url = api_url
+        self.model = model
+        self.timeout = timeout
+        self.pricing = pricing
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.errors = 0
+        # Keep-alive connections save a TLS handshake per call
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}"
+        })
+
+    def complete(self, messages, max_tokens=1000, temperature=0.7):
+        """
+        Request a chat completion.
+
+        Args:
+            messages (list): Chat messages ({"role", "content"} dictionaries)
+            max_tokens (int): Completion token limit
+            temperature (float): Sampling temperature
+
+        Returns:
+            dict: The API response
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        self.calls += 1
+        start = time.time()
+        try:
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                retry_after = response.headers.get("Retry-After")
+                raise APIError(f"API call to {self.name} failed with status code {response.status_code}: {response.text}",
+                               response.status_code,
+                               retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+            return response.json()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.latency.record(time.time() - start)
+
+
+class StubBackend:
+    """
+    Local backend returning a canned completion, for dry runs and benchmarks without an API key.
+    """
+
+    DEFAULT_CONTENT = json.dumps({
+        "personalized_intro": "Thanks for reaching out on LinkedIn.",
+        "main_content": "I am building a tool that simplifies day-to-day work for real estate professionals.",
+        "call_to_action": "Would you be open to a short call next week?",
+        "topic": "Following up on our LinkedIn conversation",
+        "signature": "Best regards,\nKarim Abbes\nhttps://www.linkedin.com/in/karimabbes/"
+    })
+
+    def __init__(self, name="stub", latency=0.0, content=None, model="stub"):
+        """
+        Initialize the stub.
+
+        Args:
+            name (str): Name used in logs and reports
+            latency (float): Seconds each call sleeps before answering
+            content (str, optional): Completion text to return
+            model (str): Model name reported in responses
+        """
+        self.name = name
+        self.model = model
+        self.pricing = {"input_cache_hit": 0.0, "input_cache_miss": 0.0, "output": 0.0}
+        self.delay = latency
+        self.content = content or self.DEFAULT_CONTENT
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.errors = 0
+
+    def complete(self, messages, max_tokens=1000, temperature=0.7):
+        self.calls += 1
+        start = time.time()
+        if self.delay:
+            time.sleep(self.delay)
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        self.latency.record(time.time() - start)
+        return {
+            "model": self.model,
+            "choices": [{"message": {"role": "assistant", "content": self.content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(self.content) // 4,
+                "prompt_cache_hit_tokens": 0,
+                "prompt_cache_miss_tokens": prompt_tokens
+            }
+        }
+
+
+class HedgedBackend:
+    """
+    Sends each request to the first backend and, if it has not answered by
+    that backend's observed p90 latency, sends a duplicate to the next one.
+
+    Whichever answers first wins; the other request finishes in the
+    background and only contributes its latency. A hedge therefore costs a
+    second completion in roughly one call out of ten, in exchange for
+    cutting the slowest calls short. Hedging needs at least two backends and
+    `min_samples` latencies before it starts. Further backends are used in
+    turn when the earlier ones are slow or fail.
+    """
+
+    def __init__(self, backends, hedge_percentile=90, min_samples=10):
+        """
+        Initialize the hedged backend.
+
+        Args:
+            backends (list): Backends in order of preference
+            hedge_percentile (float): Latency percentile of the primary after which to hedge
+            min_samples (int): Calls needed before the percentile is trusted
+        """
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = backends
+        self.name = "+".join(backend.name for backend in backends)
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Answers of hedged duplicates that lost the race, still to be accounted for
+        self._wasted = []
+        self._wasted_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2 * len(backends), thread_name_prefix="llm")
+
+    def hedge_delay(self, backend):
+        """Seconds to wait for a backend before hedging, or None if hedging is off."""
+        if len(self.backends) < 2 or len(backend.latency) < self.min_samples:
+            return None
+        return backend.latency.percentile(self.hedge_percentile)
+
+    def complete(self, messages, max_tokens=1000, temperature=0.7):
+        """
+        Request a chat completion, hedging slow calls.
+
+        Backends are tried in order: the next one gets a duplicate when the
+        last one started has not answered by its hedge delay, or right away
+        when every request in flight has failed.
+
+        Returns:
+            dict: The first successful response, with the answering backend's name under "backend"
+        """
+        primary = self.backends[0]
+        futures = {self._pool.submit(primary.complete, messages, max_tokens, temperature): primary}
+        remaining = list(self.backends[1:])
+        latest = primary
+
+        error = None
+        pending = set(futures)
+        while pending:
+            timeout = self.hedge_delay(latest) if remaining else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                backend = futures[future]
+                if backend is not primary:
+                    self.hedge_wins += 1
+                for other in pending:
+                    other.add_done_callback(lambda f, b=futures[other]: self._discard(f, b))
+                response["backend"] = backend.name
+                return response
+
+            # Hedge a slow call, or fall back to the next backend as soon as every call failed
+            if remaining and (not done or not pending):
+                latest = remaining.pop(0)
+                self.hedges += 1
+                future = self._pool.submit(latest.complete, messages, max_tokens, temperature)
+                futures[future] = latest
+                pending.add(future)
+        raise error
+
+    def _discard(self, future, backend):
+        if future.cancelled() or future.exception() is not None:
+            return
+        with self._wasted_lock:
+            self._wasted.append((backend, future.result().get("usage") or {}))
+
+    def drain_wasted(self):
+        """
+        Return the usage of hedged duplicates that finished after losing the race.
+
+        Returns:
+            list: (backend, usage) tuples, each returned only once
+        """
+        with self._wasted_lock:
+            wasted, self._wasted = self._wasted, []
+        return wasted
+
+    def backend(self, name):
+        """Return the backend with the given name, or None."""
+        return next((backend for backend in self.backends if backend.name == name), None)
+
+    def report(self):
+        """
+        Summarize calls and latency per backend.
+
+        Returns:
+            dict: Calls, errors and p50/p90/p99 latency per backend, plus hedges sent and won
+        """
+        backends = {}
+        for backend in self.backends:
+            backends[backend.name] = {
+                "calls": backend.calls,
+                "errors": backend.errors,
+                "p50": backend.latency.percentile(50),
+                "p90": backend.latency.percentile(90),
+                "p99": backend.latency.percentile(99)
+            }
+        return {"backends": backends, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
+
+    def print_report(self):
+        report = self.report()
+        print("\nLLM backend latency:")
+        for name, stats in report["backends"].items():
+            if stats["p50"] is None:
+                print(f"- {name}: no calls")
+                continue
+            print(f"- {name}: {stats['calls']} calls, {stats['errors']} errors, "
+                  f"p50 {stats['p50']:.2f}s, p90 {stats['p90']:.2f}s, p99 {stats['p99']:.2f}s")
+        if len(self.backends) > 1:
+            print(f"Hedged requests: {report['hedges']} sent, {report['hedge_wins']} answered first")
+
+
+def load_backends(path=None, api_key=None):
+    """
+    Build the hedged backend described by the LLM backends configuration file.
+
+    Each entry has a "type" ("openai" or "stub"), a "name" and, for HTTP
+    backends, "api_url", "model", "api_key_env" (the environment variable
+    holding its key) and optionally "pricing" in USD per million tokens.
+
+    Args:
+        path (str, optional): Path to the JSON configuration file
+        api_key (str, optional): Key for the first HTTP backend, overriding its environment variable
+
+    Returns:
+        HedgedBackend: The configured backends
+    """
+    path = path or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "config",
+        "llm_backends.json"
+    )
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    backends = []
+    for entry in config.get("backends", []):
+        if entry.get("type", "openai") == "stub":
+            backends.append(StubBackend(name=entry.get("name", "stub"), latency=entry.get("latency", 0.0)))
+            continue
+        key = os.getenv(entry.get("api_key_env", "DEEPSEEK_API_KEY"))
+        if api_key and not any(isinstance(b, OpenAICompatibleBackend) for b in backends):
+            key = api_key
+        backends.append(OpenAICompatibleBackend(
+            name=entry["name"],
+            api_url=entry["api_url"],
+            api_key=key,
+            model=entry["model"],
+            timeout=entry.get("timeout", 120),
+            pricing=entry.get("pricing")
+        ))
+
+    return HedgedBackend(
+        backends,
+        hedge_percentile=config.get("hedge_percentile", 90),
+        min_samples=config.get("min_samples", 10)
+    )
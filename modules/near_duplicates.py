@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import zlib
+from collections import Counter
+import numpy as np
+from datetime import datetime
+
+from modules.keyword_matcher import fold_text
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index clustering near-identical messages.
+
+    Each message is reduced to word 3-gram shingles and a MinHash signature.
+    Signatures are split into bands; messages sharing any band bucket are
+    candidates, and a candidate joins a cluster when the estimated Jaccard
+    similarity with the cluster's first message reaches the threshold.
+    Clusters survive between runs, together with one generated completion
+    per cluster that the email generator can reuse.
+    """
+
+    # Mersenne prime used for the universal hash family
+    PRIME = (1 << 31) - 1
+    WORD_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, path=None, num_perm=64, bands=16, threshold=0.7, shingle_size=3):
+        """
+        Initialize the index, loading it from disk if it exists.
+
+        Args:
+            path (str, optional): Path to the JSON index file
+            num_perm (int): Number of MinHash permutations
+            bands (int): Number of LSH bands (must divide num_perm)
+            threshold (float): Minimum estimated Jaccard similarity to join a cluster
+            shingle_size (int): Words per shingle
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "near_duplicate_index.json"
+        )
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        # Fixed seed so signatures stay comparable across runs
+        rng = np.random.RandomState(1)
+        self._a = rng.randint(1, self.PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, self.PRIME, size=num_perm).astype(np.uint64)
+
+        self.clusters = {}
+        self._buckets = {}
+        self._next_id = 1
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Could not load near-duplicate index from {self.path}: {e}")
+            return
+        if data.get("num_perm") != self.num_perm:
+            print("Near-duplicate index was built with different settings, starting a new one")
+            return
+
+        for cluster_id, cluster in data.get("clusters", {}).items():
+            cluster_id = int(cluster_id)
+            self.clusters[cluster_id] = cluster
+            self._index(cluster_id, np.array(cluster["signature"], dtype=np.uint64))
+            self._next_id = max(self._next_id, cluster_id + 1)
+
+    def save(self):
+        """Write the index to disk."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"num_perm": self.num_perm, "clusters": self.clusters}, f)
+        os.replace(tmp_path, self.path)
+
+    def _shingles(self, text):
+        words = self.WORD_PATTERN.findall(fold_text(text))
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        """
+        Compute the MinHash signature of a text.
+
+        Returns:
+            numpy.ndarray: num_perm minimum hash values, or None for empty text
+        """
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(self.PRIME)
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _index(self, cluster_id, signature):
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, cluster_id)
+
+    def cluster_for(self, text, record=True):
+        """
+        Find the cluster a message belongs to, creating a new one if none matches.
+
+        Args:
+            text (str): Message text
+            record (bool): Count this message as a new sighting of the cluster
+
+        Returns:
+            int: Cluster id, or None for empty messages
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+
+        best_id = None
+        best_similarity = 0.0
+        for key in self._band_keys(signature):
+            candidate = self._buckets.get(key)
+            if candidate is None or candidate == best_id:
+                continue
+            similarity = float(np.mean(np.array(self.clusters[candidate]["signature"], dtype=np.uint64) == signature))
+            if similarity > best_similarity:
+                best_id, best_similarity = candidate, similarity
+
+        if best_id is not None and best_similarity >= self.threshold:
+            if record:
+                self.clusters[best_id]["count"] += 1
+                self.clusters[best_id]["last_seen"] = datetime.now().isoformat()
+            return best_id
+
+        cluster_id = self._next_id
+        self._next_id += 1
+        self.clusters[cluster_id] = {
+            "signature": signature.tolist(),
+            "count": 1 if record else 0,
+            "first_seen": datetime.now().isoformat(),
+            "last_seen": datetime.now().isoformat(),
+            "sample": (text or "")[:200],
+            "completion": None
+        }
+        self._index(cluster_id, signature)
+        return cluster_id
+
+    def get_completion(self, cluster_id):
+        """Return the completion stored for a cluster, if any."""
+        cluster = self.clusters.get(cluster_id)
+        return cluster.get("completion") if cluster else None
+
+    def set_completion(self, cluster_id, topics, contact):
+        """
+        Store a generated completion so other messages of the cluster can reuse it.
+
+        Args:
+            cluster_id (int): Cluster id
+            topics (dict): Email sections generated for the contact
+            contact (Contact): The contact the completion was generated for
+        """
+        if cluster_id in self.clusters:
+            self.clusters[cluster_id]["completion"] = {
+                "topics": topics,
+                "name": contact.name,
+                "profile_url": contact.profile_url
+            }
+
+    def summary(self, cluster_ids):
+        """
+        Summarize how a batch of messages clustered.
+
+        Args:
+            cluster_ids (list): Cluster id of each message in the batch
+
+        Returns:
+            dict: Messages, distinct clusters, duplicates and clusters seen in earlier runs
+        """
+        counts = Counter(c for c in cluster_ids if c is not None)
+        return {
+            "messages": len(cluster_ids),
+            "clusters": len(counts),
+            "duplicates": sum(counts.values()) - len(counts),
+            "seen_before": sum(1 for c, n in counts.items() if self.clusters[c]["count"] > n)
+        }
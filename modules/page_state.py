@@ -0,0 +1,129 @@
+import time
+
+
+class PageState:
+    """Kinds of pages the scraper can land on."""
+    PROFILE = "profile"
+    MESSAGING = "messaging"
+    FEED = "feed"
+    LOGIN = "login"
+    VERIFICATION = "verification"
+    AUTH_INTERSTITIAL = "auth_interstitial"
+    UNKNOWN = "unknown"
+
+    # States that need a handler before scraping can continue
+    CHALLENGES = (VERIFICATION, AUTH_INTERSTITIAL)
+
+
+class PageStateClassifier:
+    """
+    Decides what kind of page the browser is showing in one cheap pass.
+
+    A single script roundtrip returns the URL, the title and the result of a
+    handful of targeted selectors (each stops at its first match), instead of
+    scanning the text of every element in the document with XPath.
+    """
+
+    PROBE_SCRIPT = """
+var has = function(selector) { return document.querySelector(selector) !== null; };
+return {
+    url: location.href,
+    title: document.title || '',
+    pin_input: has('input[id*="pin"], input[name="pin"], input[id*="verification"], input[id*="code"]'),
+    login_form: has('input#username, input#session_key, form.login__form'),
+    profile_header: has('main h1, .pv-top-card, .top-card-layout'),
+    messaging: has('.msg-conversations-container, .msg-overlay-list-bubble'),
+    global_nav: has('.global-nav, #global-nav'),
+    microsoft_form: has('form[action*="microsoft"], form[action*="live.com"]')
+};
+"""
+
+    AUTH_HOSTS = ("login.microsoftonline.com", "login.live.com", "account.live.com")
+    LOGIN_PATHS = ("/login", "/uas/login", "/authwall", "/signup")
+    VERIFICATION_PATHS = ("/checkpoint/challenge", "/checkpoint/lg/login-submit", "/checkpoint/pin")
+
+    def __init__(self):
+        self.counts = {}
+        self.total_seconds = 0.0
+        self.calls = 0
+
+    def classify(self, driver):
+        """
+        Classify the page currently loaded in the driver.
+
+        Args:
+            driver (webdriver.Chrome): The driver to inspect
+
+        Returns:
+            str: One of the PageState values
+        """
+        start = time.time()
+        try:
+            probe = driver.execute_script(self.PROBE_SCRIPT) or {}
+        except Exception:
+            probe = {}
+        state = self.classify_probe(probe)
+
+        self.total_seconds += time.time() - start
+        self.calls += 1
+        self.counts[state] = self.counts.get(state, 0) + 1
+        return state
+
+    def classify_probe(self, probe):
+        """
+        Classify a page from the result of PROBE_SCRIPT.
+
+        Args:
+            probe (dict): URL, title and selector results for the page
+
+        Returns:
+            str: One of the PageState values
+        """
+        url = (probe.get("url") or "").lower()
+        title = (probe.get("title") or "").lower()
+
+        # A rendered profile comes first, its content may link to anything
+        if "/in/" in url and probe.get("profile_header"):
+            return PageState.PROFILE
+        if any(host in url for host in self.AUTH_HOSTS) or probe.get("microsoft_form"):
+            return PageState.AUTH_INTERSTITIAL
+        if any(path in url for path in self.VERIFICATION_PATHS) or ("/checkpoint/" in url and probe.get("pin_input")):
+            return PageState.VERIFICATION
+        if "/checkpoint/" in url:
+            # Checkpoint pages without a PIN field are security interstitials
+            return PageState.AUTH_INTERSTITIAL
+        if any(path in url for path in self.LOGIN_PATHS) or (probe.get("login_form") and not probe.get("global_nav")):
+            return PageState.LOGIN
+        if "/messaging" in url or (probe.get("messaging") and "/in/" not in url):
+            return PageState.MESSAGING
+        if "/feed" in url:
+            return PageState.FEED
+        if probe.get("pin_input") and not probe.get("global_nav") and "verification" in title:
+            return PageState.VERIFICATION
+        if "/in/" in url:
+            # Profile URL whose header has not rendered yet
+            return PageState.PROFILE
+        return PageState.UNKNOWN
+
+    def report(self):
+        """
+        Summarize classification counts and cost.
+
+        Returns:
+            dict: Calls, total and mean time, and counts per state
+        """
+        return {
+            "calls": self.calls,
+            "total_seconds": self.total_seconds,
+            "mean_ms": 1000 * self.total_seconds / self.calls if self.calls else 0.0,
+            "states": dict(self.counts)
+        }
+
+    def print_report(self):
+        """Print classification counts and cost."""
+        report = self.report()
+        if not report["calls"]:
+            return
+        states = ", ".join(f"{state}={count}" for state, count in sorted(report["states"].items()))
+        print(f"Page state checks: {report['calls']} in {report['total_seconds']:.2f}s "
+              f"({report['mean_ms']:.1f} ms each) - {states}")
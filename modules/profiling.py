@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from io import StringIO
+from functools import wraps
+from contextlib import contextmanager
+from collections import Counter
+from datetime import datetime
+
+
+class StageProfiler:
+    """
+    Opt-in CPU and memory profiling of pipeline stages.
+
+    While a stage runs, it is profiled three ways:
+    - cProfile, for exact call counts and cumulative times per function
+    - a sampling thread, which records the main thread's stack every few
+      milliseconds as collapsed stacks for flamegraphs
+    - tracemalloc, which reports the lines whose allocations grew the most
+
+    A stage can be entered many times, for example once per contact, and its
+    results accumulate. Nested stages pause the outer stage's CPU profile, so
+    CPU time goes to the innermost stage. Memory snapshots are only taken when
+    the top-level stage changes, not on every call: a stage's growth runs from
+    its first entry to the start of the next stage (or the end of the run) and
+    includes nested stages, which only report their peak.
+    When disabled, which is the default, stage() does nothing.
+    """
+
+    def __init__(self, sample_interval=0.005, top_allocations=25, traceback_frames=1):
+        """
+        Initialize a disabled profiler.
+
+        Args:
+            sample_interval (float): Seconds between stack samples
+            top_allocations (int): Allocation sites listed per stage
+            traceback_frames (int): Frames tracemalloc keeps per allocation (more frames make snapshots much slower)
+        """
+        self.enabled = False
+        self.output_dir = None
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+        self.traceback_frames = traceback_frames
+
+        self._profiles = {}
+        self._stacks = {}
+        self._wall = Counter()
+        self._calls = Counter()
+        self._first_snapshot = {}
+        self._last_snapshot = {}
+        self._peak = {}
+        self._active = []
+        # Start memory and highest peak seen so far of each active stage
+        self._frames = []
+        # Top-level stage whose closing snapshot is taken when another stage starts
+        self._snapshot_owner = None
+        self._main_thread = threading.main_thread().ident
+        self._sampler = None
+        self._stop = threading.Event()
+
+    def enable(self, output_dir=None):
+        """
+        Start profiling stages.
+
+        Args:
+            output_dir (str, optional): Directory for the reports (defaults to data/profiles/<timestamp>)
+        """
+        self.output_dir = output_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "profiles",
+            datetime.now().strftime("%Y%m%d_%H%M%S")
+        )
+        os.makedirs(self.output_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+        self.enabled = True
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True, name="stage-sampler")
+        self._sampler.start()
+        print(f"Profiling enabled, reports will be written to {self.output_dir}")
+
+    def _sample(self):
+        """Record the main thread's stack under the innermost active stage."""
+        while not self._stop.wait(self.sample_interval):
+            if not self._active:
+                continue
+            stage = self._active[-1]
+            frame = sys._current_frames().get(self._main_thread)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self._stacks.setdefault(stage, Counter())[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Profile a block of code as part of a stage."""
+        if not self.enabled or threading.get_ident() != self._main_thread:
+            yield
+            return
+
+        if self._active:
+            self._profiles[self._active[-1]].disable()
+            # The outer stage keeps the peak reached so far, resetting it below would lose it
+            self._frames[-1]["peak"] = max(self._frames[-1]["peak"], tracemalloc.get_traced_memory()[1])
+        elif self._snapshot_owner != name or name not in self._first_snapshot:
+            self._take_snapshots(name)
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        self._frames.append({"start_memory": current, "peak": current})
+
+        self._active.append(name)
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._wall[name] += time.perf_counter() - start
+            self._calls[name] += 1
+            self._active.pop()
+            frame = self._frames.pop()
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            self._peak[name] = max(self._peak.get(name, 0), peak - frame["start_memory"])
+            if self._active:
+                self._frames[-1]["peak"] = max(self._frames[-1]["peak"], peak)
+                if hasattr(tracemalloc, "reset_peak"):
+                    tracemalloc.reset_peak()
+                self._profiles[self._active[-1]].enable()
+            else:
+                self._snapshot_owner = name
+
+    def _take_snapshots(self, starting=None):
+        """Close the previous top-level stage's allocations and open those of the starting one, with one snapshot."""
+        snapshot = tracemalloc.take_snapshot()
+        if self._snapshot_owner is not None:
+            self._last_snapshot[self._snapshot_owner] = snapshot
+        if starting is not None and starting not in self._first_snapshot:
+            self._first_snapshot[starting] = snapshot
+        self._snapshot_owner = None
+
+    def profiled(self, name):
+        """Decorator profiling every call of a function as a stage."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _allocation_report(self, name):
+        # Filtering the statistics is far cheaper than filtering the snapshots' traces
+        ignored = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>")
+        if name not in self._last_snapshot:
+            return (f"== {name}: peak {self._peak.get(name, 0) / 1024 / 1024:.1f} MiB above the start of a call, "
+                    f"allocations are counted in the enclosing stage ==")
+        stats = self._last_snapshot[name].compare_to(self._first_snapshot[name], "lineno")
+        stats = [stat for stat in stats if stat.traceback[0].filename not in ignored]
+        lines = [f"== {name}: peak {self._peak.get(name, 0) / 1024 / 1024:.1f} MiB above the start of a call, "
+                 f"top {self.top_allocations} allocation sites by net growth =="]
+        for stat in stats[:self.top_allocations]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines)
+
+    def finish(self):
+        """
+        Stop profiling and write the reports.
+
+        For each stage writes <stage>.prof (pstats, e.g. for snakeviz) and
+        <stage>.collapsed (flamegraph.pl / speedscope), then allocations.txt
+        and summary.txt covering every stage.
+
+        Returns:
+            str: The output directory, or None if profiling was disabled
+        """
+        if not self.enabled:
+            return None
+        self._stop.set()
+        self._sampler.join()
+        self.enabled = False
+        if self._snapshot_owner is not None:
+            self._take_snapshots()
+
+        summary = []
+        allocations = []
+        for name, profile in self._profiles.items():
+            profile.dump_stats(os.path.join(self.output_dir, f"{name}.prof"))
+            stacks = self._stacks.get(name, Counter())
+            with open(os.path.join(self.output_dir, f"{name}.collapsed"), 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+            out = StringIO()
+            pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(15)
+            summary.append(f"== {name}: {self._calls[name]} call(s), {self._wall[name]:.2f}s wall, "
+                           f"{sum(stacks.values())} samples ==\n{out.getvalue()}")
+            allocations.append(self._allocation_report(name))
+
+        with open(os.path.join(self.output_dir, "summary.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n".join(summary))
+        with open(os.path.join(self.output_dir, "allocations.txt"), 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(allocations) + "\n")
+        tracemalloc.stop()
+
+        print("\nProfile per stage:")
+        for name in self._profiles:
+            print(f"- {name}: {self._calls[name]} call(s), {self._wall[name]:.2f}s, "
+                  f"peak +{self._peak.get(name, 0) / 1024 / 1024:.1f} MiB")
+        print(f"Profiles, flamegraph stacks and allocation reports written to {self.output_dir}")
+        return self.output_dir
+
+
+# Shared by every module so one run produces one set of reports
+profiler = StageProfiler()
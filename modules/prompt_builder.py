@@ -0,0 +1,171 @@
+import re
+from string import Formatter
+
+
+# Words, numbers and single punctuation marks; long words are split the way BPE vocabularies usually split them
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """
+    Approximate the number of tokens a text costs with a BPE tokenizer.
+
+    Counts one token per punctuation mark and one per started group of four
+    characters in each word. Not exact, but close enough to budget prompts
+    without calling the API or loading a tokenizer.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return sum((len(token) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN for token in TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens, marker=" [...] "):
+    """
+    Shorten a text to a token budget, keeping its beginning and its end.
+
+    The cut always falls on token boundaries and depends only on the text and
+    the budget, so the same message is always truncated the same way.
+
+    Args:
+        text (str): Text to shorten
+        max_tokens (int): Token budget
+        marker (str): Inserted where text was removed
+
+    Returns:
+        str: The text itself if it fits, otherwise its head and tail joined by the marker
+    """
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text or ""
+    if max_tokens <= 0:
+        return ""
+
+    spans = []
+    used = 0
+    budget = max_tokens - estimate_tokens(marker)
+    for match in TOKEN_PATTERN.finditer(text):
+        spans.append((match.start(), match.end(), (len(match.group()) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN))
+
+    # Two thirds of the budget for the opening, the rest for the latest part
+    head_budget = budget * 2 // 3
+    head_end = 0
+    for start, end, cost in spans:
+        if used + cost > head_budget:
+            break
+        used += cost
+        head_end = end
+
+    tail_start = len(text)
+    for start, end, cost in reversed(spans):
+        if used + cost > budget or start < head_end:
+            break
+        used += cost
+        tail_start = start
+
+    return text[:head_end].rstrip() + marker + text[tail_start:].lstrip()
+
+
+class PromptBuilder:
+    """
+    Builds prompts from a template compiled once, within a token budget.
+
+    The template is split into literal text and fields up front, so the cost
+    of its static part is counted once and each prompt is a single join.
+    Fields listed in `truncatable` are shortened (in that order) until the
+    prompt fits `max_input_tokens`, and the completion limit is derived from
+    the JSON schema the model is asked to return instead of a fixed value.
+    """
+
+    # Token allowance for each key of the JSON response, sized for a 2-3 paragraph email
+    OUTPUT_SCHEMA = {
+        "personalized_intro": 80,
+        "main_content": 400,
+        "call_to_action": 80,
+        "topic": 24,
+        "signature": 48,
+    }
+    # Braces, quotes, key names and markdown fences around the JSON object
+    OUTPUT_OVERHEAD = 40
+
+    def __init__(self, template, max_input_tokens=1500, max_field_tokens=None, truncatable=("conversation", "message"),
+                 prefix=""):
+        """
+        Compile a template.
+
+        Args:
+            template (str): str.format-style template
+            max_input_tokens (int): Token budget for a whole prompt
+            max_field_tokens (dict, optional): Hard per-field token caps applied before the overall budget
+            truncatable (tuple): Fields that may be shortened to fit the budget, first shortened first
+            prefix (str): Static text sent before every prompt (e.g. the system prompt), counted against the budget
+        """
+        self.template = template
+        self.prefix = prefix
+        self.max_input_tokens = max_input_tokens
+        self.max_field_tokens = max_field_tokens or {"message": 400}
+        self.truncatable = truncatable
+
+        self._parts = []
+        self.fields = []
+        static = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if literal:
+                self._parts.append((True, literal))
+                static.append(literal)
+            if field is not None:
+                if spec or conversion:
+                    raise ValueError(f"Unsupported format spec for field '{field}'")
+                self._parts.append((False, field))
+                if field not in self.fields:
+                    self.fields.append(field)
+        self.static_tokens = estimate_tokens(prefix) + estimate_tokens("".join(static))
+        self._field_counts = {field: sum(1 for is_literal, name in self._parts if not is_literal and name == field)
+                              for field in self.fields}
+        self.max_completion_tokens = sum(self.OUTPUT_SCHEMA.values()) + self.OUTPUT_OVERHEAD
+
+    def render(self, values):
+        """Fill the compiled template without any budget checks."""
+        return "".join(part if is_literal else str(values.get(part, "")) for is_literal, part in self._parts)
+
+    def build(self, **values):
+        """
+        Build a prompt that fits the input budget.
+
+        Args:
+            **values: Value of each template field
+
+        Returns:
+            tuple: (prompt, stats) where stats holds the estimated prompt tokens (prefix included) and the truncated fields
+        """
+        values = {field: "" if values.get(field) is None else str(values[field]) for field in self.fields}
+        truncated = []
+
+        for field, cap in self.max_field_tokens.items():
+            if field in values and estimate_tokens(values[field]) > cap:
+                values[field] = truncate_to_tokens(values[field], cap)
+                truncated.append(field)
+
+        costs = {field: estimate_tokens(value) * self._field_counts[field] for field, value in values.items()}
+        total = self.static_tokens + sum(costs.values())
+
+        for field in self.truncatable:
+            if total <= self.max_input_tokens:
+                break
+            if field not in values or not costs[field]:
+                continue
+            excess = total - self.max_input_tokens
+            budget = max(0, (costs[field] - excess) // self._field_counts[field])
+            values[field] = truncate_to_tokens(values[field], budget)
+            new_cost = estimate_tokens(values[field]) * self._field_counts[field]
+            total -= costs[field] - new_cost
+            costs[field] = new_cost
+            if field not in truncated:
+                truncated.append(field)
+
+        return self.render(values), {"prompt_tokens": total, "truncated": truncated}
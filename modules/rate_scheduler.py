@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+
+from modules.instrumentation import metrics
+
+
+def is_throttle(error):
+    """
+    Whether an API error means the service wants us to slow down.
+
+    True for HTTP 429 and for Google's 403 rate limit errors, whether the
+    error carries its status as `status_code` (llm_backends.APIError) or on
+    `resp.status` (googleapiclient's HttpError).
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+    if status == 429:
+        return True
+    return status == 403 and "ratelimitexceeded" in str(error).lower()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket whose rate adapts to how the service responds.
+
+    Each success adds `increase` requests per second to the rate and each
+    throttle multiplies it by `backoff` (additive increase, multiplicative
+    decrease), within [min_rate, max_rate]. A throttle also empties the
+    bucket, and can block it for a while if the service said when to retry.
+    """
+
+    def __init__(self, rate, burst=1, min_rate=None, max_rate=None, increase=0.0, backoff=0.5):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate (float): Starting rate in requests per second
+            burst (int): Requests that can be made back to back after an idle period
+            min_rate (float, optional): Lowest rate backoff can reach (defaults to a tenth of the rate)
+            max_rate (float, optional): Highest rate successes can reach (defaults to the rate)
+            increase (float): Requests per second added after each success
+            backoff (float): Factor applied to the rate after each throttle
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if min_rate is not None else rate / 10
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase
+        self.backoff = backoff
+
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.successes = 0
+        self.throttles = 0
+        self.waited = 0.0
+        self._recent = deque(maxlen=500)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """
+        Take a token, going into debt if none is left.
+
+        Returns:
+            float: Seconds the caller must wait before making the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate, self.blocked_until - now, 0.0)
+            self.requests += 1
+            self.waited += wait
+            self._recent.append(now + wait)
+        return wait
+
+    def try_reserve(self):
+        """Take a token only if one is available right now."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens < 1 or now < self.blocked_until:
+                return False
+            self.tokens -= 1
+            self.requests += 1
+            self._recent.append(now)
+        return True
+
+    def success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttle(self, retry_after=None):
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.backoff)
+            self.tokens = min(self.tokens, 0.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def observed_rate(self, window=60.0):
+        """Requests per second actually made over the last `window` seconds."""
+        with self._lock:
+            now = time.monotonic()
+            recent = [t for t in self._recent if now - window <= t <= now]
+        if len(recent) < 2:
+            return 0.0
+        return len(recent) / max(now - recent[0], 1e-6)
+
+
+class RateScheduler:
+    """
+    Paces the calls made to each external service from one place.
+
+    Every target (linkedin, llm, gmail) has its own TokenBucket. Callers
+    acquire() before a request and report success() or throttled() after
+    it, so each service runs at the fastest pace it currently tolerates
+    instead of behind fixed random sleeps. Waits are counted in the run
+    metrics as sleep_seconds with reason "<target>_rate".
+    """
+
+    # Starting points for config/rate_limits.json
+    DEFAULT_LIMITS = {
+        "linkedin": {"rate": 0.3, "burst": 1, "min_rate": 0.05, "max_rate": 0.5, "increase": 0.01, "backoff": 0.5},
+        "llm": {"rate": 2.0, "burst": 4, "min_rate": 0.2, "max_rate": 20.0, "increase": 0.2, "backoff": 0.5},
+        "gmail": {"rate": 5.0, "burst": 10, "min_rate": 0.5, "max_rate": 20.0, "increase": 0.2, "backoff": 0.5},
+        "replay": {"rate": 50.0, "burst": 10, "min_rate": 5.0, "max_rate": 50.0}
+    }
+
+    def __init__(self, limits=None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            limits (dict, optional): Target name -> TokenBucket arguments (defaults to DEFAULT_LIMITS)
+        """
+        self.buckets = {name: TokenBucket(**settings) for name, settings in (limits or self.DEFAULT_LIMITS).items()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, path=None):
+        """
+        Build the scheduler from config/rate_limits.json, falling back to the defaults.
+
+        Targets missing from the file keep their default limits.
+        """
+        path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "config",
+            "rate_limits.json"
+        )
+        limits = {name: dict(settings) for name, settings in cls.DEFAULT_LIMITS.items()}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for name, settings in json.load(f).items():
+                    limits.setdefault(name, {}).update(settings)
+        return cls(limits)
+
+    def bucket(self, target):
+        """Return the bucket of a target, creating a conservative one for unknown targets."""
+        with self._lock:
+            if target not in self.buckets:
+                self.buckets[target] = TokenBucket(rate=1.0)
+            return self.buckets[target]
+
+    def acquire(self, target):
+        """
+        Wait until a request to the target is allowed.
+
+        Returns:
+            float: Seconds waited
+        """
+        wait = self.bucket(target).reserve()
+        if wait > 0:
+            metrics.sleep(wait, f"{target}_rate")
+        return wait
+
+    def try_acquire(self, target):
+        """Take a request slot for the target without waiting; False if none is free yet."""
+        return self.bucket(target).try_reserve()
+
+    def success(self, target):
+        """Report a request the service accepted."""
+        self.bucket(target).success()
+
+    def throttled(self, target, reason="throttled", retry_after=None):
+        """
+        Report that the service pushed back (HTTP 429, a challenge page, ...).
+
+        Args:
+            target (str): The service
+            reason (str): What happened, counted in the run metrics
+            retry_after (float, optional): Seconds the service asked to wait
+        """
+        bucket = self.bucket(target)
+        bucket.throttle(retry_after)
+        metrics.increment("rate_throttles", target=target, reason=reason)
+        print(f"{target} pushed back ({reason}), slowing down to {bucket.rate:.2f} requests/s")
+
+    def report(self):
+        """
+        Summarize the pace of every target.
+
+        Returns:
+            dict: Per target the current allowed rate, the observed rate over the
+                last minute, requests, successes, throttles and seconds waited
+        """
+        return {
+            name: {
+                "rate": round(bucket.rate, 3),
+                "observed_rate": round(bucket.observed_rate(), 3),
+                "requests": bucket.requests,
+                "successes": bucket.successes,
+                "throttles": bucket.throttles,
+                "waited_seconds": round(bucket.waited, 1)
+            }
+            for name, bucket in self.buckets.items()
+            if bucket.requests
+        }
+
+    def print_report(self):
+        report = self.report()
+        if not report:
+            return
+        print("\nRequest pacing:")
+        for name, stats in report.items():
+            print(f"- {name}: {stats['requests']} requests, now allowed {stats['rate']:.2f}/s, "
+                  f"observed {stats['observed_rate']:.2f}/s, {stats['throttles']} throttles, "
+                  f"{stats['waited_seconds']:.1f}s waited")
+
+
+# Shared by every module so each service has one pace per process
+rate_scheduler = RateScheduler.from_config()
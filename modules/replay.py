@@ -0,0 +1,210 @@
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def snapshot_path(url):
+    """Return the key a page is recorded and served under: its path without query or trailing slash."""
+    path = urlparse(url).path.rstrip('/')
+    return path or '/'
+
+
+class SnapshotRecorder:
+    """
+    Saves gzip-compressed snapshots of the pages the scraper visits.
+
+    Each snapshot is the rendered DOM with scripts removed and LinkedIn links
+    made root-relative, so it can be served as a static page and every link
+    the scraper follows stays on the replay server. manifest.json maps URL
+    paths to snapshot files.
+    """
+
+    SCRIPT_PATTERN = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+    LINKEDIN_LINK_PATTERN = re.compile(r"https?://(?:www\.)?linkedin\.com(?=/)")
+
+    def __init__(self, directory):
+        """
+        Initialize the recorder.
+
+        Args:
+            directory (str): Directory for the snapshots and the manifest
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+
+    def clean(self, html):
+        """Strip scripts and make LinkedIn links point at whichever server serves the page."""
+        html = self.SCRIPT_PATTERN.sub("", html)
+        return self.LINKEDIN_LINK_PATTERN.sub("", html)
+
+    def record(self, driver, kind):
+        """
+        Save the page currently loaded in the driver.
+
+        Args:
+            driver: Selenium WebDriver
+            kind (str): Page kind: messaging, conversation, profile or contact_overlay
+
+        Returns:
+            str: The path the page was recorded under
+        """
+        return self.save(driver.current_url, driver.page_source, kind)
+
+    def save(self, url, html, kind, flush=True):
+        """
+        Save a page as the snapshot served for a URL.
+
+        Args:
+            url (str): URL the page was loaded from
+            html (str): Page source
+            kind (str): Page kind
+            flush (bool): Rewrite the manifest now (pass False when saving many pages, then call flush())
+
+        Returns:
+            str: The path the page was recorded under
+        """
+        path = snapshot_path(url)
+        filename = re.sub(r"[^A-Za-z0-9_.-]+", "_", path.strip('/')) or "index"
+        filename = f"{filename}.html.gz"
+        with gzip.open(os.path.join(self.directory, filename), 'wt', encoding='utf-8') as f:
+            f.write(self.clean(html))
+
+        self.manifest[path] = {
+            "file": filename,
+            "kind": kind,
+            "url": url,
+            "recorded_at": datetime.now().isoformat()
+        }
+        if flush:
+            self.flush()
+        return path
+
+    def flush(self):
+        """Write the manifest."""
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+class ReplayServer:
+    """
+    Serves recorded snapshots over HTTP with injected latency.
+
+    Pages are decompressed once at startup. Each response waits `latency`
+    seconds plus or minus up to `jitter` seconds (drawn from a seeded random
+    generator, so runs are repeatable), which stands in for LinkedIn's
+    response time. Paths that were never recorded return 404.
+    """
+
+    def __init__(self, directory, latency=0.0, jitter=0.0, host="127.0.0.1", port=0, seed=0):
+        """
+        Load the snapshots.
+
+        Args:
+            directory (str): Directory written by SnapshotRecorder
+            latency (float): Seconds added to every response
+            jitter (float): Maximum random deviation from the latency, in seconds
+            host (str): Interface to listen on
+            port (int): Port to listen on (0 picks a free one)
+            seed (int): Seed of the jitter generator
+        """
+        manifest_path = os.path.join(directory, "manifest.json")
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"No recorded snapshots found in {directory}")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        self.pages = {}
+        for path, entry in manifest.items():
+            with gzip.open(os.path.join(directory, entry["file"]), 'rb') as f:
+                self.pages[path] = f.read()
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.misses = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self):
+        with self._lock:
+            self.requests += 1
+            offset = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + offset)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server._delay())
+                body = server.pages.get(snapshot_path(self.path))
+                if body is None:
+                    with server._lock:
+                        server.misses += 1
+                    self.send_response(404)
+                    body = b"Not recorded"
+                    self.send_header("Content-Type", "text/plain")
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve in a background thread and return the base URL."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="replay-server")
+        self._thread.start()
+        print(f"Replaying {len(self.pages)} recorded pages at {self.base_url} "
+              f"(latency {self.latency * 1000:.0f}ms +/- {self.jitter * 1000:.0f}ms)")
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        print(f"Replay server answered {self.requests} requests ({self.misses} not recorded)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve recorded LinkedIn pages for offline scraper runs')
+    parser.add_argument('directory', help='Directory of recorded snapshots')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Latency added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Maximum random deviation from the latency')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    args = parser.parse_args()
+
+    replay = ReplayServer(args.directory, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, port=args.port)
+    replay.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        replay.stop()
+        sys.exit(0)
@@ -0,0 +1,133 @@
+import os
+import json
+from datetime import datetime
+
+from modules.contact import Contact
+
+
+class RunJournal:
+    """
+    Append-only journal of a scrape run.
+
+    Every processed message thread and every enriched profile is written to a
+    JSON-lines file and fsync'ed, so a crashed or killed run can be resumed
+    from the first unprocessed item. Items that were started but never
+    finished are simply not marked as done and get redone on resume. A run
+    that completed has nothing to resume, so resuming it starts a new one.
+    """
+
+    def __init__(self, path=None, resume=False):
+        """
+        Initialize the run journal.
+
+        Args:
+            path (str, optional): Path to the journal file
+            resume (bool): Whether to load an existing journal instead of starting a new one
+        """
+        self.path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "run_journal.jsonl"
+        )
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._reset()
+        mode = 'w'
+        if resume and os.path.exists(self.path):
+            self._load()
+        if self.completed:
+            # A finished run has nothing left to resume, all its threads would be skipped
+            print(f"The run in {self.path} already completed, starting a new one")
+            self._reset()
+        elif resume and os.path.exists(self.path):
+            print(f"Resuming run from {self.path}: {len(self.done_threads)} threads and "
+                  f"{len(self.enriched_profiles)} profiles already processed")
+            if self.in_flight:
+                print(f"Redoing {len(self.in_flight)} in-flight item(s) from the previous run")
+            mode = 'a'
+
+        self._file = open(self.path, mode, encoding='utf-8')
+
+    def _reset(self):
+        self.done_threads = set()
+        self.matched_messages = []
+        self.enriched_profiles = {}
+        self.in_flight = []
+        self.completed = False
+
+    def _load(self):
+        """Replay the journal file to rebuild the run state."""
+        started = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a killed process, ignore it
+                    continue
+
+                record_type = record.get("type")
+                key = record.get("key")
+                if record_type in ("thread_started", "profile_started"):
+                    started[(record_type.split('_')[0], key)] = True
+                elif record_type == "thread_done":
+                    started.pop(("thread", key), None)
+                    self.done_threads.add(key)
+                    if record.get("contact"):
+                        self.matched_messages.append(Contact.from_dict(record["contact"]))
+                elif record_type == "profile_done":
+                    started.pop(("profile", key), None)
+                    self.enriched_profiles[key] = record.get("contact") or {}
+                elif record_type == "run_completed":
+                    self.completed = True
+
+        self.in_flight = list(started)
+
+    def _write(self, record):
+        """Append a record and force it to disk."""
+        record["ts"] = datetime.now().isoformat()
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def start_run(self, **params):
+        """Record the parameters of a new (or resumed) run."""
+        self._write({"type": "run_started", "params": params})
+
+    def is_thread_done(self, key):
+        return key in self.done_threads
+
+    def start_thread(self, key):
+        self._write({"type": "thread_started", "key": key})
+
+    def finish_thread(self, key, contact=None):
+        """
+        Mark a thread as processed.
+
+        Args:
+            key (str): Stable identifier of the thread
+            contact (Contact, optional): The matched contact, or None if the thread was filtered out
+        """
+        self._write({"type": "thread_done", "key": key, "contact": contact.to_dict() if contact else None})
+        self.done_threads.add(key)
+        if contact:
+            self.matched_messages.append(contact)
+
+    def get_enriched_profile(self, profile_url):
+        return self.enriched_profiles.get(profile_url)
+
+    def start_profile(self, profile_url):
+        self._write({"type": "profile_started", "key": profile_url})
+
+    def finish_profile(self, profile_url, contact):
+        self._write({"type": "profile_done", "key": profile_url, "contact": contact.to_dict()})
+        self.enriched_profiles[profile_url] = contact.to_dict()
+
+    def complete(self):
+        """Mark the run as completed."""
+        self._write({"type": "run_completed"})
+        self.completed = True
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
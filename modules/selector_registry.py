@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import threading
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+
+class SelectorRegistry:
+    """
+    Candidate selectors for each profile field, tried best performer first.
+
+    A lookup polls every candidate of a field in order of observed hit
+    rate under one short timeout, so a selector that stopped matching no
+    longer costs a full wait of its own before the next one is tried.
+    Hits, misses and time to match are kept in data/selector_stats.json
+    across runs. A field missing from the last `absent_after` pages is
+    checked once without waiting, with a full wait every `probe_every`
+    lookups in case it comes back.
+    """
+
+    # Selenium locator strategies (By.CSS_SELECTOR, ...) and values, in their initial order.
+    # An optional config/selectors.json of the same shape adds candidates or changes timeouts
+    DEFAULT_FIELDS = {
+        "name": {
+            "timeout": 5,
+            "selectors": [["tag name", "h1"], ["css selector", ".text-heading-xlarge"]]
+        },
+        "contact_info_button": {
+            "timeout": 5,
+            "selectors": [["css selector", "a[href*='overlay/contact-info']"],
+                          ["id", "top-card-text-details-contact-info"]]
+        },
+        "contact_sections": {
+            "timeout": 2,
+            "selectors": [["class name", "pv-contact-info__contact-type"],
+                          ["css selector", ".pv-contact-info__contact-type, .pv-contact-info__ci-container"],
+                          ["css selector", ".artdeco-modal section"]]
+        },
+        "email": {
+            "timeout": 3,
+            "selectors": [["css selector", ".ci-email .pv-contact-info__ci-container"],
+                          ["css selector", ".ci-email a[href^='mailto:']"],
+                          ["css selector", "a[href^='mailto:']"]]
+        }
+    }
+
+    def __init__(self, fields=None, stats_path=None, absent_after=20, probe_every=10, poll_interval=0.2):
+        """
+        Initialize the registry and load the statistics of earlier runs.
+
+        Args:
+            fields (dict, optional): Field name -> {"timeout", "selectors"} (defaults to DEFAULT_FIELDS)
+            stats_path (str, optional): Statistics file (defaults to data/selector_stats.json)
+            absent_after (int): Consecutive misses after which a field is checked without waiting
+            probe_every (int): Lookups between full waits for a field considered absent
+            poll_interval (float): Seconds between polls while waiting
+        """
+        self.fields = fields or self.DEFAULT_FIELDS
+        self.stats_path = stats_path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "selector_stats.json"
+        )
+        self.absent_after = absent_after
+        self.probe_every = probe_every
+        self.poll_interval = poll_interval
+        self.stats = {"fields": {}, "selectors": {}}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.stats_path):
+            try:
+                with open(self.stats_path, 'r', encoding='utf-8') as f:
+                    self.stats.update(json.load(f))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Could not load selector statistics, starting over: {e}")
+
+    @classmethod
+    def from_config(cls, path=None, **kwargs):
+        """
+        Build the registry from the defaults and the optional config/selectors.json.
+
+        Selectors listed in the file are tried in addition to the defaults.
+        """
+        path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "config",
+            "selectors.json"
+        )
+        fields = {name: {"timeout": field["timeout"], "selectors": list(field["selectors"])}
+                  for name, field in cls.DEFAULT_FIELDS.items()}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for name, field in json.load(f).items():
+                    target = fields.setdefault(name, {"timeout": 3, "selectors": []})
+                    target["timeout"] = field.get("timeout", target["timeout"])
+                    for selector in field.get("selectors", []):
+                        if list(selector) not in target["selectors"]:
+                            target["selectors"].append(list(selector))
+        return cls(fields, **kwargs)
+
+    @staticmethod
+    def _selector_id(field, selector):
+        return f"{field}|{selector[0]}={selector[1]}"
+
+    def _selector_stats(self, field, selector):
+        return self.stats["selectors"].setdefault(self._selector_id(field, selector),
+                                                  {"hits": 0, "misses": 0, "hit_seconds": 0.0})
+
+    def _field_stats(self, field):
+        return self.stats["fields"].setdefault(field, {"lookups": 0, "found": 0, "absent_streak": 0,
+                                                       "short_circuited": 0})
+
+    def ordered(self, field):
+        """The selectors of a field, highest smoothed hit rate first (ties keep their configured order)."""
+        def hit_rate(selector):
+            stats = self._selector_stats(field, selector)
+            return (stats["hits"] + 1) / (stats["hits"] + stats["misses"] + 2)
+        return sorted(self.fields[field]["selectors"], key=hit_rate, reverse=True)
+
+    def is_absent(self, field):
+        return self._field_stats(field)["absent_streak"] >= self.absent_after
+
+    def find_all(self, driver, field, timeout=None):
+        """
+        Find the elements of a field with the first selector that matches.
+
+        Args:
+            driver: Selenium WebDriver
+            field (str): Field name
+            timeout (float, optional): Seconds to wait (defaults to the field's timeout)
+
+        Returns:
+            list: Matching elements, empty if no selector matched
+        """
+        with self._lock:
+            selectors = self.ordered(field)
+            field_stats = self._field_stats(field)
+            field_stats["lookups"] += 1
+            wait = self.fields[field]["timeout"] if timeout is None else timeout
+            # A field missing from every recent page is checked once, with a full wait now and then
+            if self.is_absent(field) and field_stats["lookups"] % self.probe_every:
+                wait = 0
+                field_stats["short_circuited"] += 1
+
+        found = {}
+
+        def first_match(d):
+            for position, selector in enumerate(selectors):
+                try:
+                    elements = d.find_elements(selector[0], selector[1])
+                except WebDriverException:
+                    continue  # Invalid selector or a page change mid-lookup, counts as a miss
+                if elements:
+                    found["position"] = position
+                    return elements
+            return False
+
+        start = time.time()
+        elements = first_match(driver)
+        if not elements and wait > 0:
+            try:
+                elements = WebDriverWait(driver, wait, poll_frequency=self.poll_interval).until(first_match)
+            except TimeoutException:
+                elements = []
+        elapsed = time.time() - start
+
+        with self._lock:
+            tried = selectors[:found["position"] + 1] if elements else selectors
+            for selector in tried[:-1] if elements else tried:
+                self._selector_stats(field, selector)["misses"] += 1
+            if elements:
+                hit = self._selector_stats(field, tried[-1])
+                hit["hits"] += 1
+                hit["hit_seconds"] += elapsed
+                field_stats["found"] += 1
+                field_stats["absent_streak"] = 0
+            else:
+                field_stats["absent_streak"] += 1
+            self._unsaved += 1
+            if self._unsaved >= 25:
+                self._save_locked()
+        return elements or []
+
+    def find(self, driver, field, timeout=None):
+        """Find the first element of a field, or None."""
+        elements = self.find_all(driver, field, timeout)
+        return elements[0] if elements else None
+
+    def _save_locked(self):
+        os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        temp_path = self.stats_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.stats, f, indent=2)
+        os.replace(temp_path, self.stats_path)
+        self._unsaved = 0
+
+    def save(self):
+        """Write the statistics to disk."""
+        with self._lock:
+            self._save_locked()
+
+    def report(self):
+        """
+        Summarize the health of every field and selector.
+
+        Returns:
+            dict: Per field the lookups, share found, whether it is short-circuited as absent,
+                and per selector (best first) its hits, misses, hit rate and mean seconds to match
+        """
+        with self._lock:
+            report = {}
+            for field in self.fields:
+                field_stats = self._field_stats(field)
+                selectors = []
+                for selector in self.ordered(field):
+                    stats = self._selector_stats(field, selector)
+                    tries = stats["hits"] + stats["misses"]
+                    selectors.append({
+                        "selector": f"{selector[0]}={selector[1]}",
+                        "hits": stats["hits"],
+                        "misses": stats["misses"],
+                        "hit_rate": round(stats["hits"] / tries, 3) if tries else None,
+                        "mean_hit_seconds": round(stats["hit_seconds"] / stats["hits"], 3) if stats["hits"] else None
+                    })
+                report[field] = {
+                    "lookups": field_stats["lookups"],
+                    "found_rate": round(field_stats["found"] / field_stats["lookups"], 3) if field_stats["lookups"] else None,
+                    "absent": self.is_absent(field),
+                    "short_circuited": field_stats["short_circuited"],
+                    "selectors": selectors
+                }
+            return report
+
+    def print_report(self):
+        report = self.report()
+        if not any(field["lookups"] for field in report.values()):
+            return
+        print("\nSelector health:")
+        for name, field in report.items():
+            if not field["lookups"]:
+                continue
+            status = f", absent on recent pages ({field['short_circuited']} lookups short-circuited)" if field["absent"] else ""
+            print(f"- {name}: found on {field['found_rate']:.0%} of {field['lookups']} lookups{status}")
+            for selector in field["selectors"]:
+                if selector["hit_rate"] is None:
+                    continue
+                timing = f", {selector['mean_hit_seconds']:.2f}s to match" if selector["mean_hit_seconds"] is not None else ""
+                print(f"    {selector['selector']}: {selector['hit_rate']:.0%} of {selector['hits'] + selector['misses']} tries{timing}")
+
+
+if __name__ == "__main__":
+    SelectorRegistry.from_config().print_report()
@@ -0,0 +1,180 @@
+import os
+import json
+
+from modules.keyword_matcher import KeywordMatcher, fold_text
+
+
+class MessageClassifier:
+    """
+    Decides in microseconds whether a conversation needs the LLM.
+
+    Messages that ask something or mention a concrete need (price, demo,
+    meeting, clients...) always go to the LLM. Pleasantries such as
+    "thanks for connecting", and short greetings made only of common words,
+    carry too little for a completion to beat a template and are answered
+    locally. Anything else says something about the contact and goes to the
+    LLM, however short. The language is guessed from common words so the
+    template matches it.
+    """
+
+    # Ask something or describe a need: worth a tailored answer
+    SUBSTANTIVE_KEYWORDS = [
+        "price*", "pricing", "cost*", "demo", "meeting", "call", "interest*", "project*", "need*",
+        "help", "looking for", "tool*", "software", "clients", "customers", "budget", "team", "feedback", "test*",
+        "prix", "tarif*", "démo", "rendez-vous", "appel", "intéress*", "projet*", "besoin*", "aide*",
+        "cherch*", "outil*", "logiciel*", "mandat*", "équipe", "essayer"
+    ]
+    # Polite openers that say nothing about the contact's needs
+    PLEASANTRY_KEYWORDS = [
+        "thanks for connecting", "thank you for connecting", "thanks for the add", "happy to connect",
+        "glad to connect", "nice to meet you", "pleasure to connect", "congrats*", "congratulations",
+        "merci pour l'invitation", "merci pour la mise en relation", "merci d'avoir accepté", "ravi de",
+        "ravie de", "au plaisir", "félicitations"
+    ]
+    STOPWORDS = {
+        "en": {"the", "and", "you", "your", "i", "to", "of", "for", "is", "are", "with", "thanks", "thank", "hi",
+               "hello", "we", "in", "on", "my", "it", "this", "that", "be", "have"},
+        "fr": {"le", "la", "les", "et", "vous", "votre", "je", "de", "des", "du", "pour", "est", "sont", "avec",
+               "merci", "bonjour", "nous", "dans", "sur", "mon", "ma", "ce", "cette", "un", "une", "au", "suis"}
+    }
+
+    def __init__(self, short_words=20, pleasantry_words=40):
+        """
+        Initialize the classifier.
+
+        Args:
+            short_words (int): Greetings of at most this many words, all of them common words, get a template
+            pleasantry_words (int): Pleasantries up to this many words get a template
+        """
+        self.short_words = short_words
+        self.pleasantry_words = pleasantry_words
+        self.substantive = KeywordMatcher.from_keywords(self.SUBSTANTIVE_KEYWORDS)
+        self.pleasantry = KeywordMatcher.from_keywords(self.PLEASANTRY_KEYWORDS)
+        self.stopwords = {lang: {fold_text(word) for word in words} for lang, words in self.STOPWORDS.items()}
+
+    def language(self, text):
+        """Guess "en" or "fr" from common words, English when undecided."""
+        words = fold_text(text).replace("'", " ").split()
+        scores = {lang: sum(word.strip(".,;:!") in stopwords for word in words) for lang, stopwords in self.stopwords.items()}
+        return "fr" if scores["fr"] > scores["en"] else "en"
+
+    def classify(self, text):
+        """
+        Route a conversation to the template tier or the LLM.
+
+        Args:
+            text (str): What the contact wrote
+
+        Returns:
+            tuple: ("template" or "llm", reason, language)
+        """
+        text = text or ""
+        language = self.language(text)
+        words = len(text.split())
+        if "?" in text:
+            return "llm", "asks a question", language
+        if self.substantive.matches(text):
+            return "llm", "describes a need", language
+        if words <= self.pleasantry_words and self.pleasantry.matches(text):
+            return "template", "pleasantry", language
+        # "Je suis agent immobilier à Lyon" is short but says who the contact is
+        if words <= self.short_words and self._only_common_words(text):
+            return "template", "greeting", language
+        return "llm", "says something specific" if words <= self.pleasantry_words else "long message", language
+
+    def _only_common_words(self, text):
+        """Whether every word of the text is a common word of a known language."""
+        common = set().union(*self.stopwords.values())
+        words = [word.strip(".,;:!") for word in fold_text(text).replace("'", " ").split()]
+        return all(word in common for word in words if word)
+
+
+class TemplateTier:
+    """
+    Deterministic emails for low-signal contacts, rendered without an API call.
+
+    Templates give the sections of EmailGenerator's template (topic,
+    personalized_intro, main_content, call_to_action, signature) per
+    language, with {name}, {first_name}, {last_name} and {profile_url}
+    placeholders. English and French are built in, and an optional
+    config/email_templates.json overrides sections or adds languages.
+    """
+
+    DEFAULT_TEMPLATES = {
+        "en": {
+            "topic": "Good to connect, {first_name}",
+            "personalized_intro": "{profile_url}\n\nHi {first_name},\n\nThanks for connecting on LinkedIn, good to have you in my network.",
+            "main_content": "I'm building a tool that takes the repetitive admin work off the plate of real estate professionals, "
+                            "so they can spend their time with clients instead of paperwork. Early users will get free access once it's ready.",
+            "call_to_action": "Would you be up for a quick 15 minute call to tell me how you handle this today?",
+            "signature": "Best regards,\nKarim Abbes\nhttps://www.linkedin.com/in/karimabbes/"
+        },
+        "fr": {
+            "topic": "Ravi d'échanger, {first_name}",
+            "personalized_intro": "{profile_url}\n\nBonjour {name},\n\nMerci pour la mise en relation sur LinkedIn.",
+            "main_content": "Je développe un outil qui prend en charge les tâches administratives répétitives des professionnels "
+                            "de l'immobilier, pour qu'ils passent leur temps avec leurs clients plutôt que sur la paperasse. "
+                            "Les premiers utilisateurs y auront accès gratuitement dès qu'il sera prêt.",
+            "call_to_action": "Seriez-vous partant pour un court appel de 15 minutes pour me dire comment vous gérez cela aujourd'hui ?",
+            "signature": "Bien cordialement,\nKarim Abbes\nhttps://www.linkedin.com/in/karimabbes/"
+        }
+    }
+
+    def __init__(self, templates=None, classifier=None):
+        """
+        Initialize the tier.
+
+        Args:
+            templates (dict, optional): Language -> sections (defaults to DEFAULT_TEMPLATES)
+            classifier (MessageClassifier, optional): Routing classifier
+        """
+        self.templates = templates or self.DEFAULT_TEMPLATES
+        self.classifier = classifier or MessageClassifier()
+
+    @classmethod
+    def from_config(cls, path=None, **kwargs):
+        """
+        Build the tier from the defaults and the optional config/email_templates.json.
+
+        Sections missing from the file keep their default text.
+        """
+        path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "config",
+            "email_templates.json"
+        )
+        templates = {language: dict(sections) for language, sections in cls.DEFAULT_TEMPLATES.items()}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for language, sections in json.load(f).items():
+                    templates.setdefault(language, dict(templates["en"])).update(sections)
+        return cls(templates, **kwargs)
+
+    def render(self, contact, language):
+        """
+        Fill the template sections for a contact.
+
+        Args:
+            contact (Contact): The contact to write to
+            language (str): Template language, English if there is no template for it
+
+        Returns:
+            dict: Email sections, in the format of EmailGenerator._extract_topics
+        """
+        parts = (contact.name or "").split()
+        values = {
+            "name": contact.name or "",
+            "first_name": parts[0] if parts else "",
+            "last_name": parts[-1] if len(parts) > 1 else "",
+            "profile_url": contact.profile_url or ""
+        }
+        empty = [key for key, value in values.items() if not value]
+        template = self.templates.get(language) or self.templates["en"]
+        topics = {}
+        for section, text in template.items():
+            rendered = text.format(**values).strip()
+            # Without a name, "Hi ," and "Good to connect, " still have to read naturally
+            if any("{" + key + "}" in text for key in empty):
+                rendered = rendered.replace(" ,", ",").rstrip(", ")
+            topics[section] = rendered
+        return topics
@@ -0,0 +1,188 @@
+import time
+
+
+class UsageLedger:
+    """
+    Running totals of the tokens and money spent on completions.
+
+    Every API call is recorded with its prompt, cached prompt and completion
+    tokens, priced with the answering backend's rates. Calls a hedged
+    request made but did not use are recorded separately: they are paid for
+    but produce nothing.
+    """
+
+    # USD per million tokens, used for backends without their own pricing (deepseek-chat list prices)
+    DEFAULT_PRICING = {"input_cache_hit": 0.07, "input_cache_miss": 0.27, "output": 1.10}
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.wasted_calls = 0
+        self.wasted_cost = 0.0
+        self.per_backend = {}
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def price(self, usage, pricing=None):
+        """
+        Compute the cost of one call.
+
+        Args:
+            usage (dict): prompt_tokens, cached_prompt_tokens and completion_tokens
+            pricing (dict, optional): USD per million tokens for input_cache_hit, input_cache_miss and output
+
+        Returns:
+            float: Cost in USD
+        """
+        pricing = pricing or self.DEFAULT_PRICING
+        cached = usage.get("cached_prompt_tokens", 0)
+        uncached = usage.get("prompt_tokens", 0) - cached
+        return (cached * pricing["input_cache_hit"]
+                + uncached * pricing["input_cache_miss"]
+                + usage.get("completion_tokens", 0) * pricing["output"]) / 1_000_000
+
+    def record(self, usage, backend=None, pricing=None):
+        """
+        Add a call to the totals.
+
+        Args:
+            usage (dict): prompt_tokens, cached_prompt_tokens and completion_tokens
+            backend (str, optional): Name of the backend that answered
+            pricing (dict, optional): That backend's prices
+
+        Returns:
+            float: Cost of the call in USD
+        """
+        cost = self.price(usage, pricing)
+        self.calls += 1
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.cached_prompt_tokens += usage.get("cached_prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cost += cost
+
+        stats = self.per_backend.setdefault(backend or "unknown", {"calls": 0, "tokens": 0, "cost": 0.0})
+        stats["calls"] += 1
+        stats["tokens"] += usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        stats["cost"] += cost
+        return cost
+
+    def record_wasted(self, usage, pricing=None):
+        """Add a hedged duplicate whose answer was not used."""
+        cost = self.price(usage, pricing)
+        self.wasted_calls += 1
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.cached_prompt_tokens += usage.get("cached_prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.cost += cost
+        self.wasted_cost += cost
+        return cost
+
+    def summary(self):
+        """
+        Summarize the run.
+
+        Returns:
+            dict: Calls, token totals, cost and the breakdown per backend
+        """
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cost_usd": round(self.cost, 6),
+            "wasted_calls": self.wasted_calls,
+            "wasted_cost_usd": round(self.wasted_cost, 6),
+            "per_backend": self.per_backend
+        }
+
+
+class RunBudget:
+    """
+    Token, money and wall-time limits for one generation batch.
+
+    Before each contact the generator asks for the budget status. The
+    projection adds the average cost of one more contact to what has been
+    spent, so a batch stops before going over a limit rather than after.
+    Past `degrade_at` of any limit the generator switches to shorter prompts.
+    """
+
+    OK = "ok"
+    DEGRADE = "degrade"
+    STOP = "stop"
+
+    def __init__(self, max_tokens=None, max_cost=None, max_seconds=None, degrade_at=0.8):
+        """
+        Initialize the budget. Limits left as None are not enforced.
+
+        Args:
+            max_tokens (int, optional): Prompt plus completion tokens
+            max_cost (float, optional): Spend in USD
+            max_seconds (float, optional): Wall time of the batch
+            degrade_at (float): Fraction of a limit after which prompts are shortened
+        """
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.max_seconds = max_seconds
+        self.degrade_at = degrade_at
+        self.started = time.time()
+        self.contacts = 0
+
+    @property
+    def enabled(self):
+        return any(limit is not None for limit in (self.max_tokens, self.max_cost, self.max_seconds))
+
+    def start(self):
+        self.started = time.time()
+        self.contacts = 0
+
+    def contact_done(self):
+        self.contacts += 1
+
+    def usage(self, ledger):
+        """
+        Return the fraction of each limit used and projected after one more contact.
+
+        Returns:
+            dict: limit name -> (used fraction, projected fraction)
+        """
+        elapsed = time.time() - self.started
+        done = max(self.contacts, 1)
+        fractions = {}
+        for name, limit, used in (("tokens", self.max_tokens, ledger.total_tokens),
+                                  ("cost", self.max_cost, ledger.cost),
+                                  ("time", self.max_seconds, elapsed)):
+            if limit:
+                fractions[name] = (used / limit, (used + used / done) / limit)
+        return fractions
+
+    def status(self, ledger):
+        """
+        Decide whether the batch can go on.
+
+        Returns:
+            tuple: (OK, DEGRADE or STOP, name of the limit responsible or None)
+        """
+        fractions = self.usage(ledger)
+        for name, (used, projected) in fractions.items():
+            if projected > 1:
+                return self.STOP, name
+        for name, (used, projected) in fractions.items():
+            if used >= self.degrade_at:
+                return self.DEGRADE, name
+        return self.OK, None
+
+    def describe(self):
+        limits = []
+        if self.max_tokens:
+            limits.append(f"{self.max_tokens} tokens")
+        if self.max_cost:
+            limits.append(f"${self.max_cost:.2f}")
+        if self.max_seconds:
+            limits.append(f"{self.max_seconds / 60:.0f} min")
+        return ", ".join(limits) or "unlimited"
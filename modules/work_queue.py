@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import sqlite3
+
+
+class WorkQueue:
+    """
+    Durable task queue in a SQLite file, shared by scraping workers.
+
+    Workers claim tasks with a lease. A task whose lease runs out (its
+    worker died or hung) goes back to pending and is claimed again, up to
+    `max_attempts` times. Claims run in an IMMEDIATE transaction, so two
+    workers never get the same task.
+
+    The database uses SQLite's rollback journal rather than WAL, because WAL
+    needs shared memory and does not work when workers on several machines
+    open the file over a network share. The share must support file locks.
+    """
+
+    PENDING = "pending"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+
+    SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT,
+    priority REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, kind, priority DESC, id);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+    def __init__(self, path=None, lease_seconds=300, max_attempts=3):
+        """
+        Open (and create if needed) the queue.
+
+        Args:
+            path (str, optional): Path to the SQLite queue file
+            lease_seconds (float): How long a claimed task stays with its worker
+            max_attempts (int): Claims after which a task whose lease keeps expiring is failed
+        """
+        self.path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "data",
+            "work_queue.db"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit, with explicit transactions where several statements must be atomic
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(self.SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def reset(self):
+        """Remove every task and setting, to start a new run."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("DELETE FROM tasks")
+        self.conn.execute("DELETE FROM meta")
+        self.conn.execute("COMMIT")
+
+    def set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def enqueue(self, kind, key, payload=None, priority=0):
+        """
+        Add a task unless one of the same kind and key already exists.
+
+        Returns:
+            bool: Whether the task was added
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (kind, key, payload, priority, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, key, json.dumps(payload), priority, now, now)
+        )
+        return cursor.rowcount > 0
+
+    def enqueue_many(self, kind, tasks):
+        """
+        Add (key, payload, priority) tasks in one transaction.
+
+        Returns:
+            int: Number of tasks added
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        added = 0
+        for key, payload, priority in tasks:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, key, payload, priority, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(payload), priority, now, now)
+            )
+            added += cursor.rowcount
+        self.conn.execute("COMMIT")
+        return added
+
+    def _reclaim_expired(self, now):
+        """Return tasks with expired leases to pending, or fail them after too many attempts."""
+        self.conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = CASE WHEN attempts >= ? THEN 'lease expired too many times' ELSE error END, "
+            "worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, self.max_attempts, now, now)
+        )
+
+    def claim(self, worker, kinds=None):
+        """
+        Lease the highest priority pending task.
+
+        Args:
+            worker (str): Identifier of the claiming worker
+            kinds (tuple, optional): Task kinds the worker accepts
+
+        Returns:
+            dict: The task (id, kind, key, payload, attempts), or None if nothing is pending
+        """
+        now = time.time()
+        query = "SELECT id, kind, key, payload, attempts FROM tasks WHERE status = 'pending'"
+        params = []
+        if kinds:
+            query += f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        query += " ORDER BY priority DESC, id LIMIT 1"
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._reclaim_expired(now)
+            row = self.conn.execute(query, params).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row["id"])
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "key": row["key"],
+            "payload": json.loads(row["payload"]) if row["payload"] else None,
+            "attempts": row["attempts"] + 1
+        }
+
+    def extend(self, task_id, worker):
+        """
+        Renew the lease of a task the worker still holds.
+
+        Returns:
+            bool: False if the lease was lost (expired and reclaimed)
+        """
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (now + self.lease_seconds, now, task_id, worker)
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, task_id, worker, result=None):
+        """
+        Record the result of a task. Ignored if the worker no longer holds the lease.
+
+        Returns:
+            bool: Whether the result was recorded
+        """
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = 'done', result = ?, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (json.dumps(result), time.time(), task_id, worker)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, task_id, worker, error):
+        """Give a task back after an error; it is retried until max_attempts, then failed."""
+        self.conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND worker = ? AND status = 'leased'",
+            (self.max_attempts, str(error), time.time(), task_id, worker)
+        )
+
+    def counts(self, kind=None):
+        """
+        Count tasks per status.
+
+        Returns:
+            dict: status -> number of tasks
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._reclaim_expired(time.time())
+        self.conn.execute("COMMIT")
+        query = "SELECT status, COUNT(*) AS n FROM tasks"
+        params = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        counts = {status: 0 for status in (self.PENDING, self.LEASED, self.DONE, self.FAILED)}
+        for row in self.conn.execute(query + " GROUP BY status", params):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def results(self, kind):
+        """
+        Return the results of the finished tasks of a kind.
+
+        Returns:
+            list: (key, result) tuples in queue order
+        """
+        rows = self.conn.execute("SELECT key, result FROM tasks WHERE kind = ? AND status = 'done' ORDER BY id", (kind,))
+        return [(row["key"], json.loads(row["result"]) if row["result"] else None) for row in rows]
+
+    def worker_stats(self):
+        """
+        Return the number of finished tasks per worker and kind.
+
+        Returns:
+            dict: worker -> {kind: done count}
+        """
+        stats = {}
+        for row in self.conn.execute("SELECT worker, kind, COUNT(*) AS n FROM tasks WHERE status = 'done' GROUP BY worker, kind"):
+            stats.setdefault(row["worker"], {})[row["kind"]] = row["n"]
+        return stats
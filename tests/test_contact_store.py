@@ -0,0 +1,64 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.contact import Contact
+from modules.contact_store import ContactStore
+
+
+class ContactStoreUpsertTest(unittest.TestCase):
+    """Upserts merge into the stored row instead of replacing it."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = ContactStore(os.path.join(self.tmpdir, "contacts.db"))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def stored(self, key):
+        contacts = [contact for contact in self.store.get_contacts() if contact.key == key]
+        self.assertEqual(len(contacts), 1)
+        return contacts[0]
+
+    def test_upsert_keeps_stored_email_when_new_data_has_none(self):
+        url = "https://www.linkedin.com/in/jane/"
+        self.store.upsert_contacts([Contact(name="Jane", profile_url=url, email="jane@example.com")], "enriched")
+        self.store.upsert_contacts([Contact(name="Jane Doe", profile_url=url, message="Bonjour")], "scraped")
+
+        contact = self.stored(url)
+        self.assertEqual(contact.email, "jane@example.com")
+        self.assertEqual(contact.name, "Jane Doe")
+        self.assertEqual(contact.message, "Bonjour")
+
+    def test_status_never_moves_backwards(self):
+        url = "https://www.linkedin.com/in/john/"
+        self.store.upsert_contacts([Contact(profile_url=url)], "enriched")
+        self.store.upsert_contacts([Contact(profile_url=url)], "scraped")
+        self.assertEqual(self.stored(url).status, "enriched")
+
+    def test_query_string_does_not_duplicate_a_contact(self):
+        self.store.upsert_contacts([Contact(profile_url="https://www.linkedin.com/in/ann/")])
+        self.store.upsert_contacts([Contact(profile_url="https://www.linkedin.com/in/ann/?miniProfile=1")])
+        self.assertEqual(len(self.store.get_contacts()), 1)
+
+    def test_mark_generated_keeps_email(self):
+        url = "https://www.linkedin.com/in/lea/"
+        self.store.upsert_contacts([Contact(profile_url=url, email="lea@example.com")], "enriched")
+        self.store.mark_generated(Contact(profile_url=url), "Subject: hi")
+        contact = self.stored(url)
+        self.assertEqual(contact.email, "lea@example.com")
+        self.assertEqual(contact.status, "generated")
+        self.assertNotIn(url, {c.key for c in self.store.get_contacts(pending_generation=True)})
+
+    def test_unknown_stage_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.upsert_contacts([Contact(profile_url="https://www.linkedin.com/in/x/")], "sent")
+
+
+if __name__ == "__main__":
+    unittest.main()
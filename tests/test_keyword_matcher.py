@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.keyword_matcher import KeywordMatcher
+
+
+class KeywordMatcherOverlapTest(unittest.TestCase):
+    """Terms sharing a prefix or overlapping in the text must all be found."""
+
+    def test_term_and_longer_phrase_at_same_position(self):
+        matcher = KeywordMatcher.from_keywords('agent AND "agent immobilier"')
+        self.assertTrue(matcher.matches("agent immobilier"))
+        self.assertEqual(matcher.find_terms("agent immobilier"), {0, 1})
+        self.assertFalse(matcher.matches("agent"))
+
+    def test_phrase_words_separated_by_any_whitespace(self):
+        matcher = KeywordMatcher('agent AND "agent immobilier"')
+        self.assertEqual(matcher.find_terms("Agent\n  Immobilier à Paris"), {0, 1})
+
+    def test_prefix_and_exact_terms_on_same_stem(self):
+        matcher = KeywordMatcher("immo*, immobilier, immobilier*")
+        self.assertEqual(matcher.find_terms("immobilier"), {0, 1, 2})
+        # The exact term needs a word boundary, the prefix terms do not
+        self.assertEqual(matcher.find_terms("Immobilière"), {0, 2})
+
+    def test_overlapping_phrases(self):
+        matcher = KeywordMatcher('"real estate" AND "estate agent"')
+        self.assertTrue(matcher.matches("real estate agent"))
+
+    def test_whole_words(self):
+        self.assertEqual(KeywordMatcher("agent").find_terms("management agents"), set())
+        self.assertEqual(KeywordMatcher("agent, agents", whole_words=False).find_terms("reagents"), {0, 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
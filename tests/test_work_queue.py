@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.work_queue import WorkQueue
+
+
+class WorkQueueLeaseTest(unittest.TestCase):
+    """A task belongs to one worker at a time and its result is recorded once."""
+
+    LEASE_SECONDS = 0.05
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.queue = WorkQueue(os.path.join(self.tmpdir, "queue.db"), lease_seconds=self.LEASE_SECONDS)
+        self.queue.enqueue("scrape", "thread-1", {"url": "https://www.linkedin.com/messaging/thread/1/"})
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def expire(self):
+        time.sleep(self.LEASE_SECONDS * 2)
+
+    def test_expired_lease_hands_task_to_second_worker(self):
+        first = self.queue.claim("worker-a")
+        self.assertIsNone(self.queue.claim("worker-b"))
+
+        self.expire()
+        second = self.queue.claim("worker-b")
+        self.assertIsNotNone(second)
+        self.assertEqual(second["id"], first["id"])
+        self.assertEqual(second["attempts"], 2)
+
+        # The first worker lost the task and can no longer record it
+        self.assertFalse(self.queue.complete(first["id"], "worker-a", {"contacts": 1}))
+        self.assertTrue(self.queue.complete(second["id"], "worker-b", {"contacts": 2}))
+        self.assertEqual(self.queue.results("scrape"), [("thread-1", {"contacts": 2})])
+
+    def test_renew_after_expiry_fails(self):
+        task = self.queue.claim("worker-a")
+        self.assertTrue(self.queue.extend(task["id"], "worker-a"))
+
+        self.expire()
+        self.queue.claim("worker-b")
+        self.assertFalse(self.queue.extend(task["id"], "worker-a"))
+
+    def test_complete_is_idempotent(self):
+        task = self.queue.claim("worker-a")
+        self.assertTrue(self.queue.complete(task["id"], "worker-a", {"contacts": 1}))
+        self.assertFalse(self.queue.complete(task["id"], "worker-a", {"contacts": 5}))
+
+        self.assertEqual(self.queue.results("scrape"), [("thread-1", {"contacts": 1})])
+        self.assertEqual(self.queue.counts("scrape")["done"], 1)
+
+    def test_lease_expiring_too_often_fails_task(self):
+        queue = WorkQueue(os.path.join(self.tmpdir, "capped.db"), lease_seconds=self.LEASE_SECONDS, max_attempts=1)
+        queue.enqueue("scrape", "thread-1")
+        queue.claim("worker-a")
+        self.expire()
+        self.assertIsNone(queue.claim("worker-b"))
+        self.assertEqual(queue.counts("scrape")["failed"], 1)
+        queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()